@@ -1,3 +1,106 @@
+from core.basemodel import Settings
 from gram_core.config import ApplicationConfig, config, JoinGroups
 
-__all__ = ("ApplicationConfig", "config", "JoinGroups")
+__all__ = (
+    "ApplicationConfig",
+    "config",
+    "JoinGroups",
+    "PlayerCardsConfig",
+    "DamageCalConfig",
+    "PagePoolConfig",
+    "AssetRouteConfig",
+    "SearchConfig",
+    "InlineConfig",
+)
+
+
+class PlayerCardsConfig(Settings):
+    """Mihomo 请求配置"""
+
+    timeout: float = 30
+    """单次请求的超时时间"""
+    connect_timeout: float = 10
+    """建立连接的超时时间"""
+    retries: int = 2
+    """超时、连接失败或服务端错误时的重试次数"""
+    retry_backoff: float = 0.5
+    """重试间隔，每次重试翻倍"""
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 30
+    http2: bool = True
+    """是否启用 HTTP/2，需要安装 h2"""
+
+    class Config(Settings.Config):
+        env_prefix = "player_cards_"
+
+
+class DamageCalConfig(Settings):
+    """伤害计算配置"""
+
+    workers: int = 1
+    """进程池大小，至少为 1"""
+    timeout: float = 20
+    """单次计算的超时时间"""
+    cache_size: int = 512
+    """缓存的计算结果数量"""
+    cache_ttl: float = 24 * 60 * 60
+    """计算结果的缓存时间"""
+
+    class Config(Settings.Config):
+        env_prefix = "damage_cal_"
+
+
+class PagePoolConfig(Settings):
+    """浏览器页面池配置"""
+
+    size: int = 4
+    """页面数量，同时进行的渲染不超过该数量"""
+    max_queue: int = 64
+    """等待队列长度，队列已满时拒绝新的渲染"""
+    max_renders: int = 100
+    """页面渲染多少次后关闭并重新创建"""
+    wait_timeout: float = 60
+    """等待页面的超时时间"""
+
+    class Config(Settings.Config):
+        env_prefix = "page_pool_"
+
+
+class AssetRouteConfig(Settings):
+    """渲染资源缓存配置"""
+
+    enable: bool = True
+    max_bytes: int = 128 * 1024 * 1024
+    """缓存的总字节数"""
+    max_file_size: int = 8 * 1024 * 1024
+    """超过该大小的文件不缓存"""
+    max_age: int = 24 * 60 * 60
+    """返回给浏览器的 Cache-Control max-age"""
+
+    class Config(Settings.Config):
+        env_prefix = "render_assets_"
+
+
+class SearchConfig(Settings):
+    """搜索配置"""
+
+    cache_size: int = 512
+    """缓存的搜索结果数量"""
+    cache_ttl: float = 60 * 60
+    """搜索结果的缓存时间"""
+
+    class Config(Settings.Config):
+        env_prefix = "search_"
+
+
+class InlineConfig(Settings):
+    """Inline 配置"""
+
+    cache_time: int = 300
+    """与用户无关的结果在 Telegram 服务器上的缓存时间"""
+    prefix_limit: int = 20
+    """名称前缀匹配的最大结果数，匹配数达到该数量时不再进行模糊搜索"""
+
+    class Config(Settings.Config):
+        env_prefix = "inline_"
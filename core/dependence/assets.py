@@ -1,10 +1,17 @@
 import asyncio
+import contextlib
+import hashlib
+from collections import deque
 from pathlib import Path
 from ssl import SSLZeroReturnError
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict, Set
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
 
+import ujson as jsonlib
 from aiofiles import open as async_open
 from httpx import AsyncClient, HTTPError
+from pydantic import BaseModel
 
 from core.base_service import BaseService
 from modules.wiki.base import WikiModel
@@ -37,32 +44,99 @@ class AssetsCouldNotFound(AssetsServiceError):
         super().__init__(f"{message}: target={message}")
 
 
+class AssetManifest:
+    """已下载素材的清单，记录素材路径、来源、大小与哈希
+
+    启动时读取一次，之后判断素材是否存在只需要查询字典，不访问文件系统。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        """已下载的素材，键为相对 ASSETS_PATH 的路径"""
+        self.targets: Dict[str, str] = {}
+        """所有已知的素材到下载地址"""
+        self.failed: Set[str] = set()
+        """本次运行中下载失败的素材，不再尝试下载"""
+        self.loaded = False
+        self.dirty = False
+
+    @staticmethod
+    def get_key(path: Path) -> Optional[str]:
+        for root in (ASSETS_PATH, ASSETS_PATH.resolve()):
+            with contextlib.suppress(ValueError):
+                return path.relative_to(root).as_posix()
+        return None
+
+    async def load(self) -> None:
+        if not self.path.exists():
+            return
+        async with async_open(self.path, "r", encoding="utf-8") as file:
+            self.entries = jsonlib.loads(await file.read())
+        self.loaded = True
+
+    async def save(self) -> None:
+        if not self.dirty:
+            return
+        self.dirty = False
+        temp_path = self.path.with_suffix(".tmp")
+        async with async_open(temp_path, "w", encoding="utf-8") as file:
+            await file.write(jsonlib.dumps(self.entries, ensure_ascii=False))
+        temp_path.replace(self.path)
+        self.loaded = True
+
+    def register(self, path: Path, url: Optional[StrOrURL]) -> None:
+        """登记素材的下载地址，地址为空时表示该素材不存在"""
+        if not url:
+            return
+        key = self.get_key(path)
+        self.targets[key] = str(url)
+        if not self.loaded and key not in self.entries and path.exists():
+            # 旧版本没有清单，沿用已经下载的文件
+            self.add(path, str(url), None, path.stat().st_size)
+
+    def add(self, path: Path, url: str, digest: Optional[str], size: int) -> None:
+        key = self.get_key(path)
+        self.entries[key] = {"url": url, "size": size, "hash": digest}
+        self.failed.discard(key)
+        self.dirty = True
+
+    def fail(self, path: Path) -> None:
+        """记录下载失败的素材"""
+        self.failed.add(self.get_key(path))
+
+    def discard(self, path: Path) -> None:
+        if self.entries.pop(self.get_key(path), None) is not None:
+            self.dirty = True
+
+    def has(self, path: Path) -> bool:
+        """素材已下载，或者可以下载且没有下载失败过"""
+        key = self.get_key(path)
+        return key in self.entries or (key in self.targets and key not in self.failed)
+
+    def is_ready(self, path: Path) -> bool:
+        return self.get_key(path) in self.entries
+
+    def get_url(self, path: Path) -> Optional[str]:
+        return self.targets.get(self.get_key(path))
+
+    def pending(self) -> List[Path]:
+        """已知但还没有下载的素材"""
+        return [ASSETS_PATH / key for key in self.targets if key not in self.entries and key not in self.failed]
+
+
 class _AssetsService:
+    """素材路径的获取
+
+    获取路径只查询内存中的清单，不访问文件系统。返回的路径对应的文件可能还没有下载，所在目录也可能还不存在，
+    文件由 AssetsService 在后台或渲染前下载。
+    """
+
     client: Optional[AsyncClient] = None
 
-    def __init__(self, client: Optional[AsyncClient] = None) -> None:
+    def __init__(self, client: Optional[AsyncClient] = None, manifest: Optional[AssetManifest] = None) -> None:
         self.client = client
-
-    async def _download(self, url: StrOrURL, path: Path, retry: int = 5) -> Optional[Path]:
-        """从 url 下载图标至 path"""
-        logger.debug("正在从 %s 下载图标至 %s", url, path)
-        headers = None
-        for time in range(retry):
-            try:
-                response = await self.client.get(url, follow_redirects=False, headers=headers)
-            except Exception as error:  # pylint: disable=W0703
-                if not isinstance(error, (HTTPError, SSLZeroReturnError)):
-                    logger.error(error)  # 打印未知错误
-                if time != retry - 1:  # 未达到重试次数
-                    await asyncio.sleep(1)
-                else:
-                    raise error
-                continue
-            if response.status_code != 200:  # 判定页面是否正常
-                return None
-            async with async_open(path, "wb") as file:
-                await file.write(response.content)  # 保存图标
-            return path.resolve()
+        self.manifest = manifest
 
 
 class _AvatarAssets(_AssetsService):
@@ -71,8 +145,8 @@ class _AvatarAssets(_AssetsService):
     name_map: Dict[str, AvatarIcon]
     id_map: Dict[int, AvatarIcon]
 
-    def __init__(self, client: Optional[AsyncClient] = None) -> None:
-        super().__init__(client)
+    def __init__(self, client: Optional[AsyncClient] = None, manifest: Optional[AssetManifest] = None) -> None:
+        super().__init__(client, manifest)
         self.path = ASSETS_PATH.joinpath("avatar")
         self.path.mkdir(exist_ok=True, parents=True)
 
@@ -86,48 +160,24 @@ class _AvatarAssets(_AssetsService):
         self.data = [AvatarIcon(**data) for data in html.json()]
         self.name_map = {icon.name: icon for icon in self.data}
         self.id_map = {icon.id: icon for icon in self.data}
-        tasks = []
         for icon in self.data:
             eidolons_s_data = eidolons_data.get(str(icon.id), [])
             skills_s_data = [f"{i}.png" for i in skills_data if i.startswith(str(icon.id) + "_")]
             base_path = self.path / f"{icon.id}"
-            base_path.mkdir(exist_ok=True, parents=True)
-            gacha_path = base_path / "gacha.webp"
-            icon_path = base_path / "icon.webp"
-            normal_path = base_path / "normal.webp"
-            square_path = base_path / "square.png"
-            eidolons_paths = [(base_path / f"eidolon_{eidolon_id}.webp") for eidolon_id in range(1, 7)]
-            skills_paths = []
-            for i in skills_s_data:
-                temp_end = "_".join(i.split("_")[1:])
-                skills_paths.append(base_path / f"skill_{temp_end}")
-            if not gacha_path.exists():
-                tasks.append(self._download(icon.gacha, gacha_path))
-            if not icon_path.exists():
-                tasks.append(self._download(icon.icon_, icon_path))
-            if not normal_path.exists():
-                tasks.append(self._download(icon.normal, normal_path))
-            if not square_path.exists() and icon.square:
-                tasks.append(self._download(icon.square, square_path))
-            for index, eidolon in enumerate(eidolons_paths):
-                if not eidolons_s_data:
-                    break
-                if not eidolon.exists():
-                    tasks.append(self._download(eidolons_s_data[index], eidolon))
-            for index, skill in enumerate(skills_paths):
-                if not skill.exists():
-                    tasks.append(self._download(WikiModel.BASE_URL + "skill/" + skills_s_data[index], skill))
-            if len(tasks) >= 100:
-                await asyncio.gather(*tasks)
-                tasks = []
-        if tasks:
-            await asyncio.gather(*tasks)
+            self.manifest.register(base_path / "gacha.webp", icon.gacha)
+            self.manifest.register(base_path / "icon.webp", icon.icon_)
+            self.manifest.register(base_path / "normal.webp", icon.normal)
+            self.manifest.register(base_path / "square.png", icon.square)
+            for index, eidolon in enumerate(eidolons_s_data[:6]):
+                self.manifest.register(base_path / f"eidolon_{index + 1}.webp", eidolon)
+            for skill in skills_s_data:
+                temp_end = "_".join(skill.split("_")[1:])
+                self.manifest.register(base_path / f"skill_{temp_end}", WikiModel.BASE_URL + "skill/" + skill)
         logger.info("角色素材图标初始化完成")
 
     def get_path(self, icon: AvatarIcon, name: str, ext: str = "webp") -> Path:
-        path = self.path / f"{icon.id}"
-        path.mkdir(exist_ok=True, parents=True)
-        return path / f"{name}.{ext}"
+        """素材路径，文件可能还没有下载"""
+        return self.path / f"{icon.id}" / f"{name}.{ext}"
 
     def get_by_id(self, id_: int) -> Optional[AvatarIcon]:
         return self.id_map.get(id_, None)
@@ -160,16 +210,23 @@ class _AvatarAssets(_AssetsService):
         return self.get_path(icon, "normal")
 
     def square(self, target: StrOrInt, second_target: StrOrInt = None, allow_icon: bool = True) -> Path:
+        """方形头像，没有可用的方形头像时返回 icon，返回的文件可能还没有下载"""
         icon = self.get_target(target, second_target)
         path = self.get_path(icon, "square", "png")
-        if not path.exists():
-            if allow_icon:
-                return self.get_path(icon, "icon")
-            raise AssetsCouldNotFound("角色素材图标不存在", target)
-        return path
+        icon_path = self.get_path(icon, "icon")
+        # 优先使用已经下载的素材，下载失败的素材不会被返回
+        if self.manifest.is_ready(path):
+            return path
+        if allow_icon and self.manifest.is_ready(icon_path):
+            return icon_path
+        if self.manifest.has(path):
+            return path
+        if allow_icon:
+            return icon_path
+        raise AssetsCouldNotFound("角色素材图标不存在", target)
 
     def eidolons(self, target: StrOrInt, second_target: StrOrInt = None) -> List[Path]:
-        """星魂"""
+        """星魂，返回的文件可能还没有下载"""
         icon = self.get_target(target, second_target)
         return [self.get_path(icon, f"eidolon_{i}") for i in range(1, 7)]
 
@@ -199,6 +256,7 @@ class _AvatarAssets(_AssetsService):
         return self.get_path(icon, "skill_technique", "png")
 
     def skills(self, target: StrOrInt, second_target: StrOrInt = None) -> List[Path]:
+        """普攻、战技、终结技、天赋与秘技，返回的文件可能还没有下载"""
         icon = self.get_target(target, second_target)
         return [
             self.get_path(icon, "skill_basic_atk", "png"),
@@ -215,8 +273,8 @@ class _LightConeAssets(_AssetsService):
     name_map: Dict[str, LightConeIcon]
     id_map: Dict[int, LightConeIcon]
 
-    def __init__(self, client: Optional[AsyncClient] = None) -> None:
-        super().__init__(client)
+    def __init__(self, client: Optional[AsyncClient] = None, manifest: Optional[AssetManifest] = None) -> None:
+        super().__init__(client, manifest)
         self.path = ASSETS_PATH.joinpath("light_cone")
         self.path.mkdir(exist_ok=True, parents=True)
 
@@ -226,27 +284,15 @@ class _LightConeAssets(_AssetsService):
         self.data = [LightConeIcon(**data) for data in html.json()]
         self.name_map = {icon.name: icon for icon in self.data}
         self.id_map = {icon.id: icon for icon in self.data}
-        tasks = []
         for icon in self.data:
             base_path = self.path / f"{icon.id}"
-            base_path.mkdir(exist_ok=True, parents=True)
-            gacha_path = base_path / "gacha.webp"
-            icon_path = base_path / "icon.webp"
-            if not gacha_path.exists():
-                tasks.append(self._download(icon.gacha, gacha_path))
-            if not icon_path.exists():
-                tasks.append(self._download(icon.icon_, icon_path))
-            if len(tasks) >= 100:
-                await asyncio.gather(*tasks)
-                tasks = []
-        if tasks:
-            await asyncio.gather(*tasks)
+            self.manifest.register(base_path / "gacha.webp", icon.gacha)
+            self.manifest.register(base_path / "icon.webp", icon.icon_)
         logger.info("光锥素材图标初始化完成")
 
     def get_path(self, icon: LightConeIcon, name: str) -> Path:
-        path = self.path / f"{icon.id}"
-        path.mkdir(exist_ok=True, parents=True)
-        return path / f"{name}.webp"
+        """素材路径，文件可能还没有下载"""
+        return self.path / f"{icon.id}" / f"{name}.webp"
 
     def get_by_id(self, id_: int) -> Optional[LightConeIcon]:
         return self.id_map.get(id_, None)
@@ -278,8 +324,8 @@ class _HeadIconAssets(_AssetsService):
     id_map: Dict[int, HeadIcon]
     avatar_id_map: Dict[int, HeadIcon]
 
-    def __init__(self, client: Optional[AsyncClient] = None) -> None:
-        super().__init__(client)
+    def __init__(self, client: Optional[AsyncClient] = None, manifest: Optional[AssetManifest] = None) -> None:
+        super().__init__(client, manifest)
         self.path = ASSETS_PATH.joinpath("head_icon")
         self.path.mkdir(exist_ok=True, parents=True)
 
@@ -289,22 +335,13 @@ class _HeadIconAssets(_AssetsService):
         self.data = [HeadIcon(**data) for data in html.json()]
         self.id_map = {icon.id: icon for icon in self.data}
         self.avatar_id_map = {icon.avatar_id: icon for icon in self.data if icon.avatar_id}
-        tasks = []
         for icon in self.data:
-            webp_path = self.path / f"{icon.id}.webp"
-            png_path = self.path / f"{icon.id}.png"
-            if not webp_path.exists() and icon.webp:
-                tasks.append(self._download(icon.webp, webp_path))
-            if not png_path.exists():
-                tasks.append(self._download(icon.png, png_path))
-            if len(tasks) >= 100:
-                await asyncio.gather(*tasks)
-                tasks = []
-        if tasks:
-            await asyncio.gather(*tasks)
+            self.manifest.register(self.path / f"{icon.id}.webp", icon.webp)
+            self.manifest.register(self.path / f"{icon.id}.png", icon.png)
         logger.info("头像素材图标初始化完成")
 
     def get_path(self, icon: HeadIcon, ext: str) -> Path:
+        """素材路径，文件可能还没有下载"""
         path = self.path / f"{icon.id}.{ext}"
         return path
 
@@ -335,13 +372,16 @@ class _HeadIconAssets(_AssetsService):
         return self.get_path(icon, "png")
 
     def icon(self, target: StrOrInt, second_target: StrOrInt = None) -> Path:
+        """优先返回 webp 头像，返回的文件可能还没有下载"""
         icon = self.get_target(target, second_target)
-        webp_path = self.get_path(icon, "webp")
-        png_path = self.get_path(icon, "png")
-        if webp_path.exists():
-            return webp_path
-        if png_path.exists():
-            return png_path
+        paths = (self.get_path(icon, "webp"), self.get_path(icon, "png"))
+        # 优先使用已经下载的素材，下载失败的素材不会被返回
+        for path in paths:
+            if self.manifest.is_ready(path):
+                return path
+        for path in paths:
+            if self.manifest.has(path):
+                return path
         raise AssetsCouldNotFound("头像素材图标不存在", target)
 
 
@@ -349,8 +389,10 @@ class AssetsService(BaseService.Dependence):
     """asset服务
 
     用于储存和管理 asset :
-        当对应的 asset (如某角色图标)不存在时，该服务会先查找本地。
-        若本地不存在，则从网络上下载；若存在，则返回其路径
+        启动时读取素材清单并登记所有素材的下载地址，缺失的素材在后台预先下载；
+        获取路径只查询内存中的数据，不访问文件系统，返回的路径对应的文件可能还没有下载。
+        渲染前 RenderService 会调用 ensure_uris 下载模板数据中引用的素材，
+        素材路径只应通过 file:// URI 或 Path 传给模板，不应在浏览器之外直接读取
     """
 
     client: Optional[AsyncClient] = None
@@ -364,13 +406,143 @@ class AssetsService(BaseService.Dependence):
     light_cone: _LightConeAssets
     """光锥"""
 
+    prefetch_workers: int = 8
+    """后台预先下载的并发数"""
+    save_interval: int = 100
+    """后台下载多少个素材后保存一次清单"""
+
     def __init__(self):
         self.client = AsyncClient(timeout=60.0)
-        self.avatar = _AvatarAssets(self.client)
-        self.head_icon = _HeadIconAssets(self.client)
-        self.light_cone = _LightConeAssets(self.client)
+        self.manifest = AssetManifest(ASSETS_PATH / "manifest.json")
+        self.avatar = _AvatarAssets(self.client, self.manifest)
+        self.head_icon = _HeadIconAssets(self.client, self.manifest)
+        self.light_cone = _LightConeAssets(self.client, self.manifest)
+        self._downloading: Dict[str, asyncio.Task] = {}
+        self._prefetch_task: Optional[asyncio.Task] = None
 
     async def initialize(self):  # pylint: disable=W0221
+        await self.manifest.load()
         await self.avatar.initialize()
         await self.head_icon.initialize()
         await self.light_cone.initialize()
+        await self.manifest.save()
+        self._prefetch_task = asyncio.create_task(self.prefetch())
+
+    async def shutdown(self):  # pylint: disable=W0221
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._prefetch_task
+            self._prefetch_task = None
+        await self.manifest.save()
+
+    async def _download(self, url: StrOrURL, path: Path, retry: int = 5) -> Optional[Path]:
+        """从 url 下载图标至 path"""
+        logger.debug("正在从 %s 下载图标至 %s", url, path)
+        headers = None
+        for time in range(retry):
+            try:
+                response = await self.client.get(url, follow_redirects=False, headers=headers)
+            except Exception as error:  # pylint: disable=W0703
+                if not isinstance(error, (HTTPError, SSLZeroReturnError)):
+                    logger.error(error)  # 打印未知错误
+                if time != retry - 1:  # 未达到重试次数
+                    await asyncio.sleep(1)
+                else:
+                    raise error
+                continue
+            if response.status_code != 200:  # 判定页面是否正常
+                self.manifest.fail(path)
+                return None
+            path.parent.mkdir(exist_ok=True, parents=True)
+            temp_path = path.with_name(path.name + ".tmp")
+            async with async_open(temp_path, "wb") as file:
+                await file.write(response.content)  # 保存图标
+            temp_path.replace(path)
+            self.manifest.add(path, str(url), hashlib.sha256(response.content).hexdigest(), len(response.content))
+            return path.resolve()
+
+    async def fetch(self, path: Path, missing: bool = False) -> bool:
+        """确保素材已经下载，同一素材同时只下载一次
+
+        :param missing: 文件已经不存在，忽略清单中的记录重新下载
+        :return: 素材是否可用
+        """
+        if missing:
+            self.manifest.discard(path)
+        if self.manifest.is_ready(path):
+            return True
+        url = self.manifest.get_url(path)
+        if url is None:
+            return False
+        key = self.manifest.get_key(path)
+        if key in self.manifest.failed:
+            return False
+        task = self._downloading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download(url, ASSETS_PATH / key))
+            self._downloading[key] = task
+            task.add_done_callback(lambda _: self._downloading.pop(key, None))
+        # 请求被取消时不影响其他等待同一素材的请求
+        try:
+            return await asyncio.shield(task) is not None
+        except Exception as exc:
+            self.manifest.fail(path)
+            raise exc
+
+    async def ensure_uris(self, data: Any) -> None:
+        """下载模板数据中以 file:// URI 或 Path 引用、但还没有下载的素材，会遍历 pydantic 模型的字段"""
+        paths: Dict[str, Path] = {}
+        stack = [data]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, str):
+                if value.startswith("file:") and (path := self.get_uri_path(value)) is not None:
+                    paths[self.manifest.get_key(path)] = path
+            elif isinstance(value, Path):
+                if (key := self.manifest.get_key(value)) is not None:
+                    paths[key] = value
+            elif isinstance(value, BaseModel):
+                stack.extend(value.__dict__.values())
+            elif isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, (list, tuple, set)):
+                stack.extend(value)
+        pending = [path for path in paths.values() if not self.manifest.is_ready(path) and self.manifest.has(path)]
+        if pending:
+            results = await asyncio.gather(*(self.fetch(path) for path in pending), return_exceptions=True)
+            for path, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    logger.warning("下载素材 %s 失败 %s", path.name, str(result))
+
+    @staticmethod
+    def get_uri_path(uri: str) -> Optional[Path]:
+        """把 file:// URI 转换为素材路径，不在素材目录下时返回 None"""
+        path = Path(url2pathname(unquote(urlparse(uri).path)))
+        if AssetManifest.get_key(path) is None:
+            return None
+        return path
+
+    async def prefetch(self) -> None:
+        """在后台下载缺失的素材"""
+        pending = deque(self.manifest.pending())
+        if not pending:
+            return
+        logger.info("正在后台下载 %s 个缺失的素材", len(pending))
+        done = 0
+
+        async def worker():
+            nonlocal done
+            while pending:
+                path = pending.popleft()
+                try:
+                    await self.fetch(path)
+                except Exception as exc:  # pylint: disable=W0703
+                    logger.warning("下载素材 %s 失败 %s", path.name, str(exc))
+                done += 1
+                if done % self.save_interval == 0:
+                    await self.manifest.save()
+
+        await asyncio.gather(*(worker() for _ in range(self.prefetch_workers)))
+        await self.manifest.save()
+        logger.info("缺失的素材下载完成")
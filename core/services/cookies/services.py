@@ -4,8 +4,9 @@ from gram_core.base_service import BaseService
 from gram_core.basemodel import RegionEnum
 from gram_core.services.cookies.error import CookieServiceError
 from gram_core.services.cookies.models import CookiesStatusEnum, CookiesDataBase as Cookies
+from gram_core.services.cookies.repositories import CookiesRepository
 from gram_core.services.cookies.services import (
-    CookiesService,
+    CookiesService as BaseCookiesService,
     PublicCookiesService as BasePublicCookiesService,
     NeedContinue,
 )
@@ -13,11 +14,38 @@ from gram_core.services.cookies.services import (
 from simnet import StarRailClient, Region, Game
 from simnet.errors import InvalidCookies, TooManyRequests, BadRequest as SimnetBadRequest, NeedChallenge, InvalidDevice
 
+from core.services.players.cache import PlayerBundleCache
 from utils.log import logger
 
 __all__ = ("CookiesService", "PublicCookiesService")
 
 
+class CookiesService(BaseCookiesService):
+    """写入 Cookies 时使 PlayerBundleCache 中对应用户的缓存失效"""
+
+    def __init__(self, cookies_repository: CookiesRepository, bundle_cache: PlayerBundleCache):
+        super().__init__(cookies_repository)
+        self.bundle_cache = bundle_cache
+
+    async def add(self, cookies: Cookies):
+        try:
+            await super().add(cookies)
+        finally:
+            await self.bundle_cache.delete(cookies.user_id)
+
+    async def update(self, cookies: Cookies):
+        try:
+            await super().update(cookies)
+        finally:
+            await self.bundle_cache.delete(cookies.user_id)
+
+    async def delete(self, cookies: Cookies):
+        try:
+            await super().delete(cookies)
+        finally:
+            await self.bundle_cache.delete(cookies.user_id)
+
+
 class PublicCookiesService(BaseService, BasePublicCookiesService):
     async def initialize(self) -> None:
         logger.info("正在初始化公共Cookies池")
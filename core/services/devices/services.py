@@ -1,3 +1,33 @@
-from gram_core.services.devices.services import DevicesService
+from gram_core.services.devices.services import DevicesService as BaseDevicesService
+
+from core.services.devices.models import DevicesDataBase as Devices
+from core.services.devices.repositories import DevicesRepository
+from core.services.players.cache import PlayerBundleCache
 
 __all__ = ("DevicesService",)
+
+
+class DevicesService(BaseDevicesService):
+    """写入 Devices 时使 PlayerBundleCache 中关联账号的缓存失效"""
+
+    def __init__(self, devices_repository: DevicesRepository, bundle_cache: PlayerBundleCache):
+        super().__init__(devices_repository)
+        self.bundle_cache = bundle_cache
+
+    async def add(self, devices: Devices):
+        try:
+            await super().add(devices)
+        finally:
+            await self.bundle_cache.delete_by_account_id(devices.account_id)
+
+    async def update(self, devices: Devices):
+        try:
+            await super().update(devices)
+        finally:
+            await self.bundle_cache.delete_by_account_id(devices.account_id)
+
+    async def delete(self, devices: Devices):
+        try:
+            await super().delete(devices)
+        finally:
+            await self.bundle_cache.delete_by_account_id(devices.account_id)
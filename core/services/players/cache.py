@@ -0,0 +1,131 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Type, TypeVar
+
+import ujson as jsonlib
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import SQLModel
+
+from core.base_service import BaseService
+from core.basemodel import RegionEnum
+from core.dependence.redisdb import RedisDB
+from gram_core.services.cookies.models import CookiesDataBase as Cookies
+from gram_core.services.devices.models import DevicesDataBase as Devices
+from gram_core.services.players.models import PlayersDataBase as Player
+from utils.models.cache import TTLCache
+
+__all__ = ("PlayerBundle", "PlayerBundleCache")
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+
+class PlayerBundle(NamedTuple):
+    """GenshinHelper 创建客户端所需的 player、cookies 与 device"""
+
+    player: Optional[Player]
+    cookies: Optional[Cookies] = None
+    devices: Optional[Devices] = None
+
+
+class PlayerBundleCache(BaseService.Component):
+    """按用户缓存 PlayerBundle
+
+    第一层为进程内 TTL 缓存，第二层为可选的 Redis 缓存。
+    缓存中只保存序列化后的数据，每次读取都会构造新的模型实例，调用方可以放心修改。
+    Redis 中不保存 cookies，从 Redis 命中时 cookies 为 None，需要调用方重新查询。
+    CookiesService、PlayersService 与 DevicesService 写入时会自动使缓存失效。
+    """
+
+    ttl: int = 60
+    redis_ttl: int = 10 * 60
+    maxsize: int = 4096
+    use_redis: bool = True
+
+    def __init__(self, redis: RedisDB):
+        self.client = redis.client
+        self.qname = "players:bundle"
+        self.local: TTLCache[str, Dict[str, str]] = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+
+    def get_qname(self, user_id: int, region: Optional[RegionEnum] = None) -> str:
+        return f"{self.qname}:{user_id}:{int(region or 0)}"
+
+    def get_account_qname(self, account_id: int) -> str:
+        return f"{self.qname}:account:{account_id}"
+
+    @staticmethod
+    def _load_model(model: Type[ModelT], data: Optional[str]) -> Optional[ModelT]:
+        if data is None:
+            return None
+        instance = model.validate(jsonlib.loads(data))
+        # 还原为 detached 状态，之后 session.add 时执行 UPDATE 而不是 INSERT
+        make_transient_to_detached(instance)
+        return instance
+
+    @classmethod
+    def _loads(cls, data: Dict[str, str]) -> PlayerBundle:
+        return PlayerBundle(
+            player=cls._load_model(Player, data.get("player")),
+            cookies=cls._load_model(Cookies, data.get("cookies")),
+            devices=cls._load_model(Devices, data.get("devices")),
+        )
+
+    @staticmethod
+    def _dumps(bundle: PlayerBundle) -> Dict[str, str]:
+        return {key: value.json() for key, value in bundle._asdict().items() if value is not None}
+
+    async def get(self, user_id: int, region: Optional[RegionEnum] = None) -> Optional[PlayerBundle]:
+        qname = self.get_qname(user_id, region)
+        data = self.local.get(qname)
+        if data is not None:
+            return self._loads(data)
+        if not self.use_redis:
+            return None
+        data = await self.client.get(qname)
+        if data is None:
+            return None
+        return self._loads(jsonlib.loads(str(data, encoding="utf-8")))
+
+    async def set(self, user_id: int, bundle: PlayerBundle, region: Optional[RegionEnum] = None) -> None:
+        await self.set_many({user_id: bundle}, region)
+
+    async def set_many(self, bundles: Dict[int, PlayerBundle], region: Optional[RegionEnum] = None) -> None:
+        """写入缓存，player 为 None 的结果不会被缓存"""
+        bundles = {user_id: bundle for user_id, bundle in bundles.items() if bundle.player is not None}
+        if not bundles:
+            return
+        payloads = {self.get_qname(user_id, region): self._dumps(bundle) for user_id, bundle in bundles.items()}
+        for qname, payload in payloads.items():
+            self.local.set(qname, payload)
+        if self.use_redis:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for user_id, bundle in bundles.items():
+                    qname = self.get_qname(user_id, region)
+                    payload = {key: value for key, value in payloads[qname].items() if key != "cookies"}
+                    pipe.set(qname, jsonlib.dumps(payload), ex=self.redis_ttl)
+                    if bundle.player.account_id is not None:
+                        account_qname = self.get_account_qname(bundle.player.account_id)
+                        pipe.sadd(account_qname, qname)
+                        pipe.expire(account_qname, self.redis_ttl)
+                await pipe.execute()
+
+    async def delete(self, user_id: int) -> None:
+        """删除用户在全部区服下的缓存"""
+        await self.delete_many([user_id])
+
+    async def delete_many(self, user_ids: Iterable[int]) -> None:
+        qnames: List[str] = []
+        for user_id in user_ids:
+            for qname in {self.get_qname(user_id), *(self.get_qname(user_id, region) for region in RegionEnum)}:
+                self.local.pop(qname)
+                qnames.append(qname)
+        if self.use_redis and qnames:
+            await self.client.delete(*qnames)
+
+    async def delete_by_account_id(self, account_id: int) -> None:
+        """删除与 account_id 关联的缓存，用于只知道 account_id 的 devices 写入"""
+        for qname in self.local:
+            data = self.local.get(qname)
+            if data is not None and jsonlib.loads(data["player"]).get("account_id") == account_id:
+                self.local.pop(qname)
+        if self.use_redis:
+            account_qname = self.get_account_qname(account_id)
+            qnames = [str(qname, encoding="utf-8") for qname in await self.client.smembers(account_qname)]
+            await self.client.delete(account_qname, *qnames)
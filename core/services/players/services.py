@@ -3,16 +3,50 @@ from typing import Optional
 
 from core.base_service import BaseService
 from core.dependence.redisdb import RedisDB
+from core.services.players.cache import PlayerBundleCache
 from core.services.players.models import PlayersDataBase as Player, PlayerInfoSQLModel, PlayerInfo
-from core.services.players.repositories import PlayerInfoRepository
+from core.services.players.repositories import PlayerInfoRepository, PlayersRepository
 from modules.apihelper.client.components.player_cards import PlayerCards, PlayerBaseInfo
+from utils.codec import cache_codec
 from utils.log import logger
 
-from gram_core.services.players import PlayersService
+from gram_core.services.players import PlayersService as BasePlayersService
 
 __all__ = ("PlayersService", "PlayerInfoService")
 
 
+class PlayersService(BasePlayersService):
+    """写入 Player 时使 PlayerBundleCache 中对应用户的缓存失效"""
+
+    def __init__(self, players_repository: PlayersRepository, bundle_cache: PlayerBundleCache):
+        super().__init__(players_repository)
+        self.bundle_cache = bundle_cache
+
+    async def add(self, player: Player):
+        try:
+            await super().add(player)
+        finally:
+            await self.bundle_cache.delete(player.user_id)
+
+    async def update(self, player: Player):
+        try:
+            await super().update(player)
+        finally:
+            await self.bundle_cache.delete(player.user_id)
+
+    async def delete(self, player: Player):
+        try:
+            await super().delete(player)
+        finally:
+            await self.bundle_cache.delete(player.user_id)
+
+    async def remove_all_by_user_id(self, user_id: int):
+        try:
+            await super().remove_all_by_user_id(user_id)
+        finally:
+            await self.bundle_cache.delete(user_id)
+
+
 class PlayerInfoService(BaseService):
     def __init__(self, redis: RedisDB, players_info_repository: PlayerInfoRepository):
         self.cache = redis.client
@@ -25,12 +59,11 @@ class PlayerInfoService(BaseService):
         data = await self.cache.get(qname)
         if data is None:
             return None
-        json_data = str(data, encoding="utf-8")
-        return PlayerInfo.parse_raw(json_data)
+        return cache_codec.loads_model(PlayerInfo, data)
 
     async def set_form_cache(self, player: PlayerInfo):
         qname = f"{self.qname}:{player.user_id}:{player.player_id}"
-        await self.cache.set(qname, player.json(), ex=60)
+        await self.cache.set(qname, cache_codec.dumps_model(player, by_alias=False), ex=60)
 
     async def get_player_info_from_mihomo(self, player_id: int) -> Optional[PlayerBaseInfo]:
         try:
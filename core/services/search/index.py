@@ -0,0 +1,180 @@
+import itertools
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+from core.services.search.models import BaseEntry
+
+__all__ = ("SearchIndex",)
+
+
+def process_text(text: Optional[str]) -> str:
+    """与 thefuzz.fuzz.partial_token_set_ratio 相同的预处理"""
+    if not text:
+        return ""
+    return full_process(text, force_ascii=True)
+
+
+def get_grams(text: str) -> Set[str]:
+    """单字与词内的二元组，包含多个词时空格也会参与相似度计算，因此同样作为单字"""
+    grams = set()
+    tokens = text.split()
+    if len(tokens) > 1:
+        grams.add(" ")
+    for token in tokens:
+        grams.update(token)
+        grams.update(token[i : i + 2] for i in range(len(token) - 1))
+    return grams
+
+
+class IndexedEntry:
+    __slots__ = ("entry", "position", "tags", "description", "grams")
+
+    def __init__(self, entry: BaseEntry, position: Tuple[int, int]):
+        self.entry = entry
+        self.position = position
+        self.tags = [process_text(tag) for tag in entry.tags or []]
+        self.description = process_text(entry.description)
+        self.grams = get_grams(process_text(entry.title))
+        for tag in self.tags:
+            self.grams.update(get_grams(tag))
+        self.grams.update(get_grams(self.description))
+
+
+class SearchIndex:
+    """条目的字符 n-gram 倒排索引
+
+    partial_token_set_ratio 大于 0 的条目至少与搜索文本有一个相同的字符，
+    因此只需要对包含搜索文本中任意单字的条目批量计算相似度，其余条目的相似度为 0。
+    候选条目过多时按相同 n-gram 的数量保留前 max_candidates 个。
+    """
+
+    def __init__(self, max_candidates: int = 512):
+        self.max_candidates = max_candidates
+        self.entries: Dict[str, IndexedEntry] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.exact: Dict[str, Set[str]] = {}
+        """标题与标签到条目 key，完全匹配时不受候选数量限制"""
+        self._position = 0
+        self._order: Optional[List[str]] = None
+        """按 group 与添加顺序排列的条目 key，条目增减时重新排序"""
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[BaseEntry]:
+        item = self.entries.get(key)
+        return item.entry if item is not None else None
+
+    def add(self, entry: BaseEntry, group: int = 0) -> None:
+        """添加条目，已存在时替换并保留原来的顺序
+
+        :param entry: 条目
+        :param group: 相似度相同时 group 较小的条目排在前面
+        """
+        old = self.entries.get(entry.key)
+        if old is not None:
+            self._remove_postings(old)
+            position = old.position
+        else:
+            position = (group, self._position)
+            self._position += 1
+            self._order = None
+        item = IndexedEntry(entry, position)
+        self.entries[entry.key] = item
+        for gram in item.grams:
+            self.postings.setdefault(gram, set()).add(entry.key)
+        for text in self.get_exact_texts(entry):
+            self.exact.setdefault(text, set()).add(entry.key)
+
+    def remove(self, key: str) -> None:
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self._remove_postings(item)
+            self._order = None
+
+    @staticmethod
+    def get_exact_texts(entry: BaseEntry) -> Set[str]:
+        return {entry.title, *(entry.tags or [])}
+
+    def _remove_postings(self, item: IndexedEntry) -> None:
+        for mapping, values in ((self.postings, item.grams), (self.exact, self.get_exact_texts(item.entry))):
+            for value in values:
+                keys = mapping.get(value)
+                if keys is not None:
+                    keys.discard(item.entry.key)
+                    if not keys:
+                        del mapping[value]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.postings.clear()
+        self.exact.clear()
+        self._position = 0
+        self._order = None
+
+    def get_order(self) -> List[str]:
+        if self._order is None:
+            self._order = sorted(self.entries, key=lambda key: self.entries[key].position)
+        return self._order
+
+    def values(self) -> Iterable[BaseEntry]:
+        """按 group 与添加顺序返回所有条目"""
+        return (self.entries[key].entry for key in self.get_order())
+
+    def get_candidates(self, query: str) -> List[IndexedEntry]:
+        query_grams = get_grams(query)
+        counter: Counter = Counter()
+        for gram in query_grams:
+            keys = self.postings.get(gram)
+            if keys:
+                counter.update(keys)
+        if len(counter) > self.max_candidates:
+            keys = (key for key, _ in counter.most_common(self.max_candidates))
+        else:
+            keys = counter.keys()
+        return [self.entries[key] for key in keys]
+
+    def search(self, search_query: str, amount: Optional[int] = None) -> List[BaseEntry]:
+        """与按 compare_to_query 倒序排序的结果一致，相同相似度的条目按 group 与添加顺序排列"""
+        query = process_text(search_query)
+        candidates = self.get_candidates(query) if query else []
+        exact_keys = self.exact.get(search_query, set()) - {item.entry.key for item in candidates}
+        candidates.extend(self.entries[key] for key in exact_keys)
+        scores: Dict[str, float] = {}
+        if candidates:
+            choices, owners = [], []
+            for index, item in enumerate(candidates):
+                choices.extend(item.tags)
+                owners.extend([index] * len(item.tags))
+                choices.append(item.description)
+                owners.append(~index)
+            tag_scores = [0.0] * len(candidates)
+            description_scores = [0.0] * len(candidates)
+            if query:
+                for _, score, choice_index in process.extract(
+                    query, choices, scorer=fuzz.partial_token_set_ratio, processor=None, limit=None
+                ):
+                    score = int(round(score))
+                    owner = owners[choice_index]
+                    if owner >= 0:
+                        tag_scores[owner] = max(tag_scores[owner], score)
+                    else:
+                        description_scores[~owner] = score
+            for index, item in enumerate(candidates):
+                score = item.entry.get_score(search_query, tag_scores[index], description_scores[index])
+                if score > 0:
+                    scores[item.entry.key] = score
+        matched = sorted(scores, key=lambda key: (-scores[key], self.entries[key].position))
+        result = [self.entries[key].entry for key in matched]
+        if amount and len(result) >= amount:
+            return result[:amount]
+        # 相似度为 0 的条目按添加顺序排在最后，只取还差的数量
+        rest = (self.entries[key].entry for key in self.get_order() if key not in scores)
+        result.extend(itertools.islice(rest, amount - len(result)) if amount else rest)
+        return result
@@ -22,32 +22,35 @@ class BaseEntry(BaseModel):
     photo_file_id: Optional[str] = None
     document_file_id: Optional[str] = None
 
-    @abstractmethod
     def compare_to_query(self, search_query: str) -> float:
         """返回一个数字 ∈[0,100] 描述搜索查询与此条目的相似程度。
 
         Gives a number ∈[0,100] describing how similar the search query is to this entry."""
+        tag_score = max((fuzz.partial_token_set_ratio(tag, search_query) for tag in self.tags or []), default=0.0)
+        description_score = fuzz.partial_token_set_ratio(self.description, search_query) if self.description else 0.0
+        return self.get_score(search_query, tag_score, description_score)
+
+    @abstractmethod
+    def get_score(self, search_query: str, tag_score: float, description_score: float) -> float:
+        """根据标签与描述的相似度计算条目的相似程度，搜索索引批量计算相似度后调用。
+
+        :param search_query: 搜索文本
+        :param tag_score: 所有标签中最高的 partial_token_set_ratio
+        :param description_score: 描述的 partial_token_set_ratio
+        """
 
 
 class WeaponEntry(BaseEntry):
-    def compare_to_query(self, search_query: str) -> float:
-        score = 0.0
+    def get_score(self, search_query: str, tag_score: float, description_score: float) -> float:
         if search_query == self.title:
             return 100
-        if self.tags:
-            if search_query in self.tags:
-                return 99
-            for tag in self.tags:
-                _score = fuzz.partial_token_set_ratio(tag, search_query)
-                if _score >= score:
-                    score = _score
-        if score >= 90:
-            return score * 0.99
-        if self.description:
-            _score = fuzz.partial_token_set_ratio(self.description, search_query)
-            if _score >= score:
-                return _score
-        return score
+        if self.tags and search_query in self.tags:
+            return 99
+        if tag_score >= 90:
+            return tag_score * 0.99
+        if self.description and description_score >= tag_score:
+            return description_score
+        return tag_score
 
 
 class WeaponsEntry(BaseModel):
@@ -55,18 +58,12 @@ class WeaponsEntry(BaseModel):
 
 
 class StrategyEntry(BaseEntry):
-    def compare_to_query(self, search_query: str) -> float:
-        score = 0.0
+    def get_score(self, search_query: str, tag_score: float, description_score: float) -> float:
         if search_query == self.title:
             return 100
-        if self.tags:
-            if search_query in self.tags:
-                return 99
-            for tag in self.tags:
-                _score = fuzz.partial_token_set_ratio(tag, search_query)
-                if _score >= score:
-                    score = _score
-        return score
+        if self.tags and search_query in self.tags:
+            return 99
+        return tag_score
 
 
 class StrategyEntryList(BaseModel):
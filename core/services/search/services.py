@@ -1,18 +1,16 @@
 import asyncio
-import heapq
 import itertools
-import json
-import os
 import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import aiofiles
-from async_lru import alru_cache
-
 from core.base_service import BaseService
-from core.services.search.models import BaseEntry, StrategyEntry, StrategyEntryList, WeaponEntry, WeaponsEntry
+from core.config import SearchConfig
+from core.services.search.index import SearchIndex
+from core.services.search.models import BaseEntry, StrategyEntry, WeaponEntry
+from core.services.search.storage import EntryStorage
 from utils.const import PROJECT_ROOT
+from utils.models.cache import TTLCache
 
 __all__ = ("SearchServices",)
 
@@ -23,47 +21,96 @@ ENTRY_DAYA_PATH.mkdir(parents=True, exist_ok=True)
 class SearchServices(BaseService):
     def __init__(self):
         self._lock = asyncio.Lock()  # 访问和修改操作成员变量必须加锁操作
-        self.weapons: List[WeaponEntry] = []
-        self.strategy: List[StrategyEntry] = []
+        self.weapons: Dict[str, WeaponEntry] = {}
+        self.strategy: Dict[str, StrategyEntry] = {}
         self.entry_data_path: Path = ENTRY_DAYA_PATH
         self.weapons_entry_data_path = self.entry_data_path / "weapon.json"
         self.strategy_entry_data_path = self.entry_data_path / "strategy.json"
+        self.weapons_storage: EntryStorage[WeaponEntry] = EntryStorage(
+            self.entry_data_path / "weapon.jsonl", WeaponEntry, self.weapons_entry_data_path
+        )
+        self.strategy_storage: EntryStorage[StrategyEntry] = EntryStorage(
+            self.entry_data_path / "strategy.jsonl", StrategyEntry, self.strategy_entry_data_path
+        )
+        self._dirty: Dict[str, BaseEntry] = {}
+        """等待保存的条目"""
+        self.load_batch_size = 500
+        self._loaded = False
         self.replace_time: Dict[str, float] = {}
-
-    @staticmethod
-    async def load_json(path):
-        async with aiofiles.open(path, "r", encoding="utf-8") as f:
-            return json.loads(await f.read())
-
-    @staticmethod
-    async def save_json(path, data):
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(data)
+        self.index = SearchIndex()
+        self.config = SearchConfig()
+        self.generation = 0
+        """条目每次变更时递增，搜索结果缓存以此区分版本"""
+        self.cache: TTLCache[Tuple, List[BaseEntry]] = TTLCache(
+            maxsize=self.config.cache_size, ttl=self.config.cache_ttl
+        )
+
+    def bump_generation(self) -> None:
+        """条目发生变更，之前的搜索结果全部失效"""
+        self.generation += 1
+        self.cache.clear()
+
+    def get_storage(self, entry: BaseEntry) -> Optional[EntryStorage]:
+        if isinstance(entry, WeaponEntry):
+            return self.weapons_storage
+        if isinstance(entry, StrategyEntry):
+            return self.strategy_storage
+        return None
+
+    async def _load_storage(self, storage: EntryStorage) -> None:
+        legacy = await storage.read_legacy()
+        raws = await storage.read_lines()
+        entries = itertools.chain(
+            (storage.model.construct(**i) for i in legacy if i.get("key") not in raws), storage.iter_parse(raws)
+        )
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.load_batch_size:
+                await self._load_batch(batch)
+                batch = []
+                await asyncio.sleep(0)
+        await self._load_batch(batch)
+        if legacy:
+            # 转换旧版文件
+            async with self._lock:
+                values = self.weapons if storage is self.weapons_storage else self.strategy
+                await storage.compact(list(values.values()))
+
+    async def _load_batch(self, entries: List[BaseEntry]) -> None:
+        async with self._lock:
+            for entry in entries:
+                # 插件启动后添加的条目更新，不被文件中的旧数据覆盖
+                if entry.key not in self.weapons and entry.key not in self.strategy:
+                    self._set_entry(entry)
+            self.bump_generation()
 
     async def load_data(self):
-        async with self._lock:
-            if self.weapons_entry_data_path.exists():
-                weapon_json = await self.load_json(self.weapons_entry_data_path)
-                weapons = WeaponsEntry.parse_obj(weapon_json)
-                for weapon in weapons.data:
-                    self.weapons.append(weapon.copy())
-            if self.strategy_entry_data_path.exists():
-                strategy_json = await self.load_json(self.strategy_entry_data_path)
-                strategy = StrategyEntryList.parse_obj(strategy_json)
-                for strategy in strategy.data:
-                    self.strategy.append(strategy.copy())
+        """分批加载保存的条目，每批之间让出事件循环"""
+        await self._load_storage(self.weapons_storage)
+        await self._load_storage(self.strategy_storage)
+        self._loaded = True
 
     async def save_entry(self) -> None:
-        """保存条目
+        """保存条目，只写入新增或更新的条目
         :return: None
         """
         async with self._lock:
-            if len(self.weapons) > 0:
-                weapons = WeaponsEntry(data=self.weapons)
-                await self.save_json(self.weapons_entry_data_path, weapons.json())
-            if len(self.strategy) > 0:
-                strategy = StrategyEntryList(data=self.strategy)
-                await self.save_json(self.strategy_entry_data_path, strategy.json())
+            dirty = list(self._dirty.values())
+            self._dirty.clear()
+            for storage, values in ((self.weapons_storage, self.weapons), (self.strategy_storage, self.strategy)):
+                await storage.append(entry for entry in dirty if self.get_storage(entry) is storage)
+                # 加载完成前文件中还有未读取的条目，不能重写
+                if self._loaded and storage.need_compact(len(values)):
+                    await storage.compact(list(values.values()))
+
+    def _set_entry(self, entry: BaseEntry) -> None:
+        if isinstance(entry, WeaponEntry):
+            self.weapons[entry.key] = entry
+            self.index.add(entry, 0)
+        elif isinstance(entry, StrategyEntry):
+            self.strategy[entry.key] = entry
+            self.index.add(entry, 1)
 
     async def add_entry(self, entry: BaseEntry, update: bool = False, ttl: int = 3600):
         """添加条目
@@ -77,42 +124,35 @@ class SearchServices(BaseService):
             if replace_time and replace_time <= time.time() + ttl:
                 return
             if isinstance(entry, WeaponEntry):
-                for index, value in enumerate(self.weapons):
-                    if value.key == entry.key:
-                        if update:
-                            self.replace_time[entry.key] = time.time()
-                            self.weapons[index] = entry
-                        break
-                else:
-                    self.weapons.append(entry)
+                entries = self.weapons
             elif isinstance(entry, StrategyEntry):
-                for index, value in enumerate(self.strategy):
-                    if value.key == entry.key:
-                        if update:
-                            self.replace_time[entry.key] = time.time()
-                            self.strategy[index] = entry
-                        break
-                else:
-                    self.strategy.append(entry)
+                entries = self.strategy
+            else:
+                return
+            if entry.key in entries:
+                if not update:
+                    return
+                self.replace_time[entry.key] = time.time()
+            self._set_entry(entry)
+            self._dirty[entry.key] = entry
+            self.bump_generation()
 
     async def remove_all_entry(self):
         """移除全部条目
         :return: None
         """
         async with self._lock:
-            self.weapons = []
-            if self.weapons_entry_data_path.exists():
-                os.remove(self.weapons_entry_data_path)
-            self.strategy = []
-            if self.strategy_entry_data_path.exists():
-                os.remove(self.strategy_entry_data_path)
-
-    @staticmethod
-    def _sort_key(entry: BaseEntry, search_query: str) -> float:
-        return entry.compare_to_query(search_query)
-
-    @alru_cache(maxsize=64)
-    async def multi_search_combinations(self, search_queries: Tuple[str], results_per_query: int = 3):
+            self.weapons = {}
+            self.weapons_storage.remove()
+            self.strategy = {}
+            self.strategy_storage.remove()
+            self._dirty.clear()
+            self.index.clear()
+            self.bump_generation()
+
+    async def multi_search_combinations(
+        self, search_queries: Tuple[str], results_per_query: int = 3
+    ) -> Dict[str, List[BaseEntry]]:
         """多个关键词搜索
         :param search_queries: 搜索文本
         :param results_per_query: 约定返回的数目
@@ -123,29 +163,24 @@ class SearchServices(BaseService):
         for query in effective_queries:
             if res := await self.search(search_query=query, amount=results_per_query):
                 results[query] = res
+        return results
 
-    @alru_cache(maxsize=64)
     async def search(self, search_query: Optional[str], amount: int = None) -> Optional[List[BaseEntry]]:
         """在所有可用条目中搜索适当的结果
         :param search_query: 搜索文本
         :param amount: 约定返回的数目
         :return: 搜索结果
         """
-        # search_entries: Iterable[BaseEntry] = []
         async with self._lock:
-            search_entries = itertools.chain(self.weapons, self.strategy)
-
-            if not search_query:
-                return search_entries if isinstance(search_entries, list) else list(search_entries)
-
-            if not amount:
-                return sorted(
-                    search_entries,
-                    key=lambda entry: self._sort_key(entry, search_query),  # type: ignore
-                    reverse=True,
-                )
-            return heapq.nlargest(
-                amount,
-                search_entries,
-                key=lambda entry: self._sort_key(entry, search_query),  # type: ignore[arg-type]
-            )
+            key = (self.generation, search_query, amount)
+            result = self.cache.get(key)
+            if result is None:
+                if not search_query:
+                    result = list(self.index.values())
+                else:
+                    result = self.index.search(search_query, amount)
+                self.cache.set(key, result)
+            return result
+
+    def cache_stats(self) -> Dict[str, float]:
+        return {"generation": self.generation, **self.cache.stats()}
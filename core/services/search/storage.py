@@ -0,0 +1,101 @@
+import os
+from pathlib import Path
+from typing import Dict, Generic, Iterable, Iterator, List, Type, TypeVar
+
+import aiofiles
+
+from core.services.search.models import BaseEntry
+
+try:
+    import ujson as jsonlib
+except ImportError:
+    import json as jsonlib
+
+__all__ = ("EntryStorage",)
+
+T = TypeVar("T", bound=BaseEntry)
+
+
+class EntryStorage(Generic[T]):
+    """以 JSON Lines 保存的条目
+
+    每行一个条目，同一 key 以最后一行为准。新增或更新的条目只追加写入，
+    行数超过有效条目的 compact_ratio 倍时重写整个文件。
+    """
+
+    compact_ratio: int = 2
+    compact_min_lines: int = 64
+
+    def __init__(self, path: Path, model: Type[T], legacy_path: Path):
+        self.path = path
+        self.model = model
+        self.legacy_path = legacy_path
+        self.lines = 0
+
+    async def read_lines(self) -> Dict[str, str]:
+        """读取文件，返回 key 到未解析的条目数据，同一 key 只保留最后一行"""
+        self.lines = 0
+        if not self.path.exists():
+            return {}
+        async with aiofiles.open(self.path, "r", encoding="utf-8") as f:
+            content = await f.read()
+        raws: Dict[str, str] = {}
+        for line in content.splitlines():
+            if not line:
+                continue
+            self.lines += 1
+            key, _, raw = line.partition("\t")
+            if raw:
+                raws[key] = raw
+        return raws
+
+    async def read_legacy(self) -> List[dict]:
+        """读取旧版的整个 json 文件"""
+        if not self.legacy_path.exists():
+            return []
+        async with aiofiles.open(self.legacy_path, "r", encoding="utf-8") as f:
+            data = jsonlib.loads(await f.read())
+        return data.get("data") or []
+
+    def parse(self, raw: str) -> T:
+        # 数据由本服务写入，跳过校验
+        return self.model.construct(**jsonlib.loads(raw))
+
+    def iter_parse(self, raws: Dict[str, str]) -> Iterator[T]:
+        for raw in raws.values():
+            yield self.parse(raw)
+
+    @staticmethod
+    def dumps(entry: BaseEntry) -> str:
+        return f"{entry.key}\t{entry.json()}\n"
+
+    async def append(self, entries: Iterable[T]) -> int:
+        """追加写入新增或更新的条目"""
+        content = "".join(self.dumps(entry) for entry in entries)
+        if not content:
+            return 0
+        async with aiofiles.open(self.path, "a", encoding="utf-8") as f:
+            await f.write(content)
+        count = content.count("\n")
+        self.lines += count
+        return count
+
+    def need_compact(self, size: int) -> bool:
+        return self.lines > max(size * self.compact_ratio, self.compact_min_lines)
+
+    async def compact(self, entries: Iterable[T]) -> None:
+        """重写文件，只保留有效条目"""
+        content = "".join(self.dumps(entry) for entry in entries)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        async with aiofiles.open(temp_path, "w", encoding="utf-8") as f:
+            await f.write(content)
+        temp_path.replace(self.path)
+        self.lines = content.count("\n")
+        if self.legacy_path.exists():
+            os.remove(self.legacy_path)
+
+    def remove(self) -> None:
+        for path in (self.path, self.legacy_path):
+            if path.exists():
+                os.remove(path)
+        self.lines = 0
@@ -1,3 +1,130 @@
+"""TemplateService"""
+
+import hashlib
+from typing import Any, Dict, NamedTuple, Optional
+
+from pydantic.json import pydantic_encoder
+
+from core.base_service import BaseService
+from core.dependence.redisdb import RedisDB
 from gram_core.services.template.cache import HtmlToFileIdCache, TemplatePreviewCache
+from utils.models.cache import TTLCache
+
+try:
+    import ujson as jsonlib
+except ImportError:
+    import json as jsonlib
+
+__all__ = ["TemplatePreviewCache", "HtmlToFileIdCache", "RenderCache", "RenderCacheEntry", "RenderFileIdCache"]
+
+
+class RenderCacheEntry(NamedTuple):
+    html: str
+    photo: Optional[bytes] = None
+    file_id: Optional[str] = None
+
+
+class RenderCache(BaseService.Component):
+    """以模板版本、模板路径与渲染参数为键的渲染结果缓存
+
+    图片保存在进程内，按字节数进行 LRU 淘汰；上传后得到的 file_id 同时保存在 Redis 中。
+    渲染数据无法稳定序列化时不进行缓存。
+    """
+
+    max_bytes: int = 128 * 1024 * 1024
+    maxsize: int = 2048
+
+    def __init__(self, redis: RedisDB):
+        self.client = redis.client
+        self.qname = "bot:template:render"
+        self.local: TTLCache[str, RenderCacheEntry] = TTLCache(
+            maxsize=self.maxsize,
+            max_weight=self.max_bytes,
+            weigher=lambda entry: len(entry.html) + len(entry.photo or b""),
+        )
+        self.photo_hits = 0
+        self.file_id_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(template_name: str, template_data: Dict[str, Any], **kwargs) -> Optional[str]:
+        """计算缓存键
+
+        :param template_name: 模板路径
+        :param template_data: 渲染数据
+        :param kwargs: 模板版本、viewport、query_selector 等影响截图结果的参数
+        :return: 无法序列化渲染数据时返回 None
+        """
+        try:
+            data = jsonlib.dumps(
+                [template_name, template_data, kwargs], default=pydantic_encoder, sort_keys=True, ensure_ascii=False
+            )
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get_qname(self, key: str) -> str:
+        return f"{self.qname}:{key}"
+
+    async def get(self, key: str) -> Optional[RenderCacheEntry]:
+        entry = self.local.get(key)
+        # 进程内有图片或 file_id 时直接返回，只在进程内没有记录时查询 Redis
+        if entry is None:
+            file_id = await self.client.get(self.get_qname(key))
+            if file_id is not None:
+                entry = RenderCacheEntry(html="", file_id=str(file_id, encoding="utf-8"))
+        if entry is None:
+            self.misses += 1
+        elif entry.file_id:
+            self.file_id_hits += 1
+        else:
+            self.photo_hits += 1
+        return entry
+
+    def set_photo(self, key: str, html: str, photo: bytes, ttl: int) -> None:
+        self.local.set(key, RenderCacheEntry(html=html, photo=photo), ttl=ttl)
+
+    async def set_file_id(self, key: str, file_id: str, ttl: int, html: Optional[str] = None) -> None:
+        entry = self.local.pop(key)
+        html = html if html is not None else (entry.html if entry else "")
+        # 已经得到 file_id 后不再需要保存图片
+        self.local.set(key, RenderCacheEntry(html=html, file_id=file_id), ttl=ttl)
+        await self.client.set(self.get_qname(key), file_id, ex=ttl)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.photo_hits + self.file_id_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self.local),
+            "bytes": self.local.weight,
+            "photo_hits": self.photo_hits,
+            "file_id_hits": self.file_id_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class RenderFileIdCache:
+    """传递给 RenderResult 的 cache，上传后同时写入 RenderCache 与 HtmlToFileIdCache"""
+
+    def __init__(self, render_cache: RenderCache, key: str, html_to_file_id_cache: HtmlToFileIdCache, ttl: int):
+        self.render_cache = render_cache
+        self.key = key
+        self.html_to_file_id_cache = html_to_file_id_cache
+        self.ttl = ttl
+
+    def __getattr__(self, item):
+        return getattr(self.html_to_file_id_cache, item)
+
+    async def get_data(self, html: str, file_type: str) -> Optional[str]:
+        return await self.html_to_file_id_cache.get_data(html, file_type)
 
-__all__ = ["TemplatePreviewCache", "HtmlToFileIdCache"]
+    async def set_data(self, html: str, file_type: str, file_id: str, *args, **kwargs):
+        await self.render_cache.set_file_id(self.key, file_id, self.ttl, html=html)
+        if html:
+            return await self.html_to_file_id_cache.set_data(html, file_type, file_id, *args, **kwargs)
+        return None
@@ -5,4 +5,8 @@ from gram_core.services.template.error import (
     TemplateException,
 )
 
-__all__ = ("TemplateException", "QuerySelectorNotFound", "ErrorFileType", "FileIdNotFound")
+__all__ = ("TemplateException", "QuerySelectorNotFound", "ErrorFileType", "FileIdNotFound", "RenderQueueFull")
+
+
+class RenderQueueFull(TemplateException):
+    """渲染等待队列已满或等待页面超时"""
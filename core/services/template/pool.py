@@ -0,0 +1,216 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+
+from core.base_service import BaseService
+from core.config import PagePoolConfig
+from core.dependence.aiobrowser import AioBrowser
+from core.services.template.error import RenderQueueFull
+from core.services.template.route import AssetRouteCache
+from utils.log import logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+__all__ = ("PagePool", "RenderPriority")
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 720}
+
+
+class RenderPriority(IntEnum):
+    """渲染优先级，数值越小越先获得页面"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+class PooledPage:
+    __slots__ = ("page", "renders")
+
+    def __init__(self, page: "Page"):
+        self.page = page
+        self.renders = 0
+
+
+class RenderTimer:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "max": round(self.max, 4),
+        }
+
+
+class PagePool(BaseService.Component):
+    """预先创建的浏览器页面池
+
+    同时进行的渲染数量受页面数量限制，其余请求按优先级进入有界的等待队列，
+    交互命令优先于后台任务。页面渲染一定次数后重新创建，以免内存泄漏。
+    """
+
+    def __init__(self, browser: AioBrowser, asset_route: AssetRouteCache):
+        self.browser = browser
+        self.asset_route = asset_route
+        self.config = PagePoolConfig()
+        self._idle: List[PooledPage] = []
+        self._created = 0
+        """已创建或正在创建的页面数量"""
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self.wait_timer = RenderTimer()
+        self.render_timers: Dict[str, RenderTimer] = {}
+        self.rejected = 0
+
+    async def initialize(self) -> None:
+        try:
+            for _ in range(self.config.size - self._created):
+                self._created += 1
+                try:
+                    self._idle.append(await self._new_page())
+                except Exception as exc:
+                    self._created -= 1
+                    raise exc
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("预热浏览器页面失败 %s", str(exc))
+
+    async def shutdown(self) -> None:
+        for _, _, future in self._waiters:
+            future.cancel()
+        self._waiters.clear()
+        while self._idle:
+            await self._close_page(self._idle.pop())
+        self._created = 0
+
+    async def _new_page(self) -> PooledPage:
+        browser = await self.browser.get_browser()
+        page = await browser.new_page()
+        await self.asset_route.install(page)
+        return PooledPage(page)
+
+    @staticmethod
+    async def _close_page(pooled: PooledPage) -> None:
+        try:
+            await pooled.page.close()
+        except Exception as exc:  # pylint: disable=W0703
+            logger.debug("关闭浏览器页面失败 %s", str(exc))
+
+    def _wakeup(self, pooled: Optional[PooledPage]) -> bool:
+        """把页面交给优先级最高的等待者，pooled 为 None 时把创建页面的名额交给等待者"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if pooled is None:
+                self._created += 1
+            future.set_result(pooled)
+            return True
+        return False
+
+    async def acquire(self, priority: RenderPriority = RenderPriority.INTERACTIVE) -> PooledPage:
+        start_time = time.monotonic()
+        pooled: Optional[PooledPage] = None
+        while self._idle and not self._waiters:
+            pooled = self._idle.pop()
+            if not pooled.page.is_closed():
+                break
+            self._created -= 1
+            pooled = None
+        if pooled is None:
+            if self._created < self.config.size and not self._waiters:
+                self._created += 1
+            else:
+                pooled = await self._wait(priority)
+        if pooled is None:
+            try:
+                pooled = await self._new_page()
+            except Exception as exc:
+                self._created -= 1
+                self._wakeup(None)
+                raise exc
+        self.wait_timer.add(time.monotonic() - start_time)
+        return pooled
+
+    async def _wait(self, priority: RenderPriority) -> Optional[PooledPage]:
+        if len(self._waiters) >= self.config.max_queue:
+            self.rejected += 1
+            raise RenderQueueFull
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._counter), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            return await asyncio.wait_for(future, self.config.wait_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # 页面在超时的同时交给了当前请求，归还给其他等待者
+                await self.release(future.result())
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.rejected += 1
+                raise RenderQueueFull from exc
+            raise exc
+
+    async def release(self, pooled: Optional[PooledPage], discard: bool = False) -> None:
+        if pooled is None:
+            self._created -= 1
+            self._wakeup(None)
+            return
+        pooled.renders += 1
+        if discard or pooled.renders >= self.config.max_renders or pooled.page.is_closed():
+            self._created -= 1
+            self._wakeup(None)
+            await self._close_page(pooled)
+            return
+        if not self._wakeup(pooled):
+            self._idle.append(pooled)
+
+    @asynccontextmanager
+    async def page(
+        self, viewport: Optional[dict] = None, priority: RenderPriority = RenderPriority.INTERACTIVE
+    ) -> AsyncIterator["Page"]:
+        """获取页面，使用完毕后自动归还；出现异常的页面不会再被使用"""
+        pooled = await self.acquire(priority)
+        discard = True
+        try:
+            await pooled.page.set_viewport_size(viewport or DEFAULT_VIEWPORT)
+            yield pooled.page
+            discard = False
+        finally:
+            await self.release(pooled, discard)
+
+    def record_render(self, template_name: str, seconds: float) -> None:
+        timer = self.render_timers.get(template_name)
+        if timer is None:
+            timer = self.render_timers[template_name] = RenderTimer()
+        timer.add(seconds)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> Dict:
+        return {
+            "size": self._created,
+            "idle": len(self._idle),
+            "queue": self.queue_depth,
+            "rejected": self.rejected,
+            "wait": self.wait_timer.to_dict(),
+            "templates": {name: timer.to_dict() for name, timer in self.render_timers.items()},
+        }
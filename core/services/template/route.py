@@ -0,0 +1,124 @@
+import mimetypes
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+import aiofiles
+
+from core.base_service import BaseService
+from core.config import AssetRouteConfig
+from core.dependence.assets import AssetsService
+from utils.const import PROJECT_ROOT
+from utils.log import logger
+from utils.models.cache import TTLCache
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Route
+
+__all__ = ("AssetRouteCache",)
+
+CONTENT_TYPES = {
+    ".css": "text/css",
+    ".js": "text/javascript",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+}
+
+
+class AssetEntry(NamedTuple):
+    mtime: int
+    body: bytes
+    content_type: str
+
+
+class AssetRouteCache(BaseService.Component):
+    """拦截浏览器对 resources 目录下 file:// 资源的请求，从内存中返回
+
+    字体、角色图标、光锥图标与背景图在每次渲染时都会被读取，
+    缓存后不再读取磁盘，并带上 Cache-Control 让浏览器在同一页面的多次渲染之间复用。
+    文件修改后按 mtime 重新读取。RenderService 在渲染前已经下载模板数据中引用的素材，
+    其他素材（如样式表中引用的图片）还没有下载时由 AssetsService 按需下载。
+    """
+
+    def __init__(self, assets: AssetsService):
+        self.assets = assets
+        self.config = AssetRouteConfig()
+        self.root = PROJECT_ROOT.joinpath("resources").resolve()
+        self.cache: TTLCache[Path, AssetEntry] = TTLCache(
+            maxsize=0, max_weight=self.config.max_bytes, weigher=lambda entry: len(entry.body)
+        )
+
+    async def install(self, page: "Page") -> None:
+        if self.config.enable:
+            await page.route("file://**/*", self.handle)
+
+    def get_path(self, url: str) -> Optional[Path]:
+        """把 file:// URL 转换为 resources 目录下的文件路径，不在目录下时返回 None"""
+        parsed = urlparse(url)
+        if parsed.scheme != "file":
+            return None
+        path = Path(url2pathname(unquote(parsed.path)))
+        if path.suffix.lower() not in CONTENT_TYPES:
+            return None
+        try:
+            path = path.resolve()
+            path.relative_to(self.root)
+        except (OSError, ValueError):
+            return None
+        return path
+
+    async def get(self, path: Path) -> Optional[AssetEntry]:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if not await self.assets.fetch(path, missing=True):
+                return None
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+        entry = self.cache.get(path)
+        if entry is not None and entry.mtime == mtime:
+            return entry
+        async with aiofiles.open(path, "rb") as f:
+            body = await f.read()
+        content_type = CONTENT_TYPES.get(path.suffix.lower()) or mimetypes.guess_type(path.name)[0]
+        entry = AssetEntry(mtime, body, content_type or "application/octet-stream")
+        if len(body) <= self.config.max_file_size:
+            self.cache.set(path, entry)
+        return entry
+
+    async def handle(self, route: "Route") -> None:
+        path = self.get_path(route.request.url)
+        entry = None
+        if path is not None:
+            try:
+                entry = await self.get(path)
+            except OSError as exc:
+                logger.debug("读取渲染资源 %s 失败 %s", path, str(exc))
+        if entry is None:
+            await route.continue_()
+            return
+        await route.fulfill(
+            status=200,
+            body=entry.body,
+            headers={
+                "Content-Type": entry.content_type,
+                "Content-Length": str(len(entry.body)),
+                "Cache-Control": f"public, max-age={self.config.max_age}, immutable",
+                "Access-Control-Allow-Origin": "*",
+            },
+        )
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
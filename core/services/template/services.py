@@ -1,3 +1,339 @@
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup
+
+from core.base_service import BaseService
+from core.config import config as application_config
+from core.dependence.assets import AssetsService
+from core.services.template.cache import HtmlToFileIdCache, RenderCache, RenderFileIdCache
+from core.services.template.error import QuerySelectorNotFound
+from core.services.template.models import FileType, RenderResult
+from core.services.template.pool import PagePool, RenderPriority
 from gram_core.services.template.services import TemplateService, TemplatePreviewer
+from utils.const import PROJECT_ROOT
+from utils.log import logger
+
+if TYPE_CHECKING:
+    from jinja2 import Template
+    from playwright.async_api import Page
+
+__all__ = ("TemplateService", "TemplatePreviewer", "RenderService")
+
+
+class RenderService(BaseService):
+    """带有渲染缓存、页面池与批量渲染的模板渲染
+
+    模板由 TemplateService 加载。渲染前查询以模板版本、模板路径与渲染数据为键的缓存，命中时跳过浏览器渲染；
+    浏览器页面从 PagePool 中获取，并发渲染按优先级排队。渲染前先下载模板数据中引用的、还没有下载的素材。
+    """
+
+    version_check_interval: float = 10
+    """模板版本的缓存时间，超过后重新检查模板目录中文件的修改时间"""
+
+    def __init__(
+        self,
+        template_service: TemplateService,
+        html_to_file_id_cache: HtmlToFileIdCache,
+        render_cache: RenderCache,
+        page_pool: PagePool,
+        assets: AssetsService,
+    ):
+        self.template_service = template_service
+        self.html_to_file_id_cache = html_to_file_id_cache
+        self.render_cache = render_cache
+        self.page_pool = page_pool
+        self.assets = assets
+        self._versions: Dict[str, Tuple[float, int]] = {}
+        """模板目录到 (检查时间, 版本)"""
+
+    def get_template(self, template_name: str) -> "Template":
+        return self.template_service.get_template(template_name)
+
+    @staticmethod
+    def scan_template_version(directory: Path) -> int:
+        version = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith((".html", ".css", ".js")) and entry.is_file():
+                    version = max(version, entry.stat().st_mtime_ns)
+        return version
+
+    def get_template_version(self, template: "Template") -> int:
+        """模板所在目录中 html、css、js 文件的最新修改时间，模板或样式修改后缓存键随之改变
+
+        每个目录最多每 version_check_interval 秒扫描一次
+        """
+        directory = (PROJECT_ROOT / template.filename).parent
+        key = str(directory)
+        now = time.monotonic()
+        cached = self._versions.get(key)
+        if cached is not None and now - cached[0] < self.version_check_interval:
+            return cached[1]
+        version = self.scan_template_version(directory)
+        self._versions[key] = (now, version)
+        return version
+
+    def get_cache_key(self, template_name: str, template_data: dict, **kwargs) -> Optional[str]:
+        if application_config.debug:
+            return None
+        template = self.get_template(template_name)
+        return self.render_cache.get_key(
+            template_name, template_data, version=self.get_template_version(template), **kwargs
+        )
+
+    async def render(
+        self,
+        template_name: str,
+        template_data: dict,
+        viewport: Optional[dict] = None,
+        full_page: bool = True,
+        evaluate: Optional[str] = None,
+        query_selector: Optional[str] = None,
+        file_type: FileType = FileType.PHOTO,
+        ttl: int = 24 * 60 * 60,
+        caption: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+        filename: Optional[str] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        priority: RenderPriority = RenderPriority.INTERACTIVE,
+    ) -> RenderResult:
+        """模板渲染成图片
+        :param template_name: 模板文件名
+        :param template_data: 模板数据
+        :param viewport: 截图大小
+        :param full_page: 是否长截图
+        :param evaluate: 页面加载后运行的 js
+        :param query_selector: 截图选择器
+        :param file_type: 缓存的文件类型
+        :param ttl: 缓存时间
+        :param caption: 图片描述
+        :param parse_mode: 图片描述解析模式
+        :param filename: 文件名字
+        :param reply_markup: 图片按钮
+        :param priority: 等待浏览器页面时的优先级
+        :return: 图片
+        """
+        key = self.get_cache_key(
+            template_name,
+            template_data,
+            viewport=viewport,
+            full_page=full_page,
+            evaluate=evaluate,
+            query_selector=query_selector,
+            file_type=file_type.name,
+        )
+        if key is None:
+            return await self._render(
+                template_name,
+                template_data,
+                viewport=viewport,
+                full_page=full_page,
+                evaluate=evaluate,
+                query_selector=query_selector,
+                file_type=file_type,
+                ttl=ttl,
+                caption=caption,
+                parse_mode=parse_mode,
+                filename=filename,
+                reply_markup=reply_markup,
+                priority=priority,
+            )
+        cache = RenderFileIdCache(self.render_cache, key, self.html_to_file_id_cache, ttl)
+        entry = await self.render_cache.get(key)
+        if entry is not None:
+            return RenderResult(
+                html=entry.html,
+                photo=entry.file_id or entry.photo,
+                file_type=file_type,
+                cache=cache,
+                ttl=ttl,
+                caption=caption,
+                parse_mode=parse_mode,
+                filename=filename,
+                reply_markup=reply_markup,
+            )
+        result = await self._render(
+            template_name,
+            template_data,
+            viewport=viewport,
+            full_page=full_page,
+            evaluate=evaluate,
+            query_selector=query_selector,
+            file_type=file_type,
+            ttl=ttl,
+            caption=caption,
+            parse_mode=parse_mode,
+            filename=filename,
+            reply_markup=reply_markup,
+            priority=priority,
+        )
+        if isinstance(result.photo, bytes):
+            self.render_cache.set_photo(key, result.html, result.photo, ttl)
+        elif isinstance(result.photo, str):
+            await self.render_cache.set_file_id(key, result.photo, ttl, html=result.html)
+        result.cache = cache
+        return result
+
+    async def _screenshot(
+        self,
+        page: "Page",
+        html: str,
+        full_page: bool = True,
+        evaluate: Optional[str] = None,
+        query_selector: Optional[str] = None,
+    ) -> bytes:
+        await page.set_content(html, wait_until="networkidle")
+        if evaluate:
+            await page.evaluate(evaluate)
+        clip = None
+        if query_selector:
+            try:
+                card = await page.query_selector(query_selector)
+                if not card:
+                    raise QuerySelectorNotFound
+                clip = await card.bounding_box()
+                if clip is None:
+                    raise QuerySelectorNotFound
+            except QuerySelectorNotFound:
+                logger.warning("未找到 %s 元素", query_selector)
+        return await page.screenshot(clip=clip, full_page=full_page)
+
+    async def _render(
+        self,
+        template_name: str,
+        template_data: dict,
+        viewport: Optional[dict] = None,
+        full_page: bool = True,
+        evaluate: Optional[str] = None,
+        query_selector: Optional[str] = None,
+        file_type: FileType = FileType.PHOTO,
+        ttl: int = 24 * 60 * 60,
+        caption: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+        filename: Optional[str] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        priority: RenderPriority = RenderPriority.INTERACTIVE,
+    ) -> RenderResult:
+        start_time = time.time()
+        template = self.get_template(template_name)
+        html = await template.render_async(**template_data)
+        logger.debug("%s 模板渲染使用了 %s", template_name, str(time.time() - start_time))
+
+        file_id = await self.html_to_file_id_cache.get_data(html, file_type.name)
+        if file_id and not application_config.debug:
+            logger.debug("%s 命中缓存，返回输出 %s", template_name, str(time.time() - start_time))
+            return RenderResult(
+                html=html,
+                photo=file_id,
+                file_type=file_type,
+                cache=self.html_to_file_id_cache,
+                ttl=ttl,
+                caption=caption,
+                parse_mode=parse_mode,
+                filename=filename,
+                reply_markup=reply_markup,
+            )
+
+        await self.assets.ensure_uris(template_data)
+        async with self.page_pool.page(viewport, priority) as page:
+            start_time = time.time()
+            await page.goto((PROJECT_ROOT / template.filename).as_uri())
+            png_data = await self._screenshot(page, html, full_page, evaluate, query_selector)
+        render_time = time.time() - start_time
+        self.page_pool.record_render(template_name, render_time)
+        logger.debug("%s 图片渲染使用了 %s", template_name, str(render_time))
+        return RenderResult(
+            html=html,
+            photo=png_data,
+            file_type=file_type,
+            cache=self.html_to_file_id_cache,
+            ttl=ttl,
+            caption=caption,
+            parse_mode=parse_mode,
+            filename=filename,
+            reply_markup=reply_markup,
+        )
+
+    async def render_batch(
+        self,
+        template_name: str,
+        sections: List[dict],
+        viewport: Optional[dict] = None,
+        full_page: bool = True,
+        evaluate: Optional[str] = None,
+        query_selector: Optional[str] = None,
+        file_type: FileType = FileType.PHOTO,
+        ttl: int = 24 * 60 * 60,
+        priority: RenderPriority = RenderPriority.INTERACTIVE,
+    ) -> List[RenderResult]:
+        """在同一个页面中依次渲染同一模板的多组数据
 
-__all__ = ("TemplateService", "TemplatePreviewer")
+        页面只获取一次，模板目录只加载一次，之后每组数据只替换页面内容，
+        浏览器会复用已经解码的字体与图片。截图方式与 render 相同。
+        每组数据仍然各自排版、绘制与截图一次：模板都是完整的 HTML 页面，样式作用于 body 与全局选择器，
+        合并到同一个文档中按元素裁剪会互相影响，因此节省的只是获取页面、导航与资源解码的开销。
+        :param template_name: 模板文件名
+        :param sections: 每张图片的模板数据
+        :param viewport: 截图大小
+        :param full_page: 是否长截图
+        :param evaluate: 页面加载后运行的 js
+        :param query_selector: 截图选择器
+        :param file_type: 缓存的文件类型
+        :param ttl: 缓存时间
+        :param priority: 等待浏览器页面时的优先级
+        :return: 与 sections 顺序一致的图片
+        """
+        if not sections:
+            return []
+        template = self.get_template(template_name)
+        htmls = [await template.render_async(**template_data) for template_data in sections]
+        keys = [
+            self.get_cache_key(
+                template_name,
+                template_data,
+                viewport=viewport,
+                full_page=full_page,
+                evaluate=evaluate,
+                query_selector=query_selector,
+                file_type=file_type.name,
+            )
+            for template_data in sections
+        ]
+        photos: List[Optional[str]] = [None] * len(htmls)
+        if not application_config.debug:
+            for index, (html, key) in enumerate(zip(htmls, keys)):
+                entry = await self.render_cache.get(key) if key is not None else None
+                if entry is not None:
+                    photos[index] = entry.file_id or entry.photo
+                else:
+                    photos[index] = await self.html_to_file_id_cache.get_data(html, file_type.name)
+        pending = [index for index, photo in enumerate(photos) if not photo]
+        if pending:
+            await self.assets.ensure_uris([sections[index] for index in pending])
+            async with self.page_pool.page(viewport, priority) as page:
+                start_time = time.time()
+                await page.goto((PROJECT_ROOT / template.filename).as_uri())
+                for index in pending:
+                    photos[index] = await self._screenshot(page, htmls[index], full_page, evaluate, query_selector)
+                    if keys[index] is not None:
+                        self.render_cache.set_photo(keys[index], htmls[index], photos[index], ttl)
+            render_time = time.time() - start_time
+            self.page_pool.record_render(template_name, render_time)
+            logger.debug("%s 批量渲染 %s 张图片使用了 %s", template_name, len(pending), str(render_time))
+        return [
+            RenderResult(
+                html=html,
+                photo=photo,
+                file_type=file_type,
+                cache=(
+                    RenderFileIdCache(self.render_cache, key, self.html_to_file_id_cache, ttl)
+                    if key is not None
+                    else self.html_to_file_id_cache
+                ),
+                ttl=ttl,
+            )
+            for html, photo, key in zip(htmls, photos, keys)
+        ]
@@ -1,3 +1,5 @@
+import asyncio
+
 from core.base_service import BaseService
 from modules.wiki.character import Character
 from modules.wiki.light_cone import LightCone
@@ -19,26 +21,41 @@ class WikiService(BaseService):
 
     async def initialize(self) -> None:
         logger.info("正在加载 Wiki 数据")
-        try:
-            await self.character.read()
-            await self.light_cone.read()
-            await self.material.read()
-            await self.raider.read()
-            await self.relic.read()
-        except Exception as e:
-            logger.error("加载 Wiki 数据失败", exc_info=e)
+        results = await asyncio.gather(
+            self.character.read(),
+            self.light_cone.read(),
+            self.material.read(),
+            self.raider.read(),
+            self.relic.read(),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("加载 Wiki 数据失败", exc_info=result)
         logger.info("加载 Wiki 数据完成")
 
     async def refresh_wiki(self) -> None:
         logger.info("正在重新获取Wiki")
-        logger.info("正在重新获取角色信息")
-        await self.character.refresh()
-        logger.info("正在重新获取光锥信息")
-        await self.light_cone.refresh()
-        logger.info("正在重新获取材料信息")
-        await self.material.refresh()
-        logger.info("正在重新获取攻略信息")
-        await self.raider.refresh()
-        logger.info("正在重新获取遗器信息")
-        await self.relic.refresh()
+        components = {
+            "角色信息": self.character,
+            "光锥信息": self.light_cone,
+            "材料信息": self.material,
+            "攻略信息": self.raider,
+            "遗器信息": self.relic,
+        }
+        # 各部分互不依赖，并发获取；没有变化的部分不会重新下载和解析
+        results = await asyncio.gather(
+            *(component.refresh() for component in components.values()), return_exceptions=True
+        )
+        error = None
+        for name, result in zip(components, results):
+            if isinstance(result, Exception):
+                logger.error("重新获取%s失败", name, exc_info=result)
+                error = error or result
+            elif result:
+                logger.info("%s已更新", name)
+            else:
+                logger.info("%s没有变化", name)
+        if error is not None:
+            raise error
         logger.info("刷新成功")
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import functools
 from typing import Any, Generic, ItemsView, Iterator, KeysView, Optional, TypeVar, ValuesView
 
@@ -11,6 +12,14 @@ from utils.const import PROJECT_ROOT
 from utils.log import logger
 from utils.typedefs import StrOrInt
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 __all__ = (
     "HONEY_DATA",
     "AVATAR_DATA",
@@ -23,6 +32,7 @@ __all__ = (
     "Data",
     "weapon_to_game_id",
     "avatar_to_game_id",
+    "reload_data",
 )
 
 K = TypeVar("K")
@@ -38,21 +48,37 @@ class Data(dict, Generic[K, V]):
     _dict: dict[K, V]
     _file_name: str
 
+    @property
+    def path(self):
+        return data_dir.joinpath(self._file_name).with_suffix(".json")
+
+    def load(self) -> dict[K, V]:
+        """读取并解析文件，会阻塞，在事件循环中请使用 reload"""
+        path = self.path
+        if not path.exists():
+            logger.error(
+                '暂未找到名为 "%s" 的 metadata , ' "请先使用 [yellow bold]/refresh_metadata[/] 命令下载",
+                self._file_name,
+                extra={"markup": True},
+            )
+            return {}
+        content = path.read_bytes()
+        return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+    async def reload(self) -> dict[K, V]:
+        """在线程中重新读取文件，不阻塞事件循环"""
+        result = await asyncio.to_thread(self.load)
+        _cache[self._file_name] = self._dict = result
+        return result
+
     @property
     def data(self) -> dict[K, V]:
         if (result := _cache.get(self._file_name)) not in [None, {}]:
             self._dict = result
         else:
-            path = data_dir.joinpath(self._file_name).with_suffix(".json")
-            if not path.exists():
-                logger.error(
-                    '暂未找到名为 "%s" 的 metadata , ' "请先使用 [yellow bold]/refresh_metadata[/] 命令下载",
-                    self._file_name,
-                    extra={"markup": True},
-                )
-                self._dict = {}
-            with open(path, encoding="utf-8") as file:
-                self._dict = json.load(file)
+            # 启动时未能加载时只能同步读取
+            logger.debug('metadata "%s" 未预加载', self._file_name)
+            self._dict = self.load()
             _cache.update({self._file_name: self._dict})
         return self._dict
 
@@ -100,6 +126,22 @@ MATERIAL_DATA: dict[str, dict[str, int | str]] = Data("material")
 ARTIFACT_DATA: dict[str, dict[str, int | str | list[int] | dict[str, str]]] = Data("reliquary")
 NAMECARD_DATA: dict[str, dict[str, int | str]] = Data("namecard")
 
+_all_data = (HONEY_DATA, AVATAR_DATA, WEAPON_DATA, MATERIAL_DATA, ARTIFACT_DATA, NAMECARD_DATA)
+
+
+def _clear_lookup_cache() -> None:
+    for func in (honey_id_to_game_id, game_id_to_role_id, weapon_to_game_id, avatar_to_game_id):
+        func.cache_clear()
+
+
+async def reload_data() -> None:
+    """在线程中加载全部已下载的 metadata，启动时预加载以及文件更新后调用"""
+    datas = [data for data in _all_data if data.path.exists()]
+    await asyncio.gather(*(data.reload() for data in datas))
+    _clear_lookup_cache()
+    if datas:
+        logger.info("加载 metadata 成功 %s", ", ".join(data._file_name for data in datas))
+
 
 @functools.lru_cache()
 def honey_id_to_game_id(honey_id: str, item_type: str) -> str | None:
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-import functools
-from typing import List
+from typing import Dict, List
 
 __all__ = [
     "roles",
@@ -14,6 +13,7 @@ __all__ = [
     "not_real_roles",
     "roleToTag",
     "lightConeToTag",
+    "rebuild",
 ]
 
 # noinspection SpellCheckingInspection
@@ -181,55 +181,78 @@ light_cones = {
 }
 
 
+_role_names: Dict[str, str] = {}
+_role_ids: Dict[str, int] = {}
+_role_tags: Dict[str, List[str]] = {}
+_light_cone_names: Dict[str, str] = {}
+_light_cone_ids: Dict[str, int] = {}
+_light_cone_tags: Dict[str, List[str]] = {}
+
+
+def _build_index(
+    data: Dict[int, List[str]], names: Dict[str, str], ids: Dict[str, int], tags: Dict[str, List[str]]
+) -> None:
+    names.clear()
+    ids.clear()
+    tags.clear()
+    for key, value in data.items():
+        tags.setdefault(str.casefold(value[0]), value)
+        for name in value:
+            # 与按顺序查找相同，同名时以先出现的为准
+            name = str.casefold(name)
+            names.setdefault(name, value[0])
+            ids.setdefault(name, key)
+
+
+def rebuild() -> None:
+    """重建昵称到正式名与 ID 的索引，修改 roles 或 light_cones 后需要调用"""
+    _build_index(roles, _role_names, _role_ids, _role_tags)
+    _build_index(light_cones, _light_cone_names, _light_cone_ids, _light_cone_tags)
+
+
+rebuild()
+
+
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def roleToName(shortname: str) -> str:
     """将角色昵称转为正式名"""
     shortname = str.casefold(shortname)  # 忽略大小写
-    return next((value[0] for value in roles.values() for name in value if name == shortname), shortname)
+    return _role_names.get(shortname, shortname)
 
 
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def roleToId(name: str) -> int | None:
     """获取角色ID"""
-    name = str.casefold(name)
-    return next((key for key, value in roles.items() for n in value if n == name), None)
+    return _role_ids.get(str.casefold(name))
 
 
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def idToRole(aid: int) -> str | None:
     """获取角色名"""
     return roles.get(aid, [None])[0]
 
 
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def lightConeToName(shortname: str) -> str:
     """将光锥昵称转为正式名"""
     shortname = str.casefold(shortname)  # 忽略大小写
-    return next((value[0] for value in light_cones.values() for name in value if name == shortname), shortname)
+    return _light_cone_names.get(shortname, shortname)
 
 
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def lightConeToId(name: str) -> int | None:
     """获取光锥ID"""
-    name = str.casefold(name)
-    return next((key for key, value in light_cones.items() for n in value if n == name), None)
+    return _light_cone_ids.get(str.casefold(name))
 
 
 # noinspection PyPep8Naming
-@functools.lru_cache()
 def roleToTag(role_name: str) -> List[str]:
     """通过角色名获取TAG"""
     role_name = str.casefold(role_name)
-    return next((value for value in roles.values() if value[0] == role_name), [role_name])
+    return _role_tags.get(role_name, [role_name])
 
 
-@functools.lru_cache()
 def lightConeToTag(name: str) -> List[str]:
     """通过光锥名获取TAG"""
     name = str.casefold(name)
-    return next((value for value in light_cones.values() if value[0] == name), [name])
+    return _light_cone_tags.get(name, [name])
@@ -1,15 +1,21 @@
+import asyncio
+import copy
 from decimal import Decimal
+from importlib.util import find_spec
 from typing import List, Optional, Union, Dict
 
 import ujson
-from httpx import AsyncClient, TimeoutException
+from httpx import AsyncClient, Limits, Response, Timeout, TimeoutException, TransportError
 from pydantic import BaseModel
 
-from core.config import config
+from core.config import PlayerCardsConfig, config
 from modules.playercards.fight_prop import EquipmentsStats
+from modules.playercards.relic_table import PROPS, RelicAffixTable
 from modules.wiki.base import WikiModel
 from modules.wiki.models.relic_affix import RelicAffixAll
 from utils.enkanetwork import RedisCache
+from utils.models.cache import TTLCache
+from utils.models.single_flight import SingleFlight
 from modules.playercards.file import PlayerCardsFile
 
 
@@ -98,14 +104,50 @@ class PlayerCards:
     url = "https://api.mihomo.me/sr_info/"
     url2 = "https://api.mihomo.me/sr_info_parsed/"
     prop_url = f"{WikiModel.BASE_URL}relic_config.json"
+    _client: Optional[AsyncClient] = None
+    """所有实例共用的连接池"""
+    _flight: SingleFlight = SingleFlight()
+    """合并所有实例中对同一 uid 的并发请求"""
+    _sr_info_cache: TTLCache[str, Dict] = TTLCache(maxsize=1024, ttl=60)
+    """最近请求到的 sr_info detailInfo，供 get_player_base_info 复用"""
 
     def __init__(self, redis):
         self.cache = RedisCache(redis.client, key="plugin:player_cards:fake_enka_network", ex=60)
         self.headers = {"User-Agent": config.enka_network_api_agent}
-        self.client = AsyncClient()
+        self.config = PlayerCardsConfig()
         self.player_cards_file = PlayerCardsFile()
         self.init = False
         self.relic_datas_map: Dict[int, RelicAffixAll] = {}
+        self.relic_table = RelicAffixTable({})
+
+    @property
+    def client(self) -> AsyncClient:
+        if PlayerCards._client is None or PlayerCards._client.is_closed:
+            PlayerCards._client = AsyncClient(
+                timeout=Timeout(self.config.timeout, connect=self.config.connect_timeout),
+                limits=Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry,
+                ),
+                http2=self.config.http2 and find_spec("h2") is not None,
+            )
+        return PlayerCards._client
+
+    async def request(self, url: str) -> Response:
+        """带重试的 GET 请求，超时、连接失败或 5xx、429 时按退避时间重试"""
+        for attempt in range(self.config.retries + 1):
+            last = attempt >= self.config.retries
+            try:
+                response = await self.client.get(url, headers=self.headers)
+            except TransportError as exc:
+                if last:
+                    raise exc
+            else:
+                if last or (response.status_code < 500 and response.status_code != 429):
+                    return response
+            await asyncio.sleep(self.config.retry_backoff * 2**attempt)
+        raise PlayerCardsError("请求异常")
 
     async def async_init(self):
         if self.init:
@@ -115,12 +157,13 @@ class PlayerCards:
         data = req.json()
         for i in data:
             self.relic_datas_map[i["id"]] = RelicAffixAll(**i)
+        self.relic_table = RelicAffixTable(self.relic_datas_map)
         self.init = True
 
     async def get_property(self, uid: str) -> Dict[int, List[Dict]]:
         final_data: Dict[int, List[Dict]] = {}
         try:
-            user = await self.client.get(self.url2 + uid, timeout=30, headers=self.headers)
+            user = await self.request(self.url2 + uid)
             if user.status_code != 200:
                 raise PlayerCardsError("请求异常")
             data = ujson.loads(user.text)
@@ -152,45 +195,72 @@ class PlayerCards:
                         datas.append(prop)
                         datas_map[prop.name] = prop
                 final_data[cid] = [i.dict() for i in datas]
-        except (TimeoutException, PlayerCardsError):
+        except (TransportError, PlayerCardsError):
             pass
         return final_data
 
+    async def get_sr_info(self, uid: Union[str, int]) -> Dict:
+        """请求 sr_info 并返回 detailInfo，对同一 uid 的并发请求只会发出一次"""
+        uid = str(uid)
+        return await self._flight.do(("sr_info", uid), lambda: self._get_sr_info(uid))
+
+    async def _get_sr_info(self, uid: str) -> Dict:
+        user = await self.request(f"{self.url}{uid}")
+        if user.status_code != 200:
+            raise PlayerCardsError(f"请求异常，错误代码 {user.status_code}")
+        data = ujson.loads(user.text)
+        error_code = data.get("ErrCode", 0)
+        if error_code:
+            raise PlayerCardsError(f"请求异常，错误代码 {error_code}")
+        data = data.get("detailInfo", {})
+        self._sr_info_cache.set(uid, data)
+        return data
+
     async def update_data(self, uid: str) -> Union[PlayerInfo, str]:
+        """获取玩家信息，sr_info 与 sr_info_parsed 两个请求并发进行
+
+        :param uid: UID
+        """
         try:
             data = await self.cache.get(uid)
             if data is not None:
                 return PlayerInfo.parse_obj(data)
-            user = await self.client.get(self.url + uid, timeout=30, headers=self.headers)
-            if user.status_code != 200:
-                raise PlayerCardsError(f"请求异常，错误代码 {user.status_code}")
-            data = ujson.loads(user.text)
-            error_code = data.get("ErrCode", 0)
-            if error_code:
-                raise PlayerCardsError(f"请求异常，错误代码 {error_code}")
-            data = data.get("detailInfo", {})
-            props = await self.get_property(uid)
-            data = await self.player_cards_file.merge_info(uid, data, props)
-            await self.cache.set(uid, data)
+            data = await self._flight.do(("update", uid), lambda: self._update_data(uid))
             return PlayerInfo.parse_obj(data)
         except TimeoutException:
             error = "服务请求超时，请稍后重试"
+        except TransportError:
+            error = "服务请求失败，请稍后重试"
         except PlayerCardsError as e:
             error = e.msg
         return error
 
+    async def _update_data(self, uid: str) -> Dict:
+        props_task = asyncio.create_task(self.get_property(uid))
+        try:
+            # merge_info 会修改嵌套的数据，深复制一份避免影响 _sr_info_cache
+            data = copy.deepcopy(await self.get_sr_info(uid))
+        except BaseException as exc:
+            props_task.cancel()
+            raise exc
+        props = await props_task
+        data = await self.player_cards_file.merge_info(uid, data, props)
+        await self.cache.set(uid, data)
+        return data
+
     async def get_player_base_info(self, uid: int) -> PlayerBaseInfo:
+        """获取玩家基础信息，优先复用最近一分钟内请求到的 sr_info"""
+        data = self._sr_info_cache.get(str(uid))
+        if data is None:
+            data = await self.cache.get(str(uid))
+        if data is not None:
+            return PlayerBaseInfo.parse_obj(data)
         try:
-            user = await self.client.get(f"{self.url}{uid}", timeout=30, headers=self.headers)
-            if user.status_code != 200:
-                raise PlayerCardsError(f"请求异常，错误代码 {user.status_code}")
-            data = ujson.loads(user.text)
-            error_code = data.get("ErrCode", 0)
-            if error_code:
-                raise PlayerCardsError(f"请求异常，错误代码 {error_code}")
-            return PlayerBaseInfo.parse_obj(data["detailInfo"])
+            return PlayerBaseInfo.parse_obj(await self.get_sr_info(uid))
         except TimeoutException as e:
             raise PlayerCardsError("服务请求超时，请稍后重试") from e
+        except TransportError as e:
+            raise PlayerCardsError("服务请求失败，请稍后重试") from e
 
     def get_affix_by_id(self, cid: int) -> RelicAffixAll:
         return self.relic_datas_map.get(cid)
@@ -201,29 +271,15 @@ class PlayerCards:
         return 101
 
     def get_affix(self, relic: Relic, main: bool = True, sub: bool = True) -> List[EquipmentsStats]:
-        affix = self.get_affix_by_id(relic.tid)
-        if not affix:
-            return []
-        main_affix = affix.main_affix[str(relic.mainAffixId)]
-        datas = (
-            [
-                EquipmentsStats(
-                    prop_id=main_affix.property,
-                    prop_value=main_affix.get_value(relic.level),
-                )
-            ]
-            if main
-            else []
-        )
-        if not sub:
-            return datas
-        if relic.subAffixList:
+        """从预编译的数值表获取遗器词条，不存在的词条会被跳过"""
+        datas = []
+        if main:
+            item = self.relic_table.get_main(relic.tid, relic.mainAffixId, relic.level or 0)
+            if item is not None:
+                datas.append(EquipmentsStats.construct(prop_id=PROPS[item[0]], prop_value=item[1]))
+        if sub and relic.subAffixList:
             for sub_a in relic.subAffixList:
-                sub_affix = affix.sub_affix[str(sub_a.affixId)]
-                datas.append(
-                    EquipmentsStats(
-                        prop_id=sub_affix.property,
-                        prop_value=sub_affix.get_value(sub_a.step, sub_a.cnt),
-                    )
-                )
+                item = self.relic_table.get_sub(relic.tid, sub_a.affixId, sub_a.step or 0, sub_a.cnt or 1)
+                if item is not None:
+                    datas.append(EquipmentsStats.construct(prop_id=PROPS[item[0]], prop_value=item[1]))
         return datas
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from core.config import DamageCalConfig
+from utils.log import logger
+from utils.models.cache import TTLCache
+
+try:
+    import ujson as jsonlib
+except ImportError:
+    import json as jsonlib
+
+try:
+    from starrail_damage_cal.mihomo.models import Avatar as DamageAvatar
+    from starrail_damage_cal.to_data import get_data as get_damage_data
+    from starrail_damage_cal.cal_damage import cal_info as cal_damage_info
+    from msgspec import convert as msgspec_convert
+
+    STARRAIL_ARTIFACT_FUNCTION_AVAILABLE = True
+except ImportError:
+    DamageAvatar = None
+    get_damage_data = None
+    cal_damage_info = None
+    msgspec_convert = None
+
+    STARRAIL_ARTIFACT_FUNCTION_AVAILABLE = False
+
+__all__ = ("DamageCalculator", "STARRAIL_ARTIFACT_FUNCTION_AVAILABLE")
+
+
+async def _cal_damage(data: Dict[str, Any], uid: str) -> List:
+    avatar = msgspec_convert(data, type=DamageAvatar)
+    damage_data = await get_damage_data(avatar, "", uid)
+    return await cal_damage_info(damage_data[0])
+
+
+def _cal_damage_sync(data: Dict[str, Any], uid: str) -> List:
+    """在进程池中执行"""
+    return asyncio.run(_cal_damage(data, uid))
+
+
+class DamageCalculator:
+    """调用 starrail_damage_cal 计算角色伤害
+
+    计算在进程池中进行以免阻塞事件循环，结果按角色配装的 hash 缓存，同一配装只计算一次。
+    计算超时后会结束进程池中的全部进程并重建进程池，卡住的计算不会一直占用进程。
+    """
+
+    def __init__(self, config: Optional[DamageCalConfig] = None):
+        self.config = config or DamageCalConfig()
+        self.cache: TTLCache[str, List] = TTLCache(maxsize=self.config.cache_size, ttl=self.config.cache_ttl)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return STARRAIL_ARTIFACT_FUNCTION_AVAILABLE
+
+    def initialize(self) -> None:
+        if self.available and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max(1, self.config.workers), mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def recycle(self) -> None:
+        """结束进程池中的全部进程并重建进程池"""
+        executor = self._executor
+        self._executor = None
+        if executor is not None:
+            # ProcessPoolExecutor 没有提供结束运行中任务的接口
+            for process in list(getattr(executor, "_processes", {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.initialize()
+
+    @staticmethod
+    def get_build_hash(data: Dict[str, Any]) -> str:
+        """角色、等级、星魂、技能、光锥与遗器决定计算结果"""
+        return hashlib.sha1(jsonlib.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()  # nosec
+
+    async def cal(self, uid: str, data: Dict[str, Any]) -> List:
+        """计算伤害
+
+        :param uid: UID
+        :param data: 角色数据，不包含 property
+        :return: 伤害信息
+        """
+        key = self.get_build_hash(data)
+        damage_info = self.cache.get(key)
+        if damage_info is not None:
+            return damage_info
+        if self._executor is None:
+            self.initialize()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, _cal_damage_sync, data, uid)
+        try:
+            damage_info = await asyncio.wait_for(future, self.config.timeout)
+        except asyncio.TimeoutError as exc:
+            logger.warning("计算角色伤害超时 uid[%s] avatar[%s]，正在重建进程池", uid, data.get("avatarId"))
+            self.recycle()
+            raise exc
+        self.cache.set(key, damage_info)
+        return damage_info
@@ -1,6 +1,6 @@
 import asyncio
 from pathlib import Path
-from typing import Optional, Dict, Union
+from typing import Optional, Dict, List, Tuple, Union
 
 import aiofiles
 
@@ -11,13 +11,32 @@ try:
 except ImportError:
     import json as jsonlib
 
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
 
 PLAYER_CARDS_PATH = PROJECT_ROOT.joinpath("data", "apihelper", "player_cards")
 PLAYER_CARDS_PATH.mkdir(parents=True, exist_ok=True)
 
+LOCK_STRIPES = 64
+
 
 class PlayerCardsFile:
-    _lock = asyncio.Lock()
+    """角色展柜历史记录
+
+    每个 uid 一个文件，第一行为玩家信息，之后每行为 `avatarId\\t角色数据`。
+    合并时被新数据覆盖的旧角色不会被解析；保留的旧角色仍需解析后返回，但未修改时直接写回原始数据，不重新序列化。
+    安装 zstandard 后以 zstd 压缩保存。
+    旧版的 `uid.json` 文件在下一次写入时会被转换。
+    """
+
+    _locks: Tuple[asyncio.Lock, ...] = tuple(asyncio.Lock() for _ in range(LOCK_STRIPES))
+    compress: bool = True
 
     def __init__(self, player_cards_path: Path = PLAYER_CARDS_PATH):
         self.player_cards_path = player_cards_path
@@ -27,18 +46,75 @@ class PlayerCardsFile:
         async with aiofiles.open(path, "r", encoding="utf-8") as f:
             return jsonlib.loads(await f.read())
 
-    @staticmethod
-    async def save_json(path, data: Dict):
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            return await f.write(jsonlib.dumps(data, ensure_ascii=False, indent=4))
+    def get_lock(self, uid: Union[str, int]) -> asyncio.Lock:
+        """同一 uid 的写入互斥，不同 uid 的写入分散到不同的锁上"""
+        return self._locks[int(uid) % len(self._locks)]
 
     def get_file_path(self, uid: Union[str, int]):
-        """获取文件路径
+        """获取旧版 json 文件路径
         :param uid: UID
         :return: 文件路径
         """
         return self.player_cards_path / f"{uid}.json"
 
+    def get_lines_path(self, uid: Union[str, int], compress: bool) -> Path:
+        return self.player_cards_path / (f"{uid}.jsonl.zst" if compress else f"{uid}.jsonl")
+
+    async def load_history_lines(self, uid: Union[str, int]) -> Optional[Tuple[Dict, Dict[int, str]]]:
+        """读取历史记录但不解析角色数据
+
+        :param uid: uid
+        :return: (玩家信息, avatarId 到未解析的角色数据的映射)
+        """
+        for compress in (True, False):
+            path = self.get_lines_path(uid, compress)
+            if not path.exists():
+                continue
+            if compress and not ZSTD_AVAILABLE:
+                # 忽略压缩文件会让下一次写入覆盖掉其中的历史记录
+                raise RuntimeError(f"读取 {path.name} 需要安装 zstandard")
+            async with aiofiles.open(path, "rb") as f:
+                content = await f.read()
+            if compress:
+                content = zstandard.ZstdDecompressor().decompress(content)
+            try:
+                info_line, *avatar_lines = content.decode("utf-8").split("\n")
+                info = jsonlib.loads(info_line)
+            except (UnicodeDecodeError, ValueError):
+                return None
+            avatars = {}
+            for line in avatar_lines:
+                avatar_id, _, raw = line.partition("\t")
+                if raw:
+                    avatars[int(avatar_id)] = raw
+            return info, avatars
+        file_path = self.get_file_path(uid)
+        if not file_path.exists():
+            return None
+        try:
+            data = await self.load_json(file_path)
+        except jsonlib.JSONDecodeError:
+            return None
+        avatars = {i.get("avatarId", 0): jsonlib.dumps(i, ensure_ascii=False) for i in data.pop("avatarList", [])}
+        return data, avatars
+
+    async def save_history_lines(self, uid: Union[str, int], data: Dict, avatars: List[Tuple[int, str]]) -> None:
+        compress = self.compress and ZSTD_AVAILABLE
+        info = {k: v for k, v in data.items() if k != "avatarList"}
+        lines = [jsonlib.dumps(info, ensure_ascii=False)]
+        lines.extend(f"{avatar_id}\t{raw}" for avatar_id, raw in avatars)
+        content = "\n".join(lines).encode("utf-8")
+        if compress:
+            content = zstandard.ZstdCompressor().compress(content)
+        path = self.get_lines_path(uid, compress)
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(content)
+        temp_path.replace(path)
+        self.get_file_path(uid).unlink(missing_ok=True)
+        if ZSTD_AVAILABLE:  # 未安装 zstandard 时无法读取压缩文件，保留以免丢失数据
+            self.get_lines_path(uid, not compress).unlink(missing_ok=True)
+
     async def load_history_info(
         self,
         uid: Union[str, int],
@@ -47,13 +123,15 @@ class PlayerCardsFile:
         :param uid: uid
         :return: 角色历史记录数据
         """
-        file_path = self.get_file_path(uid)
-        if not file_path.exists():
+        history = await self.load_history_lines(uid)
+        if history is None:
             return None
+        info, avatars = history
         try:
-            return await self.load_json(file_path)
-        except jsonlib.JSONDecodeError:
+            info["avatarList"] = [jsonlib.loads(raw) for raw in avatars.values()]
+        except ValueError:
             return None
+        return info
 
     async def merge_info(
         self,
@@ -65,32 +143,39 @@ class PlayerCardsFile:
         avatarId = "avatarId"
         avatarDetailList = "avatarDetailList"
         avatarList = "avatarList"
-        async with self._lock:
-            old_data = await self.load_history_info(uid)
-            if old_data is None:
-                old_data = {}
+        async with self.get_lock(uid):
+            history = await self.load_history_lines(uid)
+            old_avatars = history[1] if history is not None else {}
             avatars = []
-            avatar_ids = []
-            for avatar in data.get(assistAvatarList, []):
-                avatars.append(avatar)
-                avatar_ids.append(avatar.get(avatarId, 0))
-            for avatar in data.get(avatarDetailList, []):
+            avatar_ids = set()
+            for avatar in data.get(assistAvatarList, []) + data.get(avatarDetailList, []):
                 if avatar.get(avatarId, 0) in avatar_ids:
                     continue
                 avatars.append(avatar)
-                avatar_ids.append(avatar.get(avatarId, 0))
+                avatar_ids.add(avatar.get(avatarId, 0))
             data[avatarList] = avatars
             if assistAvatarList in data:
                 del data[assistAvatarList]
             if avatarDetailList in data:
                 del data[avatarDetailList]
-            for i in old_data.get(avatarList, []):
-                if i.get(avatarId, 0) not in avatar_ids:
-                    data[avatarList].append(i)
-            for i in data[avatarList]:
+            for i in avatars:
                 if property_ := props.get(i.get(avatarId, 0)):
                     i["property"] = property_
                 if i.get("property") is None:
                     i["property"] = []
-            await self.save_json(self.get_file_path(uid), data)
+            lines = [(i.get(avatarId, 0), jsonlib.dumps(i, ensure_ascii=False)) for i in avatars]
+            for old_id, raw in old_avatars.items():
+                if old_id in avatar_ids:
+                    continue
+                # 只解析需要保留的旧角色
+                avatar = jsonlib.loads(raw)
+                if property_ := props.get(old_id):
+                    avatar["property"] = property_
+                    raw = jsonlib.dumps(avatar, ensure_ascii=False)
+                elif avatar.get("property") is None:
+                    avatar["property"] = []
+                    raw = jsonlib.dumps(avatar, ensure_ascii=False)
+                avatars.append(avatar)
+                lines.append((old_id, raw))
+            await self.save_history_lines(uid, data, lines)
             return data
@@ -1,36 +1,71 @@
-import os
-from typing import Dict
+from array import array
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
 
-from modules.playercards.fight_prop import FightPropScore, EquipmentsStats, nameToFightProp, FightProp
+from modules.playercards.fight_prop import FightPropScore, nameToFightProp, FightProp
+from modules.playercards.relic_table import PROP_INDEX, PROPS, RelicAffixTable
 from modules.wiki.models.enums import RelicAffix
 
+if TYPE_CHECKING:
+    from modules.apihelper.client.components.player_cards import Relic
 
-class ArtifactStatsTheory:
-    def __init__(self, character_name: str, fight_prop_rule_data: Dict[str, Dict[str, float]]):
-        self.character_name = character_name
-        self.fight_prop_rules = fight_prop_rule_data.get(self.character_name, {})
-        fight_prop_rule_list = list(self.fight_prop_rules.keys())
-        self.main_prop = [nameToFightProp(fight_prop_rule) for fight_prop_rule in fight_prop_rule_list]
-        if not self.main_prop:
-            self.main_prop = [
-                RelicAffix.CriticalChanceBase,
-                RelicAffix.CriticalDamageBase,
-                RelicAffix.SpeedDelta,
-                RelicAffix.AttackAddedRatio,
-            ]
-
-    def theory(self, sub_stats: EquipmentsStats) -> float:
-        """圣遗物词条评分
-        Args:
-            sub_stats: 圣遗物对象
-        Returns:
-            返回得分
-        """
-        score: float = 0
-        if sub_stats.prop_id in self.main_prop:
-            base_value = 100.0 if sub_stats.prop_value < 1 else 1.0
-            weight = self.fight_prop_rules.get(FightProp(sub_stats.prop_id), 0.0)
+DEFAULT_MAIN_PROP = [
+    RelicAffix.CriticalChanceBase,
+    RelicAffix.CriticalDamageBase,
+    RelicAffix.SpeedDelta,
+    RelicAffix.AttackAddedRatio,
+]
+
+
+class RelicScorer:
+    """批量计算遗器副词条评分
+
+    只有角色的 fight_prop_rule 中的词条（没有规则时为 DEFAULT_MAIN_PROP）计分，
+    得分为 权重 * 数值，百分比词条的数值乘以 100。
+    角色权重在第一次使用时展开为按词条下标访问的数组，词条数值从 RelicAffixTable 中读取。
+    """
+
+    def __init__(self, table: RelicAffixTable, fight_prop_rule_data: Dict[str, Dict[str, float]]):
+        self.table = table
+        self.fight_prop_rule_data = fight_prop_rule_data
+        self._weights: Dict[str, array] = {}
+
+    def get_weights(self, character_name: str) -> array:
+        weights = self._weights.get(character_name)
+        if weights is not None:
+            return weights
+        fight_prop_rules = self.fight_prop_rule_data.get(character_name, {})
+        main_prop = [nameToFightProp(fight_prop_rule) for fight_prop_rule in fight_prop_rules] or DEFAULT_MAIN_PROP
+        weights = array("d", [0.0]) * len(PROPS)
+        for prop in main_prop:
+            if prop is None:
+                continue
+            weight = fight_prop_rules.get(FightProp(prop), 0.0)
             if weight == 0.0:
-                weight = FightPropScore(sub_stats.prop_id)
-            score = float(weight * sub_stats.prop_value * base_value)
-        return round(score, 1)
+                weight = FightPropScore(prop) or 0.0
+            weights[PROP_INDEX[prop]] = weight
+        self._weights[character_name] = weights
+        return weights
+
+    def score_relics(self, avatars: Sequence[Tuple[str, Sequence["Relic"]]]) -> List[List[List[float]]]:
+        """一次计算多个角色全部遗器的副词条评分
+
+        :param avatars: (角色名称, 遗器列表) 的列表
+        :return: 按角色、遗器、副词条排列的评分，不存在的副词条会被跳过
+        """
+        get_sub = self.table.get_sub
+        results = []
+        for character_name, relics in avatars:
+            weights = self.get_weights(character_name)
+            avatar_scores = []
+            for relic in relics:
+                scores = []
+                for sub in relic.subAffixList or []:
+                    item = get_sub(relic.tid, sub.affixId, sub.step or 0, sub.cnt or 1)
+                    if item is None:
+                        continue
+                    weight = weights[item[0]]
+                    value = item[1]
+                    scores.append(round(weight * value * (100.0 if value < 1 else 1.0), 1) if weight else 0.0)
+                avatar_scores.append(scores)
+            results.append(avatar_scores)
+        return results
@@ -0,0 +1,95 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from modules.wiki.models.enums import RelicAffix
+from modules.wiki.models.relic_affix import RelicAffixAll, SingleRelicAffix
+
+__all__ = ("RelicAffixTable", "PROPS", "PROP_INDEX")
+
+PROPS: List[RelicAffix] = list(RelicAffix)
+"""词条下标到词条类型"""
+PROP_INDEX: Dict[RelicAffix, int] = {prop: index for index, prop in enumerate(PROPS)}
+"""词条类型到下标"""
+
+MAX_SUB_CNT = 6
+"""副词条最多的出现次数（初始 1 次 + 强化 5 次）"""
+
+
+class RelicAffixTable:
+    """将 relic_datas_map 预编译为数值表
+
+    遗器按 tid 映射到主、副词条组，同组的词条数值完全相同，因此数值表按
+    (词条组, affixId) 存储：主词条为每个等级的数值，副词条为 (cnt, step) 展开的数值，
+    查询时只需要下标访问，不再构造 Decimal 与 pydantic 对象。
+    """
+
+    def __init__(self, relic_datas_map: Dict[int, RelicAffixAll]):
+        self.relics: Dict[int, Tuple[int, int]] = {}
+        """tid 到 (主词条组, 副词条组)"""
+        self.main: Dict[Tuple[int, int], Tuple[int, array, SingleRelicAffix]] = {}
+        """(主词条组, affixId) 到 (词条下标, 每个等级的数值, 原始数据)"""
+        self.sub: Dict[Tuple[int, int], Tuple[int, int, array, SingleRelicAffix]] = {}
+        """(副词条组, affixId) 到 (词条下标, 每次出现的最大 step, 按 cnt * stride + step 展开的数值, 原始数据)"""
+        self._fallback: Dict[Tuple[int, int], SingleRelicAffix] = {}
+        """无法展开的副词条，按 (tid, affixId) 保存原始数据"""
+        for tid, relic in relic_datas_map.items():
+            self.relics[tid] = (relic.main_affix_group, relic.sub_affix_group)
+            for key, affix in relic.main_affix.items():
+                table_key = (relic.main_affix_group, int(key))
+                if table_key not in self.main:
+                    values = array("d", (affix.get_value(level) for level in range(relic.max_level + 1)))
+                    self.main[table_key] = (PROP_INDEX[affix.property], values, affix)
+            for key, affix in relic.sub_affix.items():
+                table_key = (relic.sub_affix_group, int(key))
+                if table_key in self.sub:
+                    continue
+                if affix.max_step is None:
+                    self._fallback[(tid, int(key))] = affix
+                    continue
+                stride = affix.max_step * MAX_SUB_CNT + 1
+                values = array("d", [0.0]) * (stride * (MAX_SUB_CNT + 1))
+                for cnt in range(1, MAX_SUB_CNT + 1):
+                    for step in range(affix.max_step * cnt + 1):
+                        values[cnt * stride + step] = affix.get_value(step, cnt)
+                self.sub[table_key] = (PROP_INDEX[affix.property], affix.max_step, values, affix)
+
+    def __contains__(self, tid: int) -> bool:
+        return tid in self.relics
+
+    def get_main(self, tid: int, affix_id: int, level: int) -> Optional[Tuple[int, float]]:
+        """获取主词条
+
+        :return: (词条下标, 数值)，遗器或词条不存在时返回 None
+        """
+        groups = self.relics.get(tid)
+        if groups is None:
+            return None
+        item = self.main.get((groups[0], affix_id))
+        if item is None:
+            return None
+        prop, values, affix = item
+        if 0 <= level < len(values):
+            return prop, values[level]
+        # 超出最大等级时使用 Decimal 计算，与展开的数值一致
+        return prop, affix.get_value(level)
+
+    def get_sub(self, tid: int, affix_id: int, step: int, cnt: int) -> Optional[Tuple[int, float]]:
+        """获取副词条
+
+        :return: (词条下标, 数值)，遗器或词条不存在时返回 None
+        """
+        groups = self.relics.get(tid)
+        if groups is None:
+            return None
+        item = self.sub.get((groups[1], affix_id))
+        if item is None:
+            affix = self._fallback.get((tid, affix_id))
+            if affix is None:
+                return None
+            return PROP_INDEX[affix.property], affix.get_value(step, cnt)
+        prop, max_step, values, affix = item
+        stride = max_step * MAX_SUB_CNT + 1
+        if 0 < cnt <= MAX_SUB_CNT and 0 <= step <= max_step * cnt:
+            return prop, values[cnt * stride + step]
+        # 超出预编译范围时使用 Decimal 计算，与展开的数值一致
+        return prop, affix.get_value(step, cnt)
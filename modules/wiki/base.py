@@ -1,15 +1,28 @@
+import asyncio
+import hashlib
+import os
+import pickle  # nosec B403
+import tempfile
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Type, TypeVar
 
 import aiofiles
 import ujson as jsonlib
-from httpx import AsyncClient
+from httpx import AsyncClient, Response
+from pydantic import BaseModel
+
+from utils.log import logger
+
+T = TypeVar("T", bound=BaseModel)
 
 
 class WikiModel:
     BASE_URL = "https://starrail-res.paimon.vip/data/"
     BASE_PATH = Path("data/wiki")
     BASE_PATH.mkdir(parents=True, exist_ok=True)
+    SNAPSHOT_VERSION = 1
+    """快照格式变化时需要增加版本号，使旧的快照失效；模型结构的变化由 schema 摘要检测"""
+    _schema_digests: Dict[Type[BaseModel], str] = {}
 
     def __init__(self):
         self.client = AsyncClient(timeout=120.0)
@@ -17,6 +30,43 @@ class WikiModel:
     async def remote_get(self, url: str):
         return await self.client.get(url)
 
+    @staticmethod
+    def get_meta_path(path: Path) -> Path:
+        return path.with_suffix(".meta.json")
+
+    async def remote_get_if_modified(self, url: str, path: Path) -> Optional[Response]:
+        """使用 ETag 与 Last-Modified 发起条件请求，远程数据与上次保存的相同时返回 None
+
+        :param url: 远程数据地址
+        :param path: 保存数据的本地文件，不存在时总是下载
+        """
+        meta_path = self.get_meta_path(path)
+        meta = {}
+        if path.exists() and meta_path.exists():
+            meta = await WikiModel.read(meta_path)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        response = await self.client.get(url, headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        # 不支持条件请求时比较内容的哈希
+        if meta.get("hash") == hashlib.sha256(response.content).hexdigest():
+            return None
+        return response
+
+    async def save_meta(self, response: Response, path: Path) -> None:
+        """数据保存成功后记录 ETag 与内容哈希，供下次条件请求使用"""
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "hash": hashlib.sha256(response.content).hexdigest(),
+        }
+        await self.dump(meta, self.get_meta_path(path))
+
     @staticmethod
     async def dump(datas, path: Path):
         async with aiofiles.open(path, "w", encoding="utf-8") as f:
@@ -37,3 +87,68 @@ class WikiModel:
     async def read_file(path: Path):
         async with aiofiles.open(path, "rb") as f:
             return await f.read()
+
+    @staticmethod
+    def get_snapshot_path(path: Path) -> Path:
+        return path.with_suffix(".pickle")
+
+    @classmethod
+    def load_snapshot(cls, path: Path, digest: str) -> Optional[list]:
+        """加载快照，版本或源文件哈希不一致时返回 None"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                # 快照由本程序写入 data 目录
+                snapshot = pickle.load(f)  # nosec B301
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("读取 Wiki 快照 %s 失败 %s", path.name, str(exc))
+            return None
+        if snapshot.get("version") != cls.SNAPSHOT_VERSION or snapshot.get("hash") != digest:
+            return None
+        return snapshot["data"]
+
+    @classmethod
+    def save_snapshot(cls, path: Path, digest: str, data: list) -> None:
+        # 每次写入使用独立的临时文件，并发写入同一快照时不会互相覆盖
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, suffix=".tmp", delete=False) as f:
+            temp_path = Path(f.name)
+            try:
+                pickle.dump(
+                    {"version": cls.SNAPSHOT_VERSION, "hash": digest, "data": data},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            except BaseException:
+                f.close()
+                temp_path.unlink(missing_ok=True)
+                raise
+        os.replace(temp_path, path)
+
+    @classmethod
+    def get_schema_digest(cls, model: Type[BaseModel]) -> str:
+        """模型 schema 的摘要，模型字段变化后快照随之失效"""
+        digest = cls._schema_digests.get(model)
+        if digest is None:
+            digest = hashlib.sha256(model.schema_json().encode("utf-8")).hexdigest()
+            cls._schema_digests[model] = digest
+        return digest
+
+    async def read_models(self, path: Path, model: Type[T]) -> List[T]:
+        """读取数据并解析为模型
+
+        源文件与模型 schema 的哈希都与快照一致时直接加载快照，跳过 JSON 解析与模型校验；否则解析后重新生成快照
+        """
+        content = await self.read_file(path)
+        digest = f"{hashlib.sha256(content).hexdigest()}:{self.get_schema_digest(model)}"
+        snapshot_path = self.get_snapshot_path(path)
+        models = await asyncio.to_thread(self.load_snapshot, snapshot_path, digest)
+        if models is not None:
+            return models
+        models = [model(**data) for data in jsonlib.loads(content)]
+        del content
+        try:
+            await asyncio.to_thread(self.save_snapshot, snapshot_path, digest, models)
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("保存 Wiki 快照 %s 失败 %s", snapshot_path.name, str(exc))
+        return models
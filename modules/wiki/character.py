@@ -19,19 +19,23 @@ class Character(WikiModel):
         self.all_avatars_map.clear()
         self.all_avatars_name.clear()
 
-    async def refresh(self):
-        datas = await self.remote_get(self.avatar_url)
+    async def refresh(self) -> bool:
+        """重新获取数据，远程数据没有变化时返回 False"""
+        datas = await self.remote_get_if_modified(self.avatar_url, self.avatar_path)
+        if datas is None:
+            return False
         await self.dump(datas.json(), self.avatar_path)
+        await self.save_meta(datas, self.avatar_path)
         await self.read()
+        return True
 
     async def read(self):
         if not self.avatar_path.exists():
             await self.refresh()
             return
-        datas = await WikiModel.read(self.avatar_path)
+        models = await self.read_models(self.avatar_path, YattaAvatar)
         self.clear_class_data()
-        for data in datas:
-            m = YattaAvatar(**data)
+        for m in models:
             self.all_avatars.append(m)
             self.all_avatars_map[m.id] = m
             self.all_avatars_name[m.name] = m
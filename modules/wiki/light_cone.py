@@ -19,19 +19,23 @@ class LightCone(WikiModel):
         self.all_light_cones_map.clear()
         self.all_light_cones_name.clear()
 
-    async def refresh(self):
-        datas = await self.remote_get(self.light_cone_url)
+    async def refresh(self) -> bool:
+        """重新获取数据，远程数据没有变化时返回 False"""
+        datas = await self.remote_get_if_modified(self.light_cone_url, self.light_cone_path)
+        if datas is None:
+            return False
         await self.dump(datas.json(), self.light_cone_path)
+        await self.save_meta(datas, self.light_cone_path)
         await self.read()
+        return True
 
     async def read(self):
         if not self.light_cone_path.exists():
             await self.refresh()
             return
-        datas = await WikiModel.read(self.light_cone_path)
+        models = await self.read_models(self.light_cone_path, YattaLightCone)
         self.clear_class_data()
-        for data in datas:
-            m = YattaLightCone(**data)
+        for m in models:
             self.all_light_cones.append(m)
             self.all_light_cones_map[m.id] = m
             self.all_light_cones_name[m.name] = m
@@ -19,19 +19,23 @@ class Material(WikiModel):
         self.all_materials_map.clear()
         self.all_materials_name.clear()
 
-    async def refresh(self):
-        datas = await self.remote_get(self.material_url)
+    async def refresh(self) -> bool:
+        """重新获取数据，远程数据没有变化时返回 False"""
+        datas = await self.remote_get_if_modified(self.material_url, self.material_path)
+        if datas is None:
+            return False
         await self.dump(datas.json(), self.material_path)
+        await self.save_meta(datas, self.material_path)
         await self.read()
+        return True
 
     async def read(self):
         if not self.material_path.exists():
             await self.refresh()
             return
-        datas = await WikiModel.read(self.material_path)
+        models = await self.read_models(self.material_path, YattaMaterial)
         self.clear_class_data()
-        for data in datas:
-            m = YattaMaterial(**data)
+        for m in models:
             self.all_materials.append(m)
             self.all_materials_map[m.id] = m
             self.all_materials_name[m.name] = m
@@ -1,5 +1,6 @@
 import asyncio
-from typing import List, Dict
+import hashlib
+from typing import List, Dict, Iterable, Tuple
 from modules.wiki.base import WikiModel
 
 
@@ -11,6 +12,10 @@ class Raider(WikiModel):
     raider_light_cone_path = WikiModel.BASE_PATH / "raiders" / "light_cone"
     raider_relic_path = WikiModel.BASE_PATH / "raiders" / "relic"
     raider_info_path = WikiModel.BASE_PATH / "raiders" / "path.json"
+    raider_manifest_path = WikiModel.BASE_PATH / "raiders" / "manifest.json"
+    """图片清单，记录每张图片的上游路径、ETag、Last-Modified、大小与内容哈希"""
+    concurrency: int = 8
+    """同时下载的图片数量"""
     raider_role_path.mkdir(parents=True, exist_ok=True)
     raider_guide_for_role_path.mkdir(parents=True, exist_ok=True)
     raider_light_cone_path.mkdir(parents=True, exist_ok=True)
@@ -24,6 +29,7 @@ class Raider(WikiModel):
 
     def __init__(self):
         super().__init__()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
         self.all_role_raiders: List[str] = []
         self.all_guide_for_role_raiders: List[str] = []
         self.all_light_cone_raiders: List[str] = []
@@ -35,22 +41,103 @@ class Raider(WikiModel):
         self.all_light_cone_raiders.clear()
         self.all_relic_raiders.clear()
 
-    async def refresh_task(self, name: str, path: str = "", start: str = ""):
-        photo = await self.remote_get(f"{self.raider_url}{path}")
-        await self.save_file(photo.content, self.raider_path / start / f"{name}.png")
+    async def refresh_task(self, name: str, path: str, start: str, manifest: Dict[str, Dict]) -> bool:
+        """下载单张图片，内容没有变化时不写入
 
-    async def refresh(self):
-        datas = await self.remote_get(self.raider_url + "/path.json")
+        本地文件与清单一致时使用 ETag 与 Last-Modified 条件请求；
+        上游不提供这两者时先发起 HEAD 请求，Content-Length 与清单中的大小相同时不下载
+
+        :return: 本地图片是否被更新
+        """
+        key = f"{start}/{name}"
+        file_path = self.raider_path / start / f"{name}.png"
+        url = f"{self.raider_url}{path}"
+        entry = manifest.get(key)
+        if not (entry and entry.get("path") == path and file_path.exists()):
+            entry = None
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        async with self.semaphore:
+            if entry and not headers and entry.get("size") is not None:
+                head = await self.client.head(url)
+                if head.status_code == 200 and head.headers.get("Content-Length") == str(entry["size"]):
+                    return False
+            photo = await self.client.get(url, headers=headers)
+        if photo.status_code == 304:
+            return False
+        photo.raise_for_status()
+        digest = hashlib.sha256(photo.content).hexdigest()
+        changed = not (entry and entry.get("hash") == digest and file_path.exists())
+        if changed:
+            temp_path = file_path.with_suffix(".tmp")
+            await self.save_file(photo.content, temp_path)
+            temp_path.replace(file_path)
+        manifest[key] = {
+            "path": path,
+            "etag": photo.headers.get("ETag"),
+            "last_modified": photo.headers.get("Last-Modified"),
+            "size": len(photo.content),
+            "hash": digest,
+        }
+        return changed
+
+    async def refresh_images(self, items: Iterable[Tuple[str, str, str]], manifest: Dict[str, Dict]) -> bool:
+        """并发刷新图片，已下载的图片先记录到清单，部分失败时抛出第一个异常
+
+        :param items: (名称, 上游路径, 分类目录) 的列表
+        :return: 是否有图片被更新
+        """
+        results = await asyncio.gather(
+            *(self.refresh_task(name, path, start, manifest) for name, path, start in items), return_exceptions=True
+        )
+        await self.dump(manifest, self.raider_manifest_path)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return any(results)
+
+    async def read_manifest(self) -> Dict[str, Dict]:
+        if not self.raider_manifest_path.exists():
+            return {}
+        return await WikiModel.read(self.raider_manifest_path)  # noqa
+
+    def prune(self, data: Dict[str, List[str]], manifest: Dict[str, Dict]) -> None:
+        """删除上游已经移除的图片"""
+        for start, names in data.items():
+            names = set(names)
+            for file_path in (self.raider_path / start).glob("*.png"):
+                if file_path.stem not in names:
+                    file_path.unlink(missing_ok=True)
+                    manifest.pop(f"{start}/{file_path.stem}", None)
+        keys = {f"{start}/{name}" for start, names in data.items() for name in names}
+        for key in list(manifest.keys()):
+            if key not in keys:
+                del manifest[key]
+
+    async def refresh(self) -> bool:
+        """重新获取攻略，path.json 没有变化时直接返回 False
+
+        path.json 的 ETag、Last-Modified 或内容哈希与上次相同时不检查图片；
+        否则只下载清单中没有或已经变化的图片，并删除上游已经移除的图片
+        """
+        datas = await self.remote_get_if_modified(self.raider_url + "/path.json", self.raider_info_path)
+        if datas is None:
+            return False
+        manifest = await self.read_manifest()
         data = datas.json()
-        new_data = {}
-        for key, start in self.name_map.items():
-            new_data[start] = list(data[key].keys())
-            tasks = []
-            for name, path in data[key].items():
-                tasks.append(self.refresh_task(name, path, start))
-            await asyncio.gather(*tasks)
+        new_data = {start: list(data[key].keys()) for key, start in self.name_map.items()}
+        self.prune(new_data, manifest)
+        # 部分图片下载失败时不更新 path.json，下次刷新只重试失败的图片
+        await self.refresh_images(
+            [(name, path, start) for key, start in self.name_map.items() for name, path in data[key].items()], manifest
+        )
         await self.dump(new_data, self.raider_info_path)
+        await self.save_meta(datas, self.raider_info_path)
         await self.read()
+        return True
 
     async def read(self):
         if not self.raider_info_path.exists():
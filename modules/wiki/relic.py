@@ -19,19 +19,23 @@ class Relic(WikiModel):
         self.all_relics_map.clear()
         self.all_relics_name.clear()
 
-    async def refresh(self):
-        datas = await self.remote_get(self.relic_url)
+    async def refresh(self) -> bool:
+        """重新获取数据，远程数据没有变化时返回 False"""
+        datas = await self.remote_get_if_modified(self.relic_url, self.relic_path)
+        if datas is None:
+            return False
         await self.dump(datas.json(), self.relic_path)
+        await self.save_meta(datas, self.relic_path)
         await self.read()
+        return True
 
     async def read(self):
         if not self.relic_path.exists():
             await self.refresh()
             return
-        datas = await WikiModel.read(self.relic_path)
+        models = await self.read_models(self.relic_path, YattaRelic)
         self.clear_class_data()
-        for data in datas:
-            m = YattaRelic(**data)
+        for m in models:
             self.all_relics.append(m)
             self.all_relics_map[m.id] = m
             self.all_relics_name[m.name] = m
@@ -15,7 +15,7 @@ from core.services.cookies.models import CookiesDataBase as Cookies, CookiesStat
 from core.services.cookies.services import CookiesService
 from core.services.players.models import PlayersDataBase as Player, PlayerInfoSQLModel
 from core.services.players.services import PlayersService, PlayerInfoService
-from gram_core.services.devices import DevicesService
+from core.services.devices import DevicesService
 from gram_core.services.devices.models import DevicesDataBase as Devices
 from modules.apihelper.models.genshin.cookies import CookiesModel
 from utils.log import logger
@@ -19,8 +19,8 @@ from gram_core.basemodel import RegionEnum
 from gram_core.config import config
 from gram_core.dependence.redisdb import RedisDB
 from gram_core.plugin import Plugin, handler
-from gram_core.services.cookies import CookiesService
-from gram_core.services.devices import DevicesService
+from core.services.cookies import CookiesService
+from core.services.devices import DevicesService
 from utils.log import logger
 
 try:
@@ -4,9 +4,9 @@ from sqlalchemy.orm.exc import StaleDataError
 
 from core.services.players.services import PlayerInfoService
 from gram_core.plugin.methods.migrate_data import IMigrateData, MigrateDataException
-from gram_core.services.cookies import CookiesService
+from core.services.cookies import CookiesService
 from gram_core.services.cookies.models import CookiesDataBase as Cookies
-from gram_core.services.players import PlayersService
+from core.services.players import PlayersService
 from gram_core.services.players.models import PlayersDataBase as Player, PlayerInfoSQLModel as PlayerInfo
 
 
@@ -12,7 +12,7 @@ from core.services.cookies import CookiesService
 from core.services.players import PlayersService
 from core.services.players.services import PlayerInfoService
 from gram_core.services.cookies.models import CookiesStatusEnum
-from gram_core.services.devices import DevicesService
+from core.services.devices import DevicesService
 from modules.apihelper.models.genshin.cookies import CookiesModel
 from utils.log import logger
 
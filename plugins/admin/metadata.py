@@ -0,0 +1,19 @@
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from core.plugin import Plugin, handler
+from metadata.genshin import reload_data
+
+
+class MetadataPlugin(Plugin):
+    """有关 metadata 操作"""
+
+    async def initialize(self) -> None:
+        await reload_data()
+
+    @handler.command("reload_metadata", block=False, admin=True)
+    async def reload_metadata(self, update: Update, _: CallbackContext):
+        message = update.effective_message
+        msg = await message.reply_text("正在重新加载 metadata，请稍等")
+        await reload_data()
+        await msg.edit_text("重新加载 metadata 成功")
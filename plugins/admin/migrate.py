@@ -5,7 +5,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from core.plugin import Plugin, handler
 from gram_core.plugin.methods.migrate_data import IMigrateData, MigrateDataException
-from gram_core.services.players import PlayersService
+from core.services.players import PlayersService
 from utils.log import logger
 
 if TYPE_CHECKING:
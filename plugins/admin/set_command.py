@@ -63,6 +63,7 @@ class SetCommandPlugin(Plugin):
             BotCommand("add_admin", "添加管理员"),
             BotCommand("del_admin", "删除管理员"),
             BotCommand("refresh_wiki", "刷新Wiki缓存"),
+            BotCommand("reload_metadata", "重新加载 metadata"),
             BotCommand("save_entry", "保存条目数据"),
             BotCommand("remove_all_entry", "删除全部条目数据"),
             BotCommand("sign_all", "全部账号重新签到"),
@@ -1,7 +1,8 @@
 import asyncio
-from typing import Awaitable, Dict, List, cast
-from uuid import uuid4
+import hashlib
+from typing import Awaitable, Dict, List, Tuple, cast
 
+from pypinyin import Style, lazy_pinyin
 from telegram import (
     InlineQuery,
     InlineQueryResultArticle,
@@ -15,11 +16,53 @@ from telegram.constants import ParseMode
 from telegram.error import BadRequest
 from telegram.ext import CallbackContext
 
+from core.config import InlineConfig
 from core.dependence.assets import AssetsService
 from core.plugin import Plugin, handler
 from core.services.search.services import SearchServices
 from core.services.wiki.services import WikiService
+from metadata.shortname import light_cones, roles
 from utils.log import logger
+from utils.models.trie import PrefixTrie
+
+LIST_QUERIES: Dict[str, Tuple[str, str]] = {
+    "查看角色攻略列表并查询": ("characters_list", "角色攻略查询"),
+    "查看角色图鉴列表并查询": ("characters_guide_list", "角色图鉴查询"),
+    "查看角色培养素材列表并查询": ("characters_material_list", "角色培养素材查询"),
+    "查看光锥列表并查询": ("light_cone_list", "光锥图鉴查询"),
+    "查看遗器套装列表并查询": ("relics_list", "遗器套装查询"),
+}
+"""列表查询到 (列表属性名, 选择后发送的命令)"""
+
+LIST_ALIASES: Dict[str, Dict[int, List[str]]] = {
+    "characters_list": roles,
+    "characters_guide_list": roles,
+    "characters_material_list": roles,
+    "light_cone_list": light_cones,
+}
+"""列表中的名称可以使用的别名"""
+
+
+def get_alias_map(aliases: Dict[int, List[str]]) -> Dict[str, List[str]]:
+    """正式名到别名的映射"""
+    return {value[0]: value[1:] for value in aliases.values() if value}
+
+
+def get_aliases(name: str, alias_map: Dict[str, List[str]]) -> List[Tuple[str, int]]:
+    """获取名称的别名与拼音
+
+    :return: (别名, 排名)，正式名为 0，别名为 1，拼音为 2
+    """
+    result = [(name, 0)]
+    result.extend((alias, 1) for alias in alias_map.get(name, []))
+    result.append(("".join(lazy_pinyin(name)), 2))
+    result.append(("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)), 2))
+    return result
+
+
+def get_result_id(*args: str) -> str:
+    """相同内容的结果使用相同的 id，Telegram 才能缓存"""
+    return hashlib.md5("|".join(args).encode("utf-8")).hexdigest()  # nosec
 
 
 class Inline(Plugin):
@@ -40,7 +83,49 @@ class Inline(Plugin):
         self.light_cone_list: List[Dict[str, str]] = []
         self.relics_list: List[Dict[str, str]] = []
         self.refresh_task: List[Awaitable] = []
+        self.loaded = False
         self.search_service = search_service
+        self.config = InlineConfig()
+        self.list_results: Dict[str, List[InlineQueryResultArticle]] = {}
+        self.list_trie: PrefixTrie[InlineQueryResultArticle] = PrefixTrie()
+        self.help_results: List[InlineQueryResultArticle] = [
+            InlineQueryResultArticle(
+                id=get_result_id("help", title),
+                title=title,
+                description=description,
+                input_message_content=InputTextMessageContent(title),
+            )
+            for title, description in (
+                ("光锥图鉴查询", "输入光锥名称即可查询光锥图鉴"),
+                ("角色攻略查询", "输入角色名即可查询角色攻略图鉴"),
+                ("角色图鉴查询", "输入角色名即可查询角色图鉴"),
+                ("角色培养素材查询", "输入角色名即可查询角色培养素材图鉴"),
+                ("遗器套装查询", "输入遗器套装名称即可查询遗器套装图鉴"),
+            )
+        ]
+
+    def build_list_results(self) -> None:
+        """预先生成列表查询的结果，并以名称、别名与拼音建立前缀树"""
+        list_results = {}
+        list_trie: PrefixTrie[InlineQueryResultArticle] = PrefixTrie()
+        for query, (attr, command) in LIST_QUERIES.items():
+            results = list_results[query] = []
+            alias_map = get_alias_map(LIST_ALIASES.get(attr, {}))
+            for item in getattr(self, attr):
+                result = InlineQueryResultArticle(
+                    id=get_result_id(query, item["name"]),
+                    title=item["name"],
+                    description=f"{query} {item['name']}",
+                    thumbnail_url=item["icon"],
+                    input_message_content=InputTextMessageContent(
+                        f"{command}{item['name']}", parse_mode=ParseMode.MARKDOWN_V2
+                    ),
+                )
+                results.append(result)
+                for alias, rank in get_aliases(item["name"], alias_map):
+                    list_trie.insert(alias, result, rank)
+        self.list_results = list_results
+        self.list_trie = list_trie
 
     async def initialize(self):
         async def task_light_cone():
@@ -59,6 +144,7 @@ class Inline(Plugin):
                     self.light_cone_list.append({"name": light_cone, "icon": light_cone_datas[light_cone]})
                 else:
                     logger.warning(f"未找到光锥 {light_cone} 的图标，inline 不显示此光锥")
+            self.build_list_results()
             logger.success("Inline 模块获取光锥列表完成")
 
         async def task_relics():
@@ -76,6 +162,7 @@ class Inline(Plugin):
                     self.relics_list.append({"name": relics, "icon": relics_datas[relics]})
                 else:
                     logger.warning(f"未找到遗器 {relics} 的图标，inline 不显示此遗器")
+            self.build_list_results()
             logger.success("Inline 模块获取遗器列表完成")
 
         async def task_characters():
@@ -114,11 +201,18 @@ class Inline(Plugin):
                         if character.startswith(key) or character.endswith(key):
                             self.characters_guide_list.append({"name": character, "icon": value})
                             break
+            self.build_list_results()
             logger.success("Inline 模块获取角色列表成功")
 
+        async def task_loaded(tasks: List[Awaitable]):
+            # 列表全部加载完成后才允许 Telegram 缓存结果
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loaded = True
+
         self.refresh_task.append(asyncio.create_task(task_characters()))
         self.refresh_task.append(asyncio.create_task(task_light_cone()))
         self.refresh_task.append(asyncio.create_task(task_relics()))
+        self.refresh_task.append(asyncio.create_task(task_loaded(list(self.refresh_task))))
 
     @handler.inline_query(block=False)
     async def inline_query(self, update: Update, _: CallbackContext) -> None:
@@ -130,59 +224,22 @@ class Inline(Plugin):
         results_list = []
         args = query.split(" ")
         if args[0] == "":
-            temp_data = [
-                ("光锥图鉴查询", "输入光锥名称即可查询光锥图鉴"),
-                ("角色攻略查询", "输入角色名即可查询角色攻略图鉴"),
-                ("角色图鉴查询", "输入角色名即可查询角色图鉴"),
-                ("角色培养素材查询", "输入角色名即可查询角色培养素材图鉴"),
-                ("遗器套装查询", "输入遗器套装名称即可查询遗器套装图鉴"),
-            ]
-            for i in temp_data:
-                results_list.append(
-                    InlineQueryResultArticle(
-                        id=str(uuid4()),
-                        title=i[0],
-                        description=i[1],
-                        input_message_content=InputTextMessageContent(i[0]),
-                    )
-                )
+            results_list = self.help_results
         elif args[0] == "cookies_export":
             return
         else:
-            if args[0] in [
-                "查看角色攻略列表并查询",
-                "查看角色图鉴列表并查询",
-                "查看光锥列表并查询",
-                "查看遗器套装列表并查询",
-                "查看角色培养素材列表并查询",
-            ]:
-                temp_data = {
-                    "查看角色攻略列表并查询": (self.characters_list, "角色攻略查询"),
-                    "查看角色图鉴列表并查询": (self.characters_guide_list, "角色图鉴查询"),
-                    "查看角色培养素材列表并查询": (self.characters_material_list, "角色培养素材查询"),
-                    "查看光锥列表并查询": (self.light_cone_list, "光锥图鉴查询"),
-                    "查看遗器套装列表并查询": (self.relics_list, "遗器套装查询"),
-                }[args[0]]
-                for character in temp_data[0]:
-                    name = character["name"]
-                    icon = character["icon"]
-                    results_list.append(
-                        InlineQueryResultArticle(
-                            id=str(uuid4()),
-                            title=name,
-                            description=f"{args[0]} {name}",
-                            thumbnail_url=icon,
-                            input_message_content=InputTextMessageContent(
-                                f"{temp_data[1]}{name}", parse_mode=ParseMode.MARKDOWN_V2
-                            ),
-                        )
-                    )
+            if args[0] in LIST_QUERIES:
+                results_list = self.list_results.get(args[0], [])
             else:
-                simple_search_results = await self.search_service.search(args[0])
+                # 名称、别名或拼音的前缀，匹配数量足够时不再模糊搜索
+                results_list.extend(self.list_trie.search(args[0], limit=self.config.prefix_limit))
+                simple_search_results = None
+                if len(results_list) < self.config.prefix_limit:
+                    simple_search_results = await self.search_service.search(args[0])
                 if simple_search_results:
                     results_list.append(
                         InlineQueryResultArticle(
-                            id=str(uuid4()),
+                            id=get_result_id("search", args[0]),
                             title=f"当前查询内容为 {args[0]}",
                             description="如果无查看图片描述 这是正常的 客户端问题",
                             thumbnail_url="https://www.miyoushe.com/_nuxt/img/game-sr.4f80911.jpg",
@@ -198,7 +255,7 @@ class Inline(Plugin):
                         item = None
                         if simple_search_result.photo_file_id:
                             item = InlineQueryResultCachedPhoto(
-                                id=str(uuid4()),
+                                id=get_result_id("search", args[0], simple_search_result.key),
                                 title=simple_search_result.title,
                                 photo_file_id=simple_search_result.photo_file_id,
                                 description=description,
@@ -207,7 +264,7 @@ class Inline(Plugin):
                             )
                         elif simple_search_result.document_file_id:
                             item = InlineQueryResultCachedDocument(
-                                id=str(uuid4()),
+                                id=get_result_id("search", args[0], simple_search_result.key),
                                 title=simple_search_result.title,
                                 document_file_id=simple_search_result.document_file_id,
                                 description=description,
@@ -216,19 +273,22 @@ class Inline(Plugin):
                             )
                         if item:
                             results_list.append(item)
+        # 以上结果与用户无关，可以由 Telegram 缓存；列表仍在加载时不缓存
+        cache_time = self.config.cache_time if results_list and self.loaded else 0
         if not results_list:
-            results_list.append(
+            results_list = [
                 InlineQueryResultArticle(
-                    id=str(uuid4()),
+                    id=get_result_id("not_found"),
                     title="好像找不到问题呢",
                     description="这个问题我也不知道。",
                     input_message_content=InputTextMessageContent("这个问题我也不知道。"),
                 )
-            )
+            ]
         try:
+            # 超过 50 条时按 offset 分页
             await ilq.answer(
                 results=results_list,
-                cache_time=0,
+                cache_time=cache_time,
                 auto_pagination=True,
                 button=InlineQueryResultsButton(
                     text=switch_pm_text,
@@ -9,7 +9,7 @@ from core.plugin import Plugin, handler
 from gram_core.services.channels.models import ChannelAliasDataBase as ChannelAlias
 from gram_core.services.channels.services import ChannelAliasService
 from gram_core.services.groups.services import GroupService
-from gram_core.services.players import PlayersService
+from core.services.players import PlayersService
 from plugins.tools.genshin import PlayerNotFoundError
 from utils.log import logger
 
@@ -6,7 +6,7 @@ from telegram.ext import ApplicationHandlerStop, filters
 from gram_core.dependence.redisdb import RedisDB
 from gram_core.plugin import Plugin, handler, HandlerData
 from gram_core.services.groups.services import GroupService
-from gram_core.services.players import PlayersService
+from core.services.players import PlayersService
 from gram_core.services.users.services import UserAdminService
 from plugins.tools.chat_administrators import ChatAdministrators
 from utils.log import logger
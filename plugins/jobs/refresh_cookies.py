@@ -13,7 +13,7 @@ from sqlalchemy.orm.exc import StaleDataError
 
 from core.plugin import Plugin, job
 from gram_core.basemodel import RegionEnum
-from gram_core.services.cookies import CookiesService
+from core.services.cookies import CookiesService
 from gram_core.services.cookies.models import CookiesStatusEnum
 from utils.log import logger
 
@@ -1,10 +1,8 @@
-import asyncio
 import math
-from typing import Optional, List, Dict, TYPE_CHECKING, Any, Coroutine, Tuple
+from typing import Optional, List, Dict, TYPE_CHECKING, Tuple
 
 from simnet.models.starrail.chronicle.activity import (
     StarRailFantasticStory,
-    StarRailTreasureDungeonRecord,
     StarRailFoxStoryTeam,
 )
 from telegram import Update, Message
@@ -13,7 +11,7 @@ from telegram.ext import CallbackContext, filters
 
 from core.dependence.assets import AssetsService
 from core.plugin import Plugin, handler
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from gram_core.services.template.models import RenderResult, RenderGroupResult
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
@@ -43,7 +41,7 @@ class PlayerActivityPlugins(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         assets: AssetsService,
         helper: GenshinHelper,
     ):
@@ -741,24 +739,22 @@ class PlayerActivityPlugins(Plugin):
             for avatar in record.avatars:
                 avatar_icons[avatar.id] = self.assets.avatar.icon(avatar.id).as_uri()
 
-        def render(record: StarRailTreasureDungeonRecord) -> Coroutine[Any, Any, RenderResult]:
-            render_data = {
+        sections = [
+            {
                 "uid": mask_number(uid),
                 "record": record,
                 "avatar_icons": avatar_icons,
             }
-            return self.template_service.render(
-                "starrail/activity/treasure_dungeon.html",
-                render_data,
-                {"width": 500, "height": 762},
-                full_page=True,
-                query_selector="#container",
-            )
-
-        tasks = [render(record) for record in data.records if record.finish_time is not None]
-        if len(tasks) == 1:
-            return [await tasks[0]]
-        return await asyncio.gather(*tasks)  # noqa
+            for record in data.records
+            if record.finish_time is not None
+        ]
+        return await self.template_service.render_batch(
+            "starrail/activity/treasure_dungeon.html",
+            sections,
+            {"width": 500, "height": 762},
+            full_page=True,
+            query_selector="#container",
+        )
 
     @handler.command("copper_man", block=False)
     @handler.message(filters.Regex("^金人巷信息查询(.*)"), block=False)
@@ -1,4 +1,3 @@
-import asyncio
 from typing import List, Optional, TYPE_CHECKING, Dict
 
 from pydantic import BaseModel
@@ -9,7 +8,7 @@ from core.dependence.assets import AssetsService, AssetsCouldNotFound
 from core.plugin import Plugin, handler
 from core.services.cookies import CookiesService
 from core.services.template.models import FileType
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from core.services.wiki.services import WikiService
 from plugins.tools.genshin import GenshinHelper, CharacterDetails
 from utils.log import logger
@@ -58,7 +57,7 @@ class AvatarListPlugin(Plugin):
         self,
         cookies_service: CookiesService = None,
         assets_service: AssetsService = None,
-        template_service: TemplateService = None,
+        template_service: RenderService = None,
         wiki_service: WikiService = None,
         helper: GenshinHelper = None,
         character_details: CharacterDetails = None,
@@ -70,11 +69,6 @@ class AvatarListPlugin(Plugin):
         self.helper = helper
         self.character_details = character_details
 
-    async def get_avatar_data(
-        self, character_id: int, client: "StarRailClient"
-    ) -> Optional["StarrailCalculatorCharacterDetails"]:
-        return await self.character_details.get_character_details(client, character_id)
-
     @staticmethod
     async def get_avatars_data(client: "StarRailClient") -> List["StarRailDetailCharacter"]:
         task_info_results = (await client.get_starrail_characters()).avatar_list
@@ -96,11 +90,9 @@ class AvatarListPlugin(Plugin):
     async def get_avatars_details(
         self, characters: List["StarRailDetailCharacter"], client: "StarRailClient"
     ) -> Dict[int, "StarrailCalculatorCharacterDetails"]:
-        async def _task(cid):
-            return await self.get_avatar_data(cid, client)
-
-        task_detail_results = await asyncio.gather(*[_task(character.id) for character in characters])
-        return {character.id: detail for character, detail in zip(characters, task_detail_results)}
+        return await self.character_details.get_character_details_many(
+            client, [character.id for character in characters]
+        )
 
     @staticmethod
     def get_skill_data(character: Optional["StarrailCalculatorCharacterDetails"]) -> List[SkillData]:
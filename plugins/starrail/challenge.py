@@ -15,7 +15,7 @@ from core.dependence.assets import AssetsService
 from core.plugin import Plugin, handler
 from core.services.cookies.error import TooManyRequestPublicCookies
 from core.services.template.models import RenderGroupResult, RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -65,7 +65,7 @@ class ChallengePlugin(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         helper: GenshinHelper,
         assets_service: AssetsService,
     ):
@@ -257,42 +257,31 @@ class ChallengePlugin(Plugin):
             },
         }
 
-        overview = await self.template_service.render(
-            "starrail/abyss/overview.html", render_data, viewport={"width": 750, "height": 250}
-        )
+        def overview_task():
+            return self.template_service.render(
+                "starrail/abyss/overview.html", render_data, viewport={"width": 750, "height": 250}
+            )
 
         if total:
-
-            def floor_task(floor_index: int):
-                _abyss_data = self.get_floor_data(abyss_data, floor_index)
-                return (
-                    floor_index,
-                    self.template_service.render(
-                        "starrail/abyss/floor.html",
-                        {
-                            **render_data,
-                            **_abyss_data,
-                        },
-                        viewport={"width": 690, "height": 500},
-                        full_page=True,
-                        ttl=15 * 24 * 60 * 60,
-                    ),
-                )
-
-            render_inputs = []
-            floors = abyss_data.floors[::-1]
-            for i, f in enumerate(floors):
+            sections = []
+            for i in range(len(abyss_data.floors)):
                 try:
-                    render_inputs.append(floor_task(i + 1))
+                    sections.append({**render_data, **self.get_floor_data(abyss_data, i + 1)})
                 except AbyssFastPassed:
                     pass
+            overview, floors = await asyncio.gather(
+                overview_task(),
+                self.template_service.render_batch(
+                    "starrail/abyss/floor.html",
+                    sections,
+                    viewport={"width": 690, "height": 500},
+                    full_page=True,
+                    ttl=15 * 24 * 60 * 60,
+                ),
+            )
+            return [overview, *floors]
 
-            render_group_inputs = list(map(lambda x: x[1], sorted(render_inputs, key=lambda x: x[0])))
-
-            render_group_outputs = await asyncio.gather(*render_group_inputs)
-            render_group_outputs.insert(0, overview)
-            return render_group_outputs
-
+        overview = await overview_task()
         if floor < 1:
             return [overview]
         try:
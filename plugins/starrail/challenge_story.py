@@ -1,6 +1,5 @@
 """虚构叙事数据查询"""
 
-import asyncio
 import re
 from functools import lru_cache
 from typing import Any, List, Optional, Tuple, Union, TYPE_CHECKING
@@ -15,7 +14,7 @@ from core.dependence.assets import AssetsService
 from core.plugin import Plugin, handler
 from core.services.cookies.error import TooManyRequestPublicCookies
 from core.services.template.models import RenderGroupResult, RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -65,7 +64,7 @@ class ChallengeStoryPlugin(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         helper: GenshinHelper,
         assets_service: AssetsService,
     ):
@@ -260,34 +259,19 @@ class ChallengeStoryPlugin(Plugin):
             },
         }
         if total:
-
-            def floor_task(floor_index: int):
-                _abyss_data = self.get_floor_data(abyss_data, floor_index)
-                return (
-                    floor_index,
-                    self.template_service.render(
-                        "starrail/abyss/floor_story.html",
-                        {
-                            **render_data,
-                            **_abyss_data,
-                        },
-                        viewport={"width": 690, "height": 500},
-                        full_page=True,
-                        ttl=15 * 24 * 60 * 60,
-                    ),
-                )
-
-            render_inputs = []
-            floors = abyss_data.floors[::-1]
-            for i in range(len(floors)):
+            sections = []
+            for i in range(len(abyss_data.floors)):
                 try:
-                    render_inputs.append(floor_task(i + 1))
+                    sections.append({**render_data, **self.get_floor_data(abyss_data, i + 1)})
                 except AbyssFastPassed:
                     pass
-
-            render_group_inputs = list(map(lambda x: x[1], sorted(render_inputs, key=lambda x: x[0])))
-
-            return await asyncio.gather(*render_group_inputs)
+            return await self.template_service.render_batch(
+                "starrail/abyss/floor_story.html",
+                sections,
+                viewport={"width": 690, "height": 500},
+                full_page=True,
+                ttl=15 * 24 * 60 * 60,
+            )
 
         if floor < 1:
             return [
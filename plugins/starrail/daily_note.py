@@ -10,7 +10,7 @@ from telegram.helpers import create_deep_linked_url
 
 from core.plugin import Plugin, handler
 from core.services.template.models import RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -27,7 +27,7 @@ class DailyNotePlugin(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         helper: GenshinHelper,
     ):
         self.template_service = template
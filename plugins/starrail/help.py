@@ -1,31 +1,52 @@
+from typing import TYPE_CHECKING
+
 from telegram import Update
 from telegram.constants import ChatAction
 from telegram.ext import CallbackContext, filters
 
 from core.plugin import Plugin, handler
-from core.services.template.services import TemplateService
+from core.services.template.models import RenderResult
+from core.services.template.pool import RenderPriority
+from core.services.template.services import RenderService
 from utils.log import logger
 
+if TYPE_CHECKING:
+    from telegram.ext import ContextTypes
+
 __all__ = ("HelpPlugin",)
 
 
 class HelpPlugin(Plugin):
-    def __init__(self, template_service: TemplateService = None):
+    def __init__(self, template_service: RenderService = None):
         if template_service is None:
             raise ModuleNotFoundError
         self.template_service = template_service
 
+    async def initialize(self):
+        # 启动后在后台预先渲染，第一次 /help 直接命中渲染缓存
+        self.application.job_queue.run_once(self.prefetch, 10)
+
+    async def render_help(self, priority: RenderPriority = RenderPriority.INTERACTIVE) -> RenderResult:
+        return await self.template_service.render(
+            "bot/help/help.html",
+            {"bot_username": self.application.bot.username},
+            {"width": 1280, "height": 900},
+            ttl=30 * 24 * 60 * 60,
+            priority=priority,
+        )
+
+    async def prefetch(self, _: "ContextTypes.DEFAULT_TYPE"):
+        try:
+            await self.render_help(RenderPriority.BACKGROUND)
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("预先渲染帮助图片失败 %s", str(exc))
+
     @handler.command(command="help", block=False)
     @handler.command(command="start", filters=filters.Regex("inline_message$"), block=False)
     async def start(self, update: Update, _: CallbackContext):
         message = update.effective_message
         self.log_user(update, logger.info, "发出help命令")
         await message.reply_chat_action(ChatAction.TYPING)
-        render_result = await self.template_service.render(
-            "bot/help/help.html",
-            {"bot_username": self.application.bot.username},
-            {"width": 1280, "height": 900},
-            ttl=30 * 24 * 60 * 60,
-        )
+        render_result = await self.render_help()
         await message.reply_chat_action(ChatAction.UPLOAD_PHOTO)
         await render_result.reply_photo(message, filename="help.png", allow_sending_without_reply=True)
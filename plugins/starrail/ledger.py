@@ -12,7 +12,7 @@ from telegram.ext import filters, CallbackContext
 from core.plugin import Plugin, handler
 from core.services.cookies import CookiesService
 from core.services.template.models import RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -31,7 +31,7 @@ class LedgerPlugin(Plugin):
         self,
         helper: GenshinHelper,
         cookies_service: CookiesService,
-        template_service: TemplateService,
+        template_service: RenderService,
     ):
         self.template_service = template_service
         self.cookies_service = cookies_service
@@ -11,32 +11,17 @@ from core.dependence.assets import AssetsService, AssetsCouldNotFound
 from core.dependence.redisdb import RedisDB
 from core.plugin import Plugin, handler
 from core.services.players import PlayersService
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from core.services.wiki.services import WikiService
 from metadata.shortname import roleToName, idToRole
 from modules.apihelper.client.components.player_cards import PlayerCards as PlayerCardsClient, PlayerInfo, Avatar, Relic
 from modules.apihelper.client.components.remote import Remote
-from modules.playercards.fight_prop import EquipmentsStats
-from modules.playercards.helpers import ArtifactStatsTheory
+from modules.playercards.damage import DamageCalculator
+from modules.playercards.helpers import RelicScorer
 from plugins.tools.genshin import PlayerNotFoundError
 from utils.log import logger
 from utils.uid import mask_number
 
-try:
-    from starrail_damage_cal.mihomo.models import Avatar as DamageAvatar
-    from starrail_damage_cal.to_data import get_data as get_damage_data
-    from starrail_damage_cal.cal_damage import cal_info as cal_damage_info
-    from msgspec import convert as msgspec_convert
-
-    STARRAIL_ARTIFACT_FUNCTION_AVAILABLE = True
-except ImportError:
-    DamageAvatar = None
-    get_damage_data = None
-    cal_damage_info = None
-    msgspec_convert = None
-
-    STARRAIL_ARTIFACT_FUNCTION_AVAILABLE = False
-
 if TYPE_CHECKING:
     from telegram.ext import ContextTypes
     from telegram import Update
@@ -54,7 +39,7 @@ class PlayerCards(Plugin):
     def __init__(
         self,
         player_service: PlayersService,
-        template_service: TemplateService,
+        template_service: RenderService,
         assets_service: AssetsService,
         wiki_service: WikiService,
         redis: RedisDB,
@@ -67,13 +52,20 @@ class PlayerCards(Plugin):
         self.wiki_service = wiki_service
         self.kitsune: Optional[str] = None
         self.fight_prop_rule: Dict[str, Dict[str, float]] = {}
+        self.relic_scorer: Optional[RelicScorer] = None
+        self.damage_calculator = DamageCalculator()
 
     async def initialize(self):
         await self.client.async_init()
         await self._refresh()
+        self.damage_calculator.initialize()
+
+    async def shutdown(self):
+        self.damage_calculator.shutdown()
 
     async def _refresh(self):
         self.fight_prop_rule = await Remote.get_fight_prop_rule_data()
+        self.relic_scorer = RelicScorer(self.client.relic_table, self.fight_prop_rule)
 
     async def _load_history(self, uid) -> Optional[PlayerInfo]:
         data = await self.client.player_cards_file.load_history_info(uid)
@@ -204,6 +196,8 @@ class PlayerCards(Plugin):
             self.wiki_service,
             self.client,
             self.fight_prop_rule,
+            self.relic_scorer,
+            self.damage_calculator,
         ).render()  # pylint: disable=W0631
         await render_result.reply_photo(
             message,
@@ -341,6 +335,8 @@ class PlayerCards(Plugin):
             self.wiki_service,
             self.client,
             self.fight_prop_rule,
+            self.relic_scorer,
+            self.damage_calculator,
         ).render()  # pylint: disable=W0631
         render_result.filename = f"player_card_{uid}_{result}.png"
         render_result.caption = self.get_caption(characters)
@@ -484,11 +480,13 @@ class RenderTemplate:
         self,
         uid: Union[int, str],
         character: Avatar,
-        template_service: TemplateService,
+        template_service: RenderService,
         assets_service: AssetsService,
         wiki_service: WikiService,
         client: PlayerCardsClient,
         fight_prop_rule: Dict[str, Dict[str, float]],
+        relic_scorer: Optional[RelicScorer] = None,
+        damage_calculator: Optional[DamageCalculator] = None,
     ):
         self.uid = uid
         self.template_service = template_service
@@ -497,6 +495,13 @@ class RenderTemplate:
         self.wiki_service = wiki_service
         self.client = client
         self.fight_prop_rule = fight_prop_rule
+        self.relic_scorer = relic_scorer or RelicScorer(client.relic_table, fight_prop_rule)
+        self.damage_calculator = damage_calculator
+
+    @staticmethod
+    def get_relic_list(client: PlayerCardsClient, character: Avatar) -> List[Relic]:
+        """可以评分的遗器，顺序与 RelicScorer.score_relics 的结果一致"""
+        return [e for e in character.relicList or [] if e.tid in client.relic_table]
 
     async def render(self):
         images = await self.cache_images()
@@ -571,11 +576,6 @@ class RenderTemplate:
     def find_artifacts(self) -> List[Artifact]:
         """在 equipments 数组中找到圣遗物，并转换成带有分数的 model。equipments 数组包含圣遗物和武器"""
 
-        stats = ArtifactStatsTheory(idToRole(self.character.avatarId), self.fight_prop_rule)
-
-        def substat_score(s: EquipmentsStats) -> float:
-            return stats.theory(s)
-
         def fix_equipment(e: Relic) -> Dict:
             rid = e.tid
             affix = self.client.get_affix_by_id(rid)
@@ -594,19 +594,20 @@ class RenderTemplate:
                 "sub": self.client.get_affix(e, False, True),
             }
 
-        relic_list = self.character.relicList or []
+        relic_list = self.get_relic_list(self.client, self.character)
+        # 只计算当前角色的遗器评分
+        scores = self.relic_scorer.score_relics([(idToRole(self.character.avatarId), relic_list)])[0]
         return [
             Artifact(
                 equipment=fix_equipment(e),
                 # 圣遗物单行属性评分
-                substat_scores=[substat_score(s) for s in self.client.get_affix(e, False)],
+                substat_scores=substat_scores,
             )
-            for e in relic_list
-            if self.client.get_affix_by_id(e.tid) is not None
+            for e, substat_scores in zip(relic_list, scores)
         ]
 
     async def cal_avatar_damage(self) -> Dict:
-        if not STARRAIL_ARTIFACT_FUNCTION_AVAILABLE:
+        if self.damage_calculator is None or not self.damage_calculator.available:
             return {
                 "damage_function_available": False,
             }
@@ -614,9 +615,7 @@ class RenderTemplate:
             data = self.character.dict()
             if "property" in data:
                 del data["property"]
-            avatar = msgspec_convert(data, type=DamageAvatar)
-            damage_data = await get_damage_data(avatar, "", str(self.uid))
-            damage_info = await cal_damage_info(damage_data[0])
+            damage_info = await self.damage_calculator.cal(str(self.uid), data)
             return {
                 "damage_function_available": True,
                 "damage_info": damage_info,
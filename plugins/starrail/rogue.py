@@ -11,7 +11,7 @@ from core.dependence.assets import AssetsService
 from core.plugin import Plugin, handler
 from core.services.cookies.error import TooManyRequestPublicCookies
 from core.services.template.models import RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -50,7 +50,7 @@ class PlayerRoguePlugins(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         assets: AssetsService,
         helper: GenshinHelper,
     ):
@@ -1,4 +1,6 @@
+import asyncio
 import math
+import time
 from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Optional, Union
 from urllib.parse import quote
 
@@ -18,13 +20,14 @@ from telegram.ext import filters, ConversationHandler
 from telegram.helpers import create_deep_linked_url
 
 from core.plugin import Plugin, handler
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from core.config import config
 from core.dependence.redisdb import RedisDB
 from core.plugin import conversation
 from metadata.shortname import roleToName, idToRole
 from plugins.app.webapp import WebApp
 from plugins.tools.genshin import GenshinHelper
+from utils.codec import cache_codec
 from utils.log import logger
 from utils.uid import mask_number
 
@@ -102,15 +105,25 @@ class RoleDetailPlugin(Plugin.Conversation):
     def __init__(
         self,
         helper: GenshinHelper,
-        template_service: TemplateService,
+        template_service: RenderService,
         redis: RedisDB,
     ):
         self.template_service = template_service
         self.helper = helper
         self.qname = "plugins:role_detail"
         self.redis = redis.client
-        self.expire = 15 * 60  # 15分钟
+        self.expire = 15 * 60  # 15分钟 超过后返回缓存并在后台刷新
+        self.hard_expire = 24 * 60 * 60  # 24小时 超过后必须重新获取
         self.kitsune: Optional[str] = None
+        self._refresh_tasks: Dict[int, asyncio.Task] = {}
+
+    async def shutdown(self) -> None:
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        self._refresh_tasks.clear()
+
+    def get_characters_qname(self, uid: int) -> Tuple[str, str, str]:
+        return f"{self.qname}:{uid}:nickname", f"{self.qname}:{uid}:data", f"{self.qname}:{uid}:time"
 
     async def set_characters_for_redis(
         self,
@@ -118,41 +131,92 @@ class RoleDetailPlugin(Plugin.Conversation):
         nickname: str,
         data: "StarRailDetailCharacters",
     ) -> None:
-        nickname_k, data_k = f"{self.qname}:{uid}:nickname", f"{self.qname}:{uid}:data"
-        json_data = data.json(by_alias=True)
-        await self.redis.set(nickname_k, nickname, ex=self.expire)
-        await self.redis.set(data_k, json_data, ex=self.expire)
+        nickname_k, data_k, time_k = self.get_characters_qname(uid)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(nickname_k, nickname, ex=self.hard_expire)
+            pipe.set(data_k, cache_codec.dumps_model(data), ex=self.hard_expire)
+            pipe.set(time_k, int(time.time()), ex=self.hard_expire)
+            await pipe.execute()
 
     async def del_characters_for_redis(
         self,
         uid: int,
     ) -> None:
-        nickname_k, data_k = f"{self.qname}:{uid}:nickname", f"{self.qname}:{uid}:data"
-        await self.redis.delete(nickname_k, data_k)
+        await self.redis.delete(*self.get_characters_qname(uid))
+
+    async def get_characters_cache(
+        self,
+        uid: int,
+    ) -> Tuple[Optional[str], Optional["StarRailDetailCharacters"], int]:
+        """读取缓存
+
+        :return: (昵称, 数据, 缓存写入时间戳)，没有写入时间的旧缓存视为已过期
+        """
+        nickname_v, data_v, time_v = await self.redis.mget(*self.get_characters_qname(uid))
+        if nickname_v is None or data_v is None:
+            return None, None, 0
+        data = cache_codec.loads_model(StarRailDetailCharacters, data_v)
+        if data is None:
+            return None, None, 0
+        return str(nickname_v, encoding="utf-8"), data, int(time_v or 0)
 
     async def get_characters_for_redis(
         self,
         uid: int,
     ) -> Tuple[Optional[str], Optional["StarRailDetailCharacters"]]:
-        nickname_k, data_k = f"{self.qname}:{uid}:nickname", f"{self.qname}:{uid}:data"
-        nickname_v, data_v = await self.redis.get(nickname_k), await self.redis.get(data_k)
-        if nickname_v is None or data_v is None:
-            return None, None
-        nickname = str(nickname_v, encoding="utf-8")
-        json_data = str(data_v, encoding="utf-8")
-        return nickname, StarRailDetailCharacters.parse_raw(json_data)
+        nickname, data, _ = await self.get_characters_cache(uid)
+        return nickname, data
+
+    async def fetch_characters(self, client: "StarRailClient") -> Tuple[str, "StarRailDetailCharacters"]:
+        data = await client.get_starrail_characters()
+        nickname = (await client.get_starrail_user()).info.nickname
+        await self.set_characters_for_redis(client.player_id, nickname, data)
+        return nickname, data
+
+    async def _refresh_characters(self, uid: int, user_id: int) -> None:
+        lock_k = f"{self.qname}:{uid}:refresh"
+        if not await self.redis.set(lock_k, 1, ex=60, nx=True):
+            return  # 其他实例正在刷新
+        try:
+            async with self.helper.genshin(user_id) as client:
+                if client.player_id != uid:
+                    return
+                await self.fetch_characters(client)
+            logger.debug("后台刷新角色详细信息完成 uid[%s]", uid)
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("后台刷新角色详细信息失败 uid[%s] %s", uid, str(exc))
+        finally:
+            await self.redis.delete(lock_k)
+
+    def refresh_characters_in_background(self, uid: int, user_id: int) -> None:
+        """在后台刷新缓存，同一 uid 同时只会有一个刷新任务"""
+        if uid in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self._refresh_characters(uid, user_id))
+        self._refresh_tasks[uid] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(uid, None))
 
     async def get_characters(
-        self, uid: int, client: "StarRailClient" = None
+        self, uid: int, client: "StarRailClient" = None, user_id: Optional[int] = None, force: bool = False
     ) -> Tuple[Optional[str], Optional["StarRailDetailCharacters"]]:
-        nickname, data = await self.get_characters_for_redis(uid)
-        if nickname is None or data is None:
-            if not client:
-                raise NeedClient
-            data = await client.get_starrail_characters()
-            nickname = (await client.get_starrail_user()).info.nickname
-            await self.set_characters_for_redis(client.player_id, nickname, data)
-        return nickname, data
+        """获取角色详细信息
+
+        缓存超过 expire 时直接返回旧数据，并通过 user_id 在后台刷新；超过 hard_expire 或 force 时重新获取
+
+        :param uid: 玩家 uid
+        :param client: 需要重新获取时使用的 StarRailClient
+        :param user_id: 用于后台刷新的用户 ID
+        :param force: 是否跳过缓存强制重新获取
+        """
+        if not force:
+            nickname, data, updated = await self.get_characters_cache(uid)
+            if nickname is not None and data is not None:
+                if user_id is not None and time.time() - updated > self.expire:
+                    self.refresh_characters_in_background(uid, user_id)
+                return nickname, data
+        if not client:
+            raise NeedClient
+        return await self.fetch_characters(client)
 
     @staticmethod
     def get_properties_map(data: "StarRailDetailCharacters") -> Dict[int, "PropertyInfo"]:
@@ -312,8 +376,13 @@ class RoleDetailPlugin(Plugin.Conversation):
                     callback_data=f"get_role_detail|{user_id}|{uid}|{next_page}",
                 )
             )
-        if last_button:
-            send_buttons.append(last_button)
+        last_button.append(
+            InlineKeyboardButton(
+                "刷新数据",
+                callback_data=f"get_role_detail|{user_id}|{uid}|refresh",
+            )
+        )
+        send_buttons.append(last_button)
         return send_buttons
 
     async def get_render_result(
@@ -379,7 +448,7 @@ class RoleDetailPlugin(Plugin.Conversation):
         )
         await message.reply_chat_action(ChatAction.TYPING)
         async with self.helper.genshin(user_id) as client:
-            nickname, data = await self.get_characters(client.player_id, client)
+            nickname, data = await self.get_characters(client.player_id, client, user_id)
         uid = client.player_id
         if ch_name is None:
             buttons = self.gen_button(data, user_id, uid)
@@ -440,6 +509,14 @@ class RoleDetailPlugin(Plugin.Conversation):
         if result == "empty_data":
             await callback_query.answer(text="此按钮不可用", show_alert=True)
             return
+        if result == "refresh":
+            logger.info("用户 %s[%s] 角色详细信息刷新请求 uid[%s]", user.full_name, user.id, uid)
+            async with self.helper.genshin(user.id) as client:
+                _, data = await self.get_characters(client.player_id, client, force=True)
+            buttons = self.gen_button(data, user.id, client.player_id)
+            await message.edit_reply_markup(reply_markup=InlineKeyboardMarkup(buttons))
+            await callback_query.answer("已刷新角色数据", show_alert=False)
+            return
         page = 0
         if result.isdigit():
             page = int(result)
@@ -459,7 +536,7 @@ class RoleDetailPlugin(Plugin.Conversation):
                 uid,
             )
         try:
-            nickname, data = await self.get_characters(uid)
+            nickname, data = await self.get_characters(uid, user_id=user.id)
         except NeedClient:
             async with self.helper.genshin(user.id) as client:
                 nickname, data = await self.get_characters(client.player_id, client)
@@ -534,7 +611,7 @@ class RoleDetailPlugin(Plugin.Conversation):
             char_id,
         )
         try:
-            nickname, data = await self.get_characters(uid)
+            nickname, data = await self.get_characters(uid, user_id=user.id)
         except NeedClient:
             async with self.helper.genshin(user.id) as client:
                 nickname, data = await self.get_characters(client.player_id, client)
@@ -8,7 +8,7 @@ from telegram.ext import CallbackContext, filters
 from core.plugin import Plugin, handler
 from core.services.cookies.error import TooManyRequestPublicCookies
 from core.services.template.models import RenderResult
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from plugins.tools.genshin import GenshinHelper
 from utils.log import logger
 from utils.uid import mask_number
@@ -25,7 +25,7 @@ class PlayerStatsPlugins(Plugin):
 
     def __init__(
         self,
-        template: TemplateService,
+        template: RenderService,
         helper: GenshinHelper,
     ):
         self.template_service = template
@@ -12,7 +12,7 @@ from core.plugin import Plugin, conversation, handler
 from core.services.cookies import CookiesService
 from core.services.players import PlayersService
 from core.services.template.models import FileType
-from core.services.template.services import TemplateService
+from core.services.template.services import RenderService
 from gram_core.config import config
 from modules.gacha_log.const import SRGF_VERSION, GACHA_TYPE_LIST_REVERSE
 from modules.gacha_log.error import (
@@ -51,7 +51,7 @@ class WishLogPlugin(Plugin.Conversation):
 
     def __init__(
         self,
-        template_service: TemplateService,
+        template_service: RenderService,
         players_service: PlayersService,
         assets: AssetsService,
         cookie_service: CookiesService,
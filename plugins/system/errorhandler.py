@@ -24,6 +24,7 @@ from telegram.helpers import create_deep_linked_url
 
 from core.config import config
 from core.plugin import Plugin, error_handler
+from core.services.template.error import RenderQueueFull
 from gram_core.services.players.error import PlayerNotFoundError
 from modules.apihelper.error import APIHelperException, APIHelperTimedOut, ResponseException, ReturnCodeError
 from modules.errorpush import (
@@ -259,6 +260,15 @@ class ErrorHandler(Plugin):
             self.create_notice_task(update, context, notice)
             raise ApplicationHandlerStop
 
+    @error_handler()
+    async def process_render_queue_full(self, update: object, context: CallbackContext):
+        if not isinstance(context.error, RenderQueueFull) or not isinstance(update, Update):
+            return
+        logger.warning("渲染队列已满")
+        notice = self.ERROR_MSG_PREFIX + "当前渲染的图片太多啦 ~ 请稍后再试"
+        self.create_notice_task(update, context, notice)
+        raise ApplicationHandlerStop
+
     @error_handler()
     async def process_player_and_cookie_not_found(self, update: object, context: CallbackContext):
         if not isinstance(
@@ -12,6 +12,9 @@ from git import Repo
 from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
 
 from core.plugin import Plugin, handler
+from core.services.search.services import SearchServices
+from core.services.template.cache import RenderCache
+from core.services.template.pool import PagePool
 from utils.log import logger
 
 if TYPE_CHECKING:
@@ -39,7 +42,10 @@ class StatisticsHandler(BaseHandler):
 
 
 class Status(Plugin):
-    def __init__(self):
+    def __init__(self, render_cache: RenderCache, page_pool: PagePool, search_service: SearchServices):
+        self.render_cache = render_cache
+        self.page_pool = page_pool
+        self.search_service = search_service
         self.pid = os.getpid()
         self.time_form = "%m/%d %H:%M"
         self.type_handler = None
@@ -88,6 +94,20 @@ class Status(Plugin):
             f"{process_use.rss / (1024 * 1024 * 1024):.2f}GB"
         )
 
+        render_stats = self.render_cache.stats()
+        render_text = (
+            f"{render_stats['hit_rate'] * 100:.1f}%/"
+            f"{render_stats['size']}/"
+            f"{render_stats['bytes'] / (1024 * 1024):.1f}MB"
+        )
+        pool_stats = self.page_pool.stats()
+        pool_text = (
+            f"{pool_stats['size'] - pool_stats['idle']}/{pool_stats['size']}/"
+            f"{pool_stats['queue']}/{pool_stats['wait']['avg']:.2f}s"
+        )
+        search_stats = self.search_service.cache_stats()
+        search_text = f"{search_stats['hit_rate'] * 100:.1f}%/{search_stats['size']}/{search_stats['generation']}"
+
         text = (
             "PamGram 运行状态\n"
             f"Python 版本: `{python_version()}` \n"
@@ -97,6 +117,9 @@ class Status(Plugin):
             f"当前使用的内存: `{memory_text}` \n"
             f"运行时间: `{self.get_bot_uptime(start_time)}` \n"
             f"收发消息: ⬇️ {self.recv_num} ⬆️ {self.send_num} \n"
+            f"渲染缓存: `{render_text}` \n"
+            f"渲染页面: `{pool_text}` \n"
+            f"搜索缓存: `{search_text}` \n"
         )
         await message.reply_markdown_v2(text)
 
@@ -346,6 +346,9 @@ class DailyNoteSystem(Plugin):
             TaskStatusEnum.TIMEOUT_ERROR,
         ]
         task_list = await self.get_all_task_users()
+        await self.genshin_helper.prefetch_player_bundles(
+            task_db.user_id for task_db in task_list if task_db.status in include_status
+        )
         for task_db in task_list:
             if task_db.status not in include_status:
                 continue
@@ -1,8 +1,9 @@
 import asyncio
+import contextlib
 import random
 from contextlib import asynccontextmanager
 from datetime import datetime, time, timedelta
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from typing import TYPE_CHECKING, Union
 
 from pydantic import ValidationError
@@ -10,9 +11,12 @@ from simnet import StarRailClient, Region
 from simnet.errors import BadRequest as SimnetBadRequest, InvalidCookies, NetworkError, CookieException, NeedChallenge
 from simnet.models.starrail.calculator import StarrailCalculatorCharacterDetails, StarrailCalculatorCharacter
 from simnet.utils.player import recognize_game_biz
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm.exc import StaleDataError
-from sqlmodel import BigInteger, Column, DateTime, Field, Index, Integer, SQLModel, TEXT, delete, func, select
+from sqlmodel import BigInteger, Column, DateTime, Field, Index, Integer, SQLModel, TEXT, delete, func, select, true
 from sqlmodel.ext.asyncio.session import AsyncSession
 from telegram.ext import ContextTypes
 
@@ -21,11 +25,16 @@ from core.dependence.database import Database
 from core.dependence.redisdb import RedisDB
 from core.error import ServiceNotFoundError
 from core.plugin import Plugin
+from core.services.cookies.models import CookiesDataBase as Cookies
 from core.services.cookies.services import CookiesService, PublicCookiesService
 from core.services.devices import DevicesService
+from core.services.devices.models import DevicesDataBase as Devices
+from core.services.players.cache import PlayerBundle, PlayerBundleCache
+from core.services.players.models import PlayersDataBase as Player
 from core.services.players.services import PlayersService
 from core.services.users.services import UserService
 from gram_core.services.cookies.models import CookiesStatusEnum
+from utils.codec import cache_codec
 from utils.log import logger
 
 if TYPE_CHECKING:
@@ -48,6 +57,13 @@ class CharacterDetailsSQLModel(SQLModel, table=True):
 
 
 class CharacterDetails(Plugin):
+    batch_size: int = 200
+    """单次事务最多写入的行数"""
+    flush_interval: float = 2.0
+    """写入队列的最长等待时间"""
+    concurrency: int = 8
+    """批量获取时请求 API 的最大并发数"""
+
     def __init__(
         self,
         database: Database,
@@ -56,6 +72,8 @@ class CharacterDetails(Plugin):
         self.database = database
         self.redis = redis.client
         self.expire = 60 * 60
+        self._write_queue: "asyncio.Queue[Tuple[int, int, str, datetime]]" = asyncio.Queue()
+        self._write_task: Optional[asyncio.Task] = None
 
     async def initialize(self) -> None:
         def fetch_and_update_objects(connection):
@@ -68,6 +86,17 @@ class CharacterDetails(Plugin):
         async with self.database.engine.begin() as conn:
             await conn.run_sync(fetch_and_update_objects)
         self.application.job_queue.run_daily(self.del_old_data_job, time(hour=12, minute=0))
+        self._write_task = asyncio.create_task(self._write_behind_worker())
+        self._write_task.add_done_callback(self._on_write_task_done)
+
+    async def shutdown(self) -> None:
+        if self._write_task is not None:
+            self._write_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._write_task
+            self._write_task = None
+        # 与定时写入相同，写入失败时只记录日志，不影响其他组件关闭
+        await self.set_character_details_task()
 
     async def del_old_data_job(self, _: ContextTypes.DEFAULT_TYPE):
         await self.del_old_data(timedelta(days=7))
@@ -91,39 +120,128 @@ class CharacterDetails(Plugin):
         data = await self.redis.get(name)
         if data is None:
             return None
-        json_data = str(data, encoding="utf-8")
-        return StarrailCalculatorCharacterDetails.parse_raw(json_data)
-
-    async def set_character_details(self, player_id: int, character_id: int, data: str):
-        randint = random.randint(1, 30)  # nosec
-        await self.redis.set(
-            self.get_qname(player_id, character_id), data, ex=self.expire + randint * 60
-        )  # 使用随机数防止缓存雪崩
-        async with AsyncSession(self.database.engine) as session:
-            statement = (
-                select(CharacterDetailsSQLModel)
-                .where(CharacterDetailsSQLModel.player_id == player_id)
-                .where(CharacterDetailsSQLModel.character_id == character_id)
+        return cache_codec.loads_model(StarrailCalculatorCharacterDetails, data)
+
+    async def set_character_details(
+        self, player_id: int, character_id: int, data: "StarrailCalculatorCharacterDetails"
+    ):
+        """写入 Redis 并将数据库写入放入队列，由后台任务批量写入"""
+        await self.set_character_details_many(player_id, {character_id: data})
+
+    async def set_character_details_many(self, player_id: int, datas: Dict[int, "StarrailCalculatorCharacterDetails"]):
+        """通过一次 pipeline 写入多个角色的详细信息，数据库写入放入队列
+
+        Redis 中保存经过 cache_codec 压缩的数据，数据库中保存 json 数据
+
+        :param player_id: 玩家 uid
+        :param datas: character_id 到数据的映射
+        """
+        if not datas:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for character_id, data in datas.items():
+                randint = random.randint(1, 30)  # nosec
+                pipe.set(
+                    self.get_qname(player_id, character_id),
+                    cache_codec.dumps_model(data),
+                    ex=self.expire + randint * 60,
+                )  # 使用随机数防止缓存雪崩
+            await pipe.execute()
+        now = datetime.now()
+        for character_id, data in datas.items():
+            self._write_queue.put_nowait((player_id, character_id, data.json(by_alias=True), now))
+        if self._write_task is None:
+            await self.set_character_details_task()
+
+    def _upsert_statement(self, rows: List[Dict]):
+        table = CharacterDetailsSQLModel.__table__
+        dialect = self.database.engine.dialect.name
+        if dialect == "mysql":
+            statement = mysql_insert(table).values(rows)
+            return statement.on_duplicate_key_update(
+                data=statement.inserted.data, time_updated=statement.inserted.time_updated
             )
-            results = await session.exec(statement)
-            sql_data = results.first()
-        if sql_data is None:
-            sql_data = CharacterDetailsSQLModel(
-                player_id=player_id, character_id=character_id, data=data, time_updated=datetime.now()
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            statement = insert(table).values(rows)
+            return statement.on_conflict_do_update(
+                index_elements=[table.c.player_id, table.c.character_id],
+                set_={"data": statement.excluded.data, "time_updated": statement.excluded.time_updated},
             )
-            async with AsyncSession(self.database.engine) as session:
-                session.add(sql_data)
-                await session.commit()
-        else:
-            sql_data.data = data
-            sql_data.time_updated = datetime.now()
-            async with AsyncSession(self.database.engine) as session:
-                session.add(sql_data)
-                await session.commit()
+        return None
 
-    async def set_character_details_task(self, player_id: int, character_id: int, data: str):
+    async def flush_character_details(self, rows: List[Tuple[int, int, str, datetime]]):
+        """在一个事务中批量写入角色详细信息
+
+        :param rows: (player_id, character_id, data, time_updated) 列表，重复的键只保留最后一条
+        """
+        latest: Dict[Tuple[int, int], Dict] = {}
+        for player_id, character_id, data, time_updated in rows:
+            latest[(player_id, character_id)] = {
+                "player_id": player_id,
+                "character_id": character_id,
+                "data": data,
+                "time_updated": time_updated,
+            }
+        values = list(latest.values())
+        statement = self._upsert_statement(values)
+        async with AsyncSession(self.database.engine) as session:
+            if statement is not None:
+                await session.execute(statement)
+            else:
+                for value in values:
+                    results = await session.exec(
+                        select(CharacterDetailsSQLModel)
+                        .where(CharacterDetailsSQLModel.player_id == value["player_id"])
+                        .where(CharacterDetailsSQLModel.character_id == value["character_id"])
+                    )
+                    sql_data = results.first()
+                    if sql_data is None:
+                        sql_data = CharacterDetailsSQLModel(**value)
+                    else:
+                        sql_data.data = value["data"]
+                        sql_data.time_updated = value["time_updated"]
+                    session.add(sql_data)
+            await session.commit()
+
+    async def _get_write_batch(self) -> List[Tuple[int, int, str, datetime]]:
+        rows = [await self._write_queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return rows
+
+    async def _write_behind_worker(self):
+        while True:
+            try:
+                rows = await self._get_write_batch()
+                await self.set_character_details_task(rows)
+            except Exception:  # pylint: disable=W0703
+                logger.exception("角色详细信息后台写入失败")
+
+    def _on_write_task_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task is not self._write_task:
+            return
+        # 后台写入任务意外退出，之后的写入直接执行，不再放入队列中等待
+        self._write_task = None
+        logger.error("角色详细信息后台写入任务已退出", exc_info=task.exception())
+
+    async def set_character_details_task(self, rows: Optional[List[Tuple[int, int, str, datetime]]] = None):
+        if rows is None:
+            rows = []
+            while not self._write_queue.empty():
+                rows.append(self._write_queue.get_nowait())
+        if not rows:
+            return
         try:
-            await self.set_character_details(player_id, character_id, data)
+            await self.flush_character_details(rows)
         except SQLAlchemyError as exc:
             logger.error("写入到数据库失败 code[%s]", exc.code)
             logger.debug("写入到数据库失败", exc_info=exc)
@@ -156,6 +274,20 @@ class CharacterDetails(Plugin):
                     await session.commit()
         return None
 
+    async def _get_character_details_from_remote(
+        self, client: "StarRailClient", uid: int, character_id: int
+    ) -> Tuple[Optional["StarrailCalculatorCharacterDetails"], bool]:
+        """从 API 获取 character_details，遇到 Too Many Requests 时从数据库读取
+
+        :return: (数据, 是否来自 API)
+        """
+        try:
+            return await client.get_character_details(character_id), True
+        except SimnetBadRequest as exc:
+            if "Too Many Requests" in exc.message:
+                return await self.get_character_details_for_mysql(uid, character_id), False
+            raise exc
+
     async def get_character_details(
         self, client: "StarRailClient", character: "Union[int, StarrailCalculatorCharacter]"
     ) -> Optional["StarrailCalculatorCharacterDetails"]:
@@ -169,13 +301,9 @@ class CharacterDetails(Plugin):
             detail = await self.get_character_details_for_redis(uid, character_id)
             if detail is not None:
                 return detail
-            try:
-                detail = await client.get_character_details(character_id)
-            except SimnetBadRequest as exc:
-                if "Too Many Requests" in exc.message:
-                    return await self.get_character_details_for_mysql(uid, character_id)
-                raise exc
-            await asyncio.create_task(self.set_character_details(uid, character_id, detail.json(by_alias=True)))
+            detail, from_remote = await self._get_character_details_from_remote(client, uid, character_id)
+            if from_remote:
+                await self.set_character_details(uid, character_id, detail)
             return detail
         try:
             return await client.get_character_details(character_id)
@@ -186,6 +314,55 @@ class CharacterDetails(Plugin):
                 raise exc
         return None
 
+    async def get_character_details_many(
+        self,
+        client: "StarRailClient",
+        characters: "Iterable[Union[int, StarrailCalculatorCharacter]]",
+        concurrency: Optional[int] = None,
+    ) -> Dict[int, Optional["StarrailCalculatorCharacterDetails"]]:
+        """批量获取 character_details
+
+        通过一次 MGET 读取全部缓存，仅对未命中的角色请求 API，并通过一次 pipeline 写回缓存
+
+        :param client: StarRailClient
+        :param characters: 角色或角色 ID 列表
+        :param concurrency: 请求 API 的最大并发数，默认使用 self.concurrency
+        :return: character_id 到数据的映射
+        """
+        character_ids = [i.id if isinstance(i, StarrailCalculatorCharacter) else i for i in characters]
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        uid = client.player_id
+        if uid is None:
+
+            async def _task(_cid: int):
+                async with semaphore:
+                    return await self.get_character_details(client, _cid)
+
+            details = await asyncio.gather(*[_task(cid) for cid in character_ids])
+            return dict(zip(character_ids, details))
+
+        results: Dict[int, Optional["StarrailCalculatorCharacterDetails"]] = {}
+        misses: List[int] = []
+        values = await self.redis.mget([self.get_qname(uid, cid) for cid in character_ids]) if character_ids else []
+        for character_id, value in zip(character_ids, values):
+            details = None if value is None else cache_codec.loads_model(StarrailCalculatorCharacterDetails, value)
+            if details is None:
+                misses.append(character_id)
+                continue
+            results[character_id] = details
+
+        async def _fetch(_cid: int):
+            async with semaphore:
+                return await self._get_character_details_from_remote(client, uid, _cid)
+
+        remote_datas: Dict[int, "StarrailCalculatorCharacterDetails"] = {}
+        for character_id, (detail, from_remote) in zip(misses, await asyncio.gather(*[_fetch(i) for i in misses])):
+            results[character_id] = detail
+            if from_remote and detail is not None:
+                remote_datas[character_id] = detail
+        await self.set_character_details_many(uid, remote_datas)
+        return results
+
 
 class PlayerNotFoundError(Exception):
     def __init__(self, user_id):
@@ -207,24 +384,88 @@ class GenshinHelper(Plugin):
         user: UserService,
         player: PlayersService,
         devices: DevicesService,
+        bundle_cache: PlayerBundleCache,
+        database: Database,
     ) -> None:
         self.cookies_service = cookies
         self.public_cookies_service = public_cookies
         self.user_service = user
         self.players_service = player
         self.devices_service = devices
+        self.bundle_cache = bundle_cache
+        self.database = database
         if None in (temp := [self.user_service, self.cookies_service, self.players_service]):
             raise ServiceNotFoundError(*filter(lambda x: x is None, temp))
 
+    async def get_player_bundle(self, user_id: int, region: Optional[RegionEnum] = None) -> PlayerBundle:
+        """获取用户的 player、cookies 与 device，优先从缓存中读取"""
+        bundle = await self.bundle_cache.get(user_id, region)
+        if bundle is not None:
+            player = bundle.player
+            if bundle.cookies is None and player.account_id is not None:
+                # Redis 中不保存 cookies
+                cookies = await self.cookies_service.get(player.user_id, player.account_id, player.region)
+                bundle = bundle._replace(cookies=cookies)
+                await self.bundle_cache.set(user_id, bundle, region)
+            return bundle
+        player = await self.players_service.get_player(user_id, region)
+        bundle = PlayerBundle(player)
+        if player is not None and player.account_id is not None:
+            cookies = await self.cookies_service.get(player.user_id, player.account_id, player.region)
+            devices = await self.devices_service.get(player.account_id)
+            bundle = PlayerBundle(player, cookies, devices)
+        await self.bundle_cache.set(user_id, bundle, region)
+        return bundle
+
+    async def prefetch_player_bundles(
+        self, user_ids: Iterable[int], region: Optional[RegionEnum] = None
+    ) -> Dict[int, PlayerBundle]:
+        """批量预热用户的 PlayerBundle 缓存，每张表只查询一次
+
+        :param user_ids: 用户 ID 列表
+        :param region: 区服，为 None 时使用用户选择的角色
+        :return: user_id 到 PlayerBundle 的映射
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        async with AsyncSession(self.database.engine) as session:
+            statement = select(Player).where(Player.user_id.in_(user_ids)).where(Player.is_chosen == true())
+            if region is not None:
+                statement = statement.where(Player.region == region)
+            players = {player.user_id: player for player in (await session.exec(statement)).all()}
+            account_ids = {player.account_id for player in players.values() if player.account_id is not None}
+            cookies_map: Dict[tuple, Cookies] = {}
+            devices_map: Dict[int, Devices] = {}
+            if account_ids:
+                statement = select(Cookies).where(Cookies.account_id.in_(account_ids))
+                for cookies in (await session.exec(statement)).all():
+                    cookies_map[(cookies.user_id, cookies.account_id, cookies.region)] = cookies
+                statement = select(Devices).where(Devices.account_id.in_(account_ids))
+                for devices in (await session.exec(statement)).all():
+                    devices_map[devices.account_id] = devices
+        bundles: Dict[int, PlayerBundle] = {}
+        for user_id in user_ids:
+            player = players.get(user_id)
+            if player is None or player.account_id is None:
+                bundles[user_id] = PlayerBundle(player)
+                continue
+            bundles[user_id] = PlayerBundle(
+                player,
+                cookies_map.get((player.user_id, player.account_id, player.region)),
+                devices_map.get(player.account_id),
+            )
+        await self.bundle_cache.set_many(bundles, region)
+        return bundles
+
     @asynccontextmanager
     async def genshin(self, user_id: int, region: Optional[RegionEnum] = None) -> StarRailClient:  # skipcq: PY-R1000 #
-        player = await self.players_service.get_player(user_id, region)
+        player, cookie_model, devices = await self.get_player_bundle(user_id, region)
         if player is None:
             raise PlayerNotFoundError(user_id)
 
         if player.account_id is None:
             raise CookiesNotFoundError(user_id, player.region)
-        cookie_model = await self.cookies_service.get(player.user_id, player.account_id, player.region)
         if cookie_model is None:
             raise CookiesNotFoundError(user_id, player.region)
         cookies = cookie_model.data
@@ -238,7 +479,6 @@ class GenshinHelper(Plugin):
 
         device_id: Optional[str] = None
         device_fp: Optional[str] = None
-        devices = await self.devices_service.get(player.account_id)
         if devices:
             device_id = devices.device_id
             device_fp = devices.device_fp
@@ -304,13 +544,12 @@ class GenshinHelper(Plugin):
                 raise exc
 
     async def get_genshin_client(self, user_id: int, region: Optional[RegionEnum] = None) -> StarRailClient:
-        player = await self.players_service.get_player(user_id, region)
+        player, cookie_model, devices = await self.get_player_bundle(user_id, region)
         if player is None:
             raise PlayerNotFoundError(user_id)
 
         if player.account_id is None:
             raise CookiesNotFoundError(user_id, player.region)
-        cookie_model = await self.cookies_service.get(player.user_id, player.account_id, player.region)
         if cookie_model is None:
             raise CookiesNotFoundError(user_id, player.region)
         cookies = cookie_model.data
@@ -324,7 +563,6 @@ class GenshinHelper(Plugin):
 
         device_id: Optional[str] = None
         device_fp: Optional[str] = None
-        devices = await self.devices_service.get(player.account_id)
         if devices:
             device_id = devices.device_id
             device_fp = devices.device_fp
@@ -344,7 +582,7 @@ class GenshinHelper(Plugin):
         self, user_id: int, region: Optional[RegionEnum] = None, uid: Optional[int] = None
     ) -> StarRailClient:
         if not (region or uid):
-            player = await self.players_service.get_player(user_id, region)
+            player = (await self.get_player_bundle(user_id, region)).player
             if player:
                 region = player.region
                 uid = player.player_id
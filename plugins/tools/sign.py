@@ -289,6 +289,9 @@ class SignSystem(Plugin):
         else:
             raise ValueError
         sign_list = await self.sign_service.get_all()
+        await self.genshin_helper.prefetch_player_bundles(
+            sign_db.user_id for sign_db in sign_list if sign_db.status in include_status
+        )
         for sign_db in sign_list:
             if sign_db.status not in include_status:
                 continue
@@ -4,6 +4,7 @@ import pytest_asyncio
 
 from core.basemodel import RegionEnum
 from core.services.players import PlayersService
+from core.services.players.cache import PlayerBundleCache
 from core.services.players.models import PlayersDataBase
 from core.services.players.repositories import PlayersRepository
 
@@ -11,9 +12,9 @@ logger = logging.getLogger("TestPlayersService")
 
 
 @pytest_asyncio.fixture(scope="class", name="players_service")
-def service(database):
+def service(database, redis):
     repository = PlayersRepository(database)
-    _players_service = PlayersService(repository)
+    _players_service = PlayersService(repository, PlayerBundleCache(redis))
     return _players_service
 
 
@@ -0,0 +1,42 @@
+from utils.models.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    @staticmethod
+    def test_expire():
+        timer = FakeTimer()
+        cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        timer.now = 6
+        assert cache.get("a") is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    @staticmethod
+    def test_lru_evict():
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    @staticmethod
+    def test_weight_evict():
+        cache = TTLCache(maxsize=0, max_weight=10, weigher=len)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        cache.set("c", b"1")
+        assert "a" not in cache
+        assert cache.weight == 6
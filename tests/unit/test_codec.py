@@ -0,0 +1,108 @@
+import os
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional, Union
+
+import pytest
+from pydantic import BaseModel, Field
+
+from utils.codec import CacheCodec, MSGPACK_AVAILABLE, construct_model
+
+
+class Element(str, Enum):
+    Fire = "Fire"
+    Ice = "Ice"
+
+
+class Affix(BaseModel):
+    id: int
+    value: float
+    cnt: int = 1
+
+
+class Relic(BaseModel):
+    id: int
+    main: Affix = Field(alias="mainAffix")
+    sub: List[Affix] = Field(default_factory=list, alias="subAffixList")
+
+
+class Avatar(BaseModel):
+    id: int
+    element: Element
+    relics: Dict[int, Relic] = {}
+    time: Optional[datetime] = None
+
+
+class UnionModel(BaseModel):
+    value: Union[int, str]
+
+
+def gen_avatar() -> Avatar:
+    main = Affix(id=1, value=2)
+    return Avatar(
+        id=1001,
+        element=Element.Ice,
+        relics={1: Relic(id=61011, mainAffix=main, subAffixList=[main, Affix(id=2, value=0.5, cnt=3)])},
+        time=datetime(2024, 1, 1, 12),
+    )
+
+
+class TestCacheCodec:
+    @staticmethod
+    @pytest.mark.parametrize("fmt", ["json", "msgpack"])
+    @pytest.mark.parametrize("compress_threshold", [0, 1])
+    def test_round_trip(fmt: str, compress_threshold: int):
+        codec = CacheCodec(fmt=fmt, compress_threshold=compress_threshold)
+        avatar = gen_avatar()
+        data = codec.loads_model(Avatar, codec.dumps_model(avatar))
+        assert data == avatar
+        assert data.relics[1].sub[1].cnt == 3
+        assert data.element is Element.Ice
+        assert isinstance(data.relics[1].main.value, float)
+
+    @staticmethod
+    def test_legacy_json():
+        avatar = gen_avatar()
+        assert CacheCodec().loads_model(Avatar, avatar.json(by_alias=True)) == avatar
+
+    @staticmethod
+    def test_undecodable_is_miss():
+        # 0x11 为 JSON + zstd，未安装 zstandard 或数据损坏时都无法解码
+        assert CacheCodec().loads_model(Avatar, b"\xfe\x11not zstd") is None
+        assert CacheCodec().loads_model(Avatar, b"\xfe\x21not zlib") is None
+
+    @staticmethod
+    def test_union_fallback():
+        assert construct_model(UnionModel, {"value": "1"}).value == 1
+
+
+@pytest.mark.skipif(
+    not os.environ.get("CACHE_CODEC_BENCH_PAYLOAD"),
+    reason="需要将 CACHE_CODEC_BENCH_PAYLOAD 设置为 plugins:role_detail:{uid}:data 的 JSON 数据文件",
+)
+def test_benchmark_star_rail_detail_characters():
+    from simnet.models.starrail.chronicle.characters import StarRailDetailCharacters
+
+    with open(os.environ["CACHE_CODEC_BENCH_PAYLOAD"], "r", encoding="utf-8") as f:
+        raw = f.read()
+    model = StarRailDetailCharacters.parse_raw(raw)
+    rounds = 50
+    codecs = {"json": CacheCodec(fmt="json"), "msgpack": CacheCodec(fmt="msgpack") if MSGPACK_AVAILABLE else None}
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        StarRailDetailCharacters.parse_raw(raw)
+    baseline = (time.perf_counter() - start) / rounds
+    print(f"\nparse_raw: {len(raw.encode())} bytes, {baseline * 1000:.2f} ms")
+
+    for name, codec in codecs.items():
+        if codec is None:
+            continue
+        data = codec.dumps_model(model)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            codec.loads_model(StarRailDetailCharacters, data)
+        cost = (time.perf_counter() - start) / rounds
+        print(f"{name}: {len(data)} bytes, {cost * 1000:.2f} ms")
+        assert codec.loads_model(StarRailDetailCharacters, data) == model
@@ -0,0 +1,57 @@
+import heapq
+import itertools
+import random
+
+import pytest
+
+from core.services.search.index import SearchIndex
+from core.services.search.models import StrategyEntry, WeaponEntry
+
+CHARS = "银河铁道之夜星穹列车三月七丹恒姬子光锥遗器攻略abc 12"
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(1, length)))
+
+
+@pytest.fixture(scope="module")
+def entries():
+    rng = random.Random(0)
+    result = []
+    for cls, prefix in ((WeaponEntry, "w"), (StrategyEntry, "s")):
+        for i in range(200):
+            result.append(
+                cls(
+                    key=f"{prefix}{i}",
+                    title=random_text(rng, 6),
+                    description=random_text(rng, 30),
+                    tags=[random_text(rng, 5) for _ in range(rng.randint(0, 3))],
+                )
+            )
+    return result
+
+
+class TestSearchIndex:
+    @staticmethod
+    def test_same_as_compare_to_query(entries):
+        index = SearchIndex()
+        for entry in entries:
+            index.add(entry, 0 if isinstance(entry, WeaponEntry) else 1)
+        rng = random.Random(1)
+        queries = [random_text(rng, 4) for _ in range(20)] + [entries[3].title, "zz"]
+        for query in queries:
+            expected = heapq.nlargest(5, itertools.chain(entries), key=lambda e: e.compare_to_query(query))
+            assert [i.key for i in index.search(query, 5)] == [i.key for i in expected]
+            expected = sorted(entries, key=lambda e: e.compare_to_query(query), reverse=True)
+            assert [i.key for i in index.search(query)] == [i.key for i in expected]
+
+    @staticmethod
+    def test_replace_and_remove():
+        index = SearchIndex()
+        index.add(StrategyEntry(key="a", title="三月七", description="", tags=["三月七"]))
+        index.add(StrategyEntry(key="b", title="丹恒", description="", tags=["丹恒"]))
+        index.add(StrategyEntry(key="a", title="姬子", description="", tags=["姬子"]))
+        assert index.search("姬子", 1)[0].key == "a"
+        assert "三月" not in index.postings
+        index.remove("a")
+        assert [i.key for i in index.values()] == ["b"]
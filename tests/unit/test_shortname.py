@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+import pytest
+
+from metadata import shortname
+from metadata.shortname import light_cones, lightConeToId, lightConeToName, roleToId, roleToName, roles
+
+
+def scan_id(data, name):
+    name = str.casefold(name)
+    return next((key for key, value in data.items() for n in value if str.casefold(n) == name), None)
+
+
+def scan_name(data, name):
+    name = str.casefold(name)
+    return next((value[0] for value in data.values() for n in value if str.casefold(n) == name), name)
+
+
+class TestShortname:
+    @staticmethod
+    def test_same_as_scan():
+        for data, to_id, to_name in ((roles, roleToId, roleToName), (light_cones, lightConeToId, lightConeToName)):
+            for value in data.values():
+                for name in value + [value[0].upper(), "不存在"]:
+                    assert to_id(name) == scan_id(data, name)
+                    assert to_name(name) == scan_name(data, name)
+
+    @staticmethod
+    def test_rebuild():
+        roles[-1] = ["测试角色", "TestRole"]
+        try:
+            assert roleToId("testrole") is None
+            shortname.rebuild()
+            assert roleToId("testrole") == -1
+            assert roleToName("TESTROLE") == "测试角色"
+        finally:
+            del roles[-1]
+            shortname.rebuild()
+        assert roleToId("testrole") is None
+
+
+@pytest.mark.skipif(
+    not os.environ.get("SHORTNAME_BENCH_SRGF"),
+    reason="需要将 SHORTNAME_BENCH_SRGF 设置为 SRGF 格式的跃迁记录文件",
+)
+def test_benchmark_srgf_import():
+    with open(os.environ["SHORTNAME_BENCH_SRGF"], "r", encoding="utf-8") as f:
+        names = [item["name"] for item in json.load(f)["list"]]
+    rounds = 20
+
+    def validate(name, to_role, to_light_cone):
+        return to_role(name) or to_light_cone(name)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            validate(name, lambda n: scan_id(roles, n), lambda n: scan_id(light_cones, n))
+    baseline = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            validate(name, roleToId, lightConeToId)
+    cost = (time.perf_counter() - start) / rounds
+    print(f"\n{len(names)} items, scan: {baseline * 1000:.2f} ms, index: {cost * 1000:.2f} ms")
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from utils.models.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @staticmethod
+    async def test_merge():
+        flight = SingleFlight()
+        calls = 0
+
+        async def func():
+            nonlocal calls
+            calls += 1
+            result = calls
+            await asyncio.sleep(0.01)
+            return result
+
+        results = await asyncio.gather(*[flight.do("a", func) for _ in range(5)], flight.do("b", func))
+        assert results[:5] == [1] * 5
+        assert results[5] == 2
+        assert "a" not in flight
+        assert await flight.do("a", func) == 3
+
+    @staticmethod
+    async def test_exception():
+        flight = SingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.01)
+            raise ValueError
+
+        results = await asyncio.gather(flight.do("a", func), flight.do("a", func), return_exceptions=True)
+        assert all(isinstance(i, ValueError) for i in results)
+        with pytest.raises(ValueError):
+            await flight.do("a", func)
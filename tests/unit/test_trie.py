@@ -0,0 +1,27 @@
+from utils.models.trie import PrefixTrie
+
+
+class TestPrefixTrie:
+    @staticmethod
+    def test_search():
+        trie = PrefixTrie(limit=3)
+        trie.insert("三月七", "march", rank=0)
+        trie.insert("Mar7th", "march", rank=1)
+        trie.insert("三月", "march", rank=1)
+        trie.insert("丹恒", "danheng", rank=0)
+        trie.insert("丹恒·饮月", "imbibitor", rank=0)
+        assert trie.search("三") == ["march"]
+        assert trie.search("MAR") == ["march"]
+        assert trie.search("丹恒") == ["danheng", "imbibitor"]
+        assert trie.search("丹恒·") == ["imbibitor"]
+        assert trie.search("") == []
+        assert trie.search("x") == []
+
+    @staticmethod
+    def test_rank_and_limit():
+        trie = PrefixTrie(limit=2)
+        trie.insert("ab", "b", rank=1)
+        trie.insert("ac", "c", rank=1)
+        trie.insert("ad", "a", rank=0)
+        assert trie.search("a") == ["a", "b"]
+        assert trie.search("a", limit=1) == ["a"]
@@ -0,0 +1,282 @@
+import zlib
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from pydantic.datetime_parse import parse_date, parse_datetime, parse_duration, parse_time
+from pydantic.fields import (
+    SHAPE_DICT,
+    SHAPE_FROZENSET,
+    SHAPE_LIST,
+    SHAPE_MAPPING,
+    SHAPE_SEQUENCE,
+    SHAPE_SET,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE_ELLIPSIS,
+    ModelField,
+)
+from pydantic.json import pydantic_encoder
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgspec = None
+    MSGPACK_AVAILABLE = False
+
+DECODE_ERRORS: Tuple[Type[Exception], ...] = (ValueError, TypeError, zlib.error)
+"""解码失败时可能抛出的异常"""
+if ZSTD_AVAILABLE:
+    DECODE_ERRORS += (zstandard.ZstdError,)
+if MSGPACK_AVAILABLE:
+    DECODE_ERRORS += (msgspec.DecodeError,)
+
+try:
+    import ujson as jsonlib
+except ImportError:
+    import json as jsonlib
+
+__all__ = ("CacheCodec", "cache_codec", "construct_model")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+Converter = Callable[[Any], Any]
+
+MAGIC = b"\xfe"
+"""编码后数据的首字节，JSON 文本不会以此字节开头，用于兼容旧的纯 JSON 缓存"""
+
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+COMPRESS_NONE = 0x00
+COMPRESS_ZSTD = 0x10
+COMPRESS_ZLIB = 0x20
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _parse_float(value: Any) -> Any:
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+def _parse_key(converter: Converter) -> Converter:
+    """JSON 的键只能为字符串，还原为数字类型的键"""
+
+    def _parse(value: Any) -> Any:
+        return converter(int(value) if isinstance(value, str) else value)
+
+    return _parse
+
+
+def _parse_or(parser: Callable[[Any], Any], tp: type) -> Converter:
+    def _parse(value: Any) -> Any:
+        return value if isinstance(value, tp) else parser(value)
+
+    return _parse
+
+
+_PARSERS: Dict[type, Converter] = {
+    datetime: _parse_or(parse_datetime, datetime),
+    date: _parse_or(parse_date, date),
+    time: _parse_or(parse_time, time),
+    timedelta: _parse_or(parse_duration, timedelta),
+    float: _parse_float,
+}
+_PASSTHROUGH = (str, int, bool, bytes, dict, list)
+
+_PLANS: Dict[type, Optional[List[Tuple[str, str, Converter]]]] = {}
+
+
+def _type_converter(tp: Any) -> Optional[Converter]:
+    """为叶子类型生成转换函数，无法安全转换时返回 None"""
+    if tp is Any or tp is object:
+        return _identity
+    if not isinstance(tp, type):
+        return None
+    if issubclass(tp, BaseModel):
+        return lambda value: construct_model(tp, value) if isinstance(value, dict) else value
+    if issubclass(tp, Enum):
+        return lambda value: value if isinstance(value, tp) else tp(value)
+    if tp in _PARSERS:
+        return _PARSERS[tp]
+    if issubclass(tp, datetime):
+        return None
+    if issubclass(tp, _PASSTHROUGH):
+        return _identity
+    return None
+
+
+def _field_converter(field: ModelField) -> Optional[Converter]:
+    """根据字段的 shape 生成转换函数，无法安全转换时返回 None"""
+    if field.shape == SHAPE_SINGLETON:
+        if field.sub_fields:  # Union 等需要校验才能确定类型
+            return None
+        return _type_converter(field.type_)
+    if field.shape in (SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_SET, SHAPE_FROZENSET, SHAPE_TUPLE_ELLIPSIS):
+        item = _field_converter(field.sub_fields[0]) if field.sub_fields else None
+        if item is None:
+            return None
+        container = {SHAPE_SET: set, SHAPE_FROZENSET: frozenset, SHAPE_TUPLE_ELLIPSIS: tuple}.get(field.shape, list)
+        if item is _identity and container is list:
+            return _identity
+        return lambda value: container(None if i is None else item(i) for i in value)
+    if field.shape in (SHAPE_DICT, SHAPE_MAPPING):
+        key = _type_converter(field.key_field.type_) if field.key_field else _identity
+        if key is not None and isinstance(field.key_field.type_, type) and issubclass(field.key_field.type_, int):
+            key = _parse_key(key)
+        item = _field_converter(field.sub_fields[0]) if field.sub_fields else None
+        if key is None or item is None:
+            return None
+        if key is _identity and item is _identity:
+            return _identity
+        return lambda value: {key(k): None if v is None else item(v) for k, v in value.items()}
+    return None
+
+
+def _get_plan(model: Type[BaseModel]) -> Optional[List[Tuple[str, str, Converter]]]:
+    if model in _PLANS:
+        return _PLANS[model]
+    plan: Optional[List[Tuple[str, str, Converter]]] = []
+    for name, field in model.__fields__.items():
+        converter = _field_converter(field)
+        if converter is None:
+            plan = None
+            break
+        plan.append((name, field.alias, converter))
+    _PLANS[model] = plan
+    return plan
+
+
+def construct_model(model: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """不经过校验地还原由本程序写入的可信数据
+
+    pydantic 的 construct 只处理最外层，此函数按字段类型递归还原嵌套模型、枚举与时间，
+    每个模型的还原方式只在第一次使用时生成。遇到 Union 等无法确定类型的字段时回退到 parse_obj。
+    """
+    plan = _get_plan(model)
+    if plan is None:
+        return model.parse_obj(data)
+    values = {}
+    for name, alias, converter in plan:
+        if alias in data:
+            value = data[alias]
+        elif name in data:
+            value = data[name]
+        else:
+            continue
+        values[name] = None if value is None else converter(value)
+    return model.construct(**values)
+
+
+class CacheCodec:
+    """Redis 缓存编解码
+
+    编码结果为 1 字节标识 + 1 字节格式 + 数据，超过 compress_threshold 字节的数据会被压缩。
+    zstandard、orjson、msgspec 未安装时分别回退到 zlib、ujson、JSON，无法解码的数据在 loads_model 中视为缓存未命中。
+    读取时兼容旧的纯 JSON 缓存。
+
+    :param fmt: 序列化格式，json 或 msgpack
+    :param compress_threshold: 触发压缩的最小字节数，为 0 时不压缩
+    :param level: 压缩等级
+    """
+
+    def __init__(self, fmt: str = "json", compress_threshold: int = 1024, level: int = 3):
+        if fmt == "msgpack" and not MSGPACK_AVAILABLE:
+            fmt = "json"
+        self.fmt = FORMAT_MSGPACK if fmt == "msgpack" else FORMAT_JSON
+        self.compress_threshold = compress_threshold
+        self.level = level
+        self._msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=pydantic_encoder) if MSGPACK_AVAILABLE else None
+        self._msgpack_decoder = msgspec.msgpack.Decoder() if MSGPACK_AVAILABLE else None
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if ZSTD_AVAILABLE else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+
+    def _serialize(self, obj: Any) -> bytes:
+        if self.fmt == FORMAT_MSGPACK:
+            return self._msgpack_encoder.encode(obj)
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(obj, default=pydantic_encoder, option=orjson.OPT_NON_STR_KEYS)
+        return jsonlib.dumps(obj, default=pydantic_encoder, ensure_ascii=False).encode("utf-8")
+
+    def _deserialize(self, fmt: int, data: bytes) -> Any:
+        if fmt == FORMAT_MSGPACK:
+            if not MSGPACK_AVAILABLE:
+                raise ValueError("msgspec is not installed")
+            return self._msgpack_decoder.decode(data)
+        if fmt == FORMAT_JSON:
+            return orjson.loads(data) if ORJSON_AVAILABLE else jsonlib.loads(data)
+        raise ValueError(f"unknown cache format {fmt}")
+
+    def _compress(self, data: bytes) -> Tuple[int, bytes]:
+        if not self.compress_threshold or len(data) < self.compress_threshold:
+            return COMPRESS_NONE, data
+        if ZSTD_AVAILABLE:
+            return COMPRESS_ZSTD, self._zstd_compressor.compress(data)
+        return COMPRESS_ZLIB, zlib.compress(data, self.level)
+
+    def _decompress(self, compress: int, data: bytes) -> bytes:
+        if compress == COMPRESS_NONE:
+            return data
+        if compress == COMPRESS_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ValueError("zstandard is not installed")
+            return self._zstd_decompressor.decompress(data)
+        if compress == COMPRESS_ZLIB:
+            return zlib.decompress(data)
+        raise ValueError(f"unknown cache compression {compress}")
+
+    def dumps(self, obj: Any) -> bytes:
+        compress, data = self._compress(self._serialize(obj))
+        return MAGIC + bytes((self.fmt | compress,)) + data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data.startswith(MAGIC):
+            return self._deserialize(FORMAT_JSON, data)
+        flag = data[1]
+        return self._deserialize(flag & 0x0F, self._decompress(flag & 0xF0, data[2:]))
+
+    def dumps_model(self, model: BaseModel, by_alias: bool = True) -> bytes:
+        # 直接调用 BaseModel.dict 以避开 SQLModel 的弃用警告
+        return self.dumps(BaseModel.dict(model, by_alias=by_alias))
+
+    def loads_model(self, model: Type[ModelT], data: Union[bytes, str], trusted: bool = True) -> Optional[ModelT]:
+        """解码为模型
+
+        :param model: 模型类型
+        :param data: 编码后的数据
+        :param trusted: 数据是否由本程序写入，为 True 时跳过校验
+        :return: 模型，数据无法解码时（如缺少写入时使用的压缩库）返回 None，调用方视为缓存未命中
+        """
+        try:
+            obj = self.loads(data)
+        except DECODE_ERRORS:
+            return None
+        if trusted:
+            try:
+                return construct_model(model, obj)
+            except (TypeError, ValueError):
+                pass
+        return model.parse_obj(obj)
+
+
+cache_codec = CacheCodec()
@@ -1,10 +1,6 @@
 from typing import Dict, Any, Optional, TYPE_CHECKING
 
-try:
-    import ujson as jsonlib
-except ImportError:
-    import json as jsonlib
-
+from utils.codec import cache_codec
 
 if TYPE_CHECKING:
     from redis import asyncio as aioredis
@@ -25,13 +21,12 @@ class RedisCache:
         qname = self.get_qname(key)
         data = await self.redis.get(qname)
         if data:
-            json_data = str(data, encoding="utf-8")
-            return jsonlib.loads(json_data)
+            return cache_codec.loads(data)
         return None
 
     async def set(self, key, value) -> None:
         qname = self.get_qname(key)
-        data = jsonlib.dumps(value)
+        data = cache_codec.dumps(value)
         await self.redis.set(qname, data, ex=self.ex)
 
     async def exists(self, key) -> int:
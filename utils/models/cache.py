@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+__all__ = ("TTLCache",)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """进程内的 LRU + TTL 缓存
+
+    :param maxsize: 最大条目数，超出时淘汰最久未使用的条目；为 0 时不限制
+    :param ttl: 条目存活时间（秒）；为 None 时永不过期
+    :param max_weight: 所有条目权重之和的上限，需要配合 weigher 使用；为 0 时不限制
+    :param weigher: 计算条目权重的函数，如字节大小
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        max_weight: int = 0,
+        weigher: Optional[Callable[[V], int]] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.timer = timer
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, Tuple[V, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self._get_item(key) is not None
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data.keys()))
+
+    def _get_item(self, key: K) -> Optional[Tuple[V, float, int]]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] < self.timer():
+            self.pop(key)
+            return None
+        return item
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._get_item(key)
+        if item is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return item[0]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """写入条目
+
+        :param key: 键
+        :param value: 值
+        :param ttl: 此条目的存活时间，默认使用实例的 ttl
+        """
+        self.pop(key)
+        ttl = self.ttl if ttl is None else ttl
+        expire = self.timer() + ttl if ttl is not None else float("inf")
+        weight = self.weigher(value) if self.weigher is not None else 0
+        self._data[key] = (value, expire, weight)
+        self.weight += weight
+        self._evict()
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        self.weight -= item[2]
+        return item[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
+
+    def expire(self) -> int:
+        """清理全部已过期的条目
+
+        :return: 被清理的条目数
+        """
+        now = self.timer()
+        expired = [key for key, item in self._data.items() if item[1] < now]
+        for key in expired:
+            self.pop(key)
+        return len(expired)
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.maxsize and len(self._data) > self.maxsize) or (self.max_weight and self.weight > self.max_weight)
+        ):
+            _, item = self._data.popitem(last=False)
+            self.weight -= item[2]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._data),
+            "weight": self.weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+        }
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+__all__ = ("SingleFlight",)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """合并对同一个 key 的并发调用
+
+    同一时间对同一个 key 只会执行一次 func，其余调用等待并共享其结果或异常。
+    某个等待者被取消不会影响正在执行的调用。
+    """
+
+    def __init__(self):
+        self._calls: Dict[K, "asyncio.Future[V]"] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._calls
+
+    def _done(self, key: K, future: "asyncio.Future[V]") -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # 避免所有等待者都被取消时出现 exception was never retrieved
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        return await asyncio.shield(future)
@@ -0,0 +1,76 @@
+from bisect import insort
+from itertools import count
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+__all__ = ("PrefixTrie",)
+
+V = TypeVar("V")
+
+
+class TrieNode(Generic[V]):
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode[V]"] = {}
+        self.top: List[Tuple[int, int, V]] = []
+        """以此节点为前缀的排名最靠前的值"""
+
+
+class PrefixTrie(Generic[V]):
+    """前缀树
+
+    每个节点保存以该节点为前缀的前 limit 个值，查询只需要沿前缀走到对应节点，
+    复杂度与查询长度成正比。排名按 (rank, 插入顺序) 升序，结果稳定。
+    键忽略大小写。
+    """
+
+    def __init__(self, limit: int = 64):
+        self.limit = limit
+        self.root: TrieNode[V] = TrieNode()
+        self._counter = count()
+
+    @staticmethod
+    def normalize(key: str) -> str:
+        return key.casefold()
+
+    def insert(self, key: str, value: V, rank: int = 0) -> None:
+        """插入键值
+
+        :param key: 键，查询时可以用它的任意前缀命中
+        :param value: 值
+        :param rank: 排名，越小越靠前
+        """
+        key = self.normalize(key)
+        if not key:
+            return
+        item = (rank, next(self._counter), value)
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            if len(node.top) < self.limit or item < node.top[-1]:
+                # 插入顺序唯一，比较不会用到 value
+                insort(node.top, item)
+                del node.top[self.limit :]
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[V]:
+        """返回以 prefix 为前缀的值，同一个值只返回一次"""
+        node = self.root
+        for char in self.normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node is self.root:
+            return []
+        result: List[V] = []
+        seen = set()
+        for _, _, value in node.top:
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            result.append(value)
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    def clear(self) -> None:
+        self.root = TrieNode()